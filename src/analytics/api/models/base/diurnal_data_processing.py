@@ -1,17 +1,21 @@
 from flask import Flask, request, jsonify
 from datetime import datetime
 import logging
-import numpy as np
 from api.utils.pollutants.report import (
     fetch_air_quality_data,
     query_bigquery,
-    results_to_dataframe,
+    aggregate_pm,
     PManalysis,
+    REPORT_AGGREGATES,
 )
 
 # Configure logging
 logging.basicConfig(filename="report_log.log", level=logging.INFO, filemode="w")
 
+DIURNAL_AGGREGATES = {
+    name: REPORT_AGGREGATES[name] for name in ["diurnal", "mean_pm_by_day_hour"]
+}
+
 
 def air_quality_data_diurnal():
     data = request.get_json()
@@ -39,19 +43,8 @@ def air_quality_data_diurnal():
     if site_ids:
         results = query_bigquery(site_ids, start_time, end_time)
         if results is not None:
-            processed_data = results_to_dataframe(results)
-            daily_mean_pm2_5 = PManalysis.mean_daily_pm2_5(processed_data)
-            datetime_mean_pm2_5 = PManalysis.datetime_pm2_5(processed_data)
-            hour_mean_pm2_5 = PManalysis.mean_pm2_5_by_hour(processed_data)
-            mean_pm_by_day_hour = PManalysis.pm_day_hour_name(processed_data)
-            grid_name = PManalysis.gridname(processed_data)
-
-            # Convert timestamps to the desired format
-            daily_mean_pm2_5["date"] = daily_mean_pm2_5["date"].dt.strftime("%Y-%m-%d")
-            datetime_mean_pm2_5["timestamp"] = datetime_mean_pm2_5[
-                "timestamp"
-            ].dt.strftime("%Y-%m-%d %H:%M %Z")
-            #            daily_mean_pm_dict = daily_mean_pm2_5.to_dict(orient='records')
+            aggregates = aggregate_pm(results, DIURNAL_AGGREGATES)
+            grid_name = PManalysis.gridname(results)
             # Log some information for debugging or monitoring
             logging.info(
                 "Successfully processed air quality data for grid_id %s", grid_id
@@ -70,26 +63,10 @@ def air_quality_data_diurnal():
                         "startTime": start_time.isoformat(),
                         "endTime": end_time.isoformat(),
                     },
-                    "diurnal": hour_mean_pm2_5.to_dict(orient="records"),
-                    "mean_pm_by_day_hour": mean_pm_by_day_hour.to_dict(
-                        orient="records"
-                    ),
+                    **aggregates,
                 }
             }
 
-            def replace_nan_with_null(obj):
-                if isinstance(obj, list):
-                    return [replace_nan_with_null(item) for item in obj]
-                elif isinstance(obj, dict):
-                    return {
-                        key: replace_nan_with_null(value) for key, value in obj.items()
-                    }
-                elif isinstance(obj, float) and np.isnan(obj):
-                    return None
-                else:
-                    return obj
-
-            response_data = replace_nan_with_null(response_data)
             return jsonify(response_data)
         else:
             return (
@@ -11,6 +11,7 @@ from bson.errors import InvalidId
 from google.cloud import bigquery, storage
 
 from api.models.base.base_model import BasePyMongoModel
+from api.models.queries import DataQuery
 from api.utils.dates import date_to_str
 from api.utils.exceptions import ExportRequestNotFound
 from config import Config
@@ -165,6 +166,40 @@ class DataExportModel(BasePyMongoModel):
             print(ex)
         return False
 
+    def update_requests_status_and_retries(
+        self, requests: list[DataExportRequest]
+    ) -> int:
+        """Updates the status and retries of several requests in one round trip. Returns the number updated."""
+        if not requests:
+            return 0
+        try:
+            updates = [
+                pymongo.UpdateOne(
+                    {"_id": ObjectId(f"{request.request_id}")},
+                    {
+                        "$set": {
+                            "status": request.status.value,
+                            "retries": request.retries,
+                        }
+                    },
+                )
+                for request in requests
+            ]
+            result = self.collection.bulk_write(updates, ordered=False)
+            return result.modified_count
+        except Exception as ex:
+            print(ex)
+        return 0
+
+    def get_processing_requests_per_user(self) -> dict[str, int]:
+        docs = self.collection.aggregate(
+            [
+                {"$match": {"status": DataExportStatus.PROCESSING.value}},
+                {"$group": {"_id": "$user_id", "count": {"$sum": 1}}},
+            ]
+        )
+        return {doc["_id"]: doc["count"] for doc in docs}
+
     def update_request_status_and_data_links(self, request: DataExportRequest) -> bool:
         try:
             filter_set = {"_id": ObjectId(f"{request.request_id}")}
@@ -230,23 +265,31 @@ class DataExportModel(BasePyMongoModel):
             if not blob.name.endswith("/")
         ]
 
-    def has_data(self, query) -> bool:
-        job_config = bigquery.QueryJobConfig()
-        job_config.use_query_cache = True
+    def has_data(self, query: DataQuery) -> bool:
+        query = query.wrap("select * from ({query}) limit 1")
         total_rows = (
             bigquery.Client()
-            .query(f"select * from ({query}) limit 1", job_config)
+            .query(query.sql, job_config=query.job_config())
             .result()
             .total_rows
         )
         return total_rows > 0
 
-    def export_query_results_to_table(self, query, export_request: DataExportRequest):
-        job_config = bigquery.QueryJobConfig(
+    def estimate_query_bytes(self, query: DataQuery) -> int:
+        """Bytes the query would process, from a BigQuery dry run"""
+        job_config = query.job_config(dry_run=True)
+        job_config.use_query_cache = False
+        job = self.bigquery_client.query(query.sql, job_config=job_config)
+        return job.total_bytes_processed or 0
+
+    def export_query_results_to_table(
+        self, query: DataQuery, export_request: DataExportRequest
+    ):
+        job_config = query.job_config(
             destination=f"{self.project}.{self.dataset}.{export_request.bigquery_table()}"
         )
         job_config.write_disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
-        job = self.bigquery_client.query(query, job_config=job_config)
+        job = self.bigquery_client.query(query.sql, job_config=job_config)
         job.result()
 
     def upload_file_to_gcs(
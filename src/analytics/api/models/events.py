@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Iterator
 
 import numpy as np
 import pandas as pd
@@ -6,13 +7,29 @@ import pytz
 from google.cloud import bigquery
 
 from api.models.base.base_model import BasePyMongoModel
-from api.utils.dates import date_to_str
-from api.utils.pollutants.pm_25 import (
-    BIGQUERY_FREQUENCY_MAPPER,
-    WEATHER_FIELDS_MAPPER,
+from api.models.events_rollup import (
+    CHART_ROLLUP_FREQUENCIES,
+    ROLLUP_BUCKET_FORMATS,
+    ROLLUP_COLLECTION,
+    ROLLUP_POLLUTANTS,
+    ROLLUP_TIMEZONE,
+    EventsRollupModel,
 )
+from api.models.queries import DataQuery, DataQueryParameters, data_query
+from api.utils.dates import date_to_str
+from api.utils.bucket_cache import TimeBucketCache
 from main import cache, CONFIGURATIONS
 
+# Site readings used by the dashboard charts, cached per site and day once the day is over
+chart_events_cache = TimeBucketCache(
+    cache,
+    prefix="chart_events",
+    entity_column="site_id",
+    time_column="time",
+    settle_time=pd.Timedelta(seconds=int(CONFIGURATIONS.CHART_CACHE_SETTLE_TIME)),
+    timeout=int(CONFIGURATIONS.CHART_CACHE_TIMEOUT),
+)
+
 
 class EventsModel(BasePyMongoModel):
     BIGQUERY_AIRQLOUDS_SITES = f"`{CONFIGURATIONS.BIGQUERY_AIRQLOUDS_SITES}`"
@@ -27,6 +44,8 @@ class EventsModel(BasePyMongoModel):
 
     BIGQUERY_EVENTS = CONFIGURATIONS.BIGQUERY_EVENTS
     DATA_EXPORT_LIMIT = CONFIGURATIONS.DATA_EXPORT_LIMIT
+    DATA_EXPORT_STREAM_LIMIT = CONFIGURATIONS.DATA_EXPORT_STREAM_LIMIT
+    DATA_EXPORT_PAGE_SIZE = CONFIGURATIONS.DATA_EXPORT_PAGE_SIZE
     BIGQUERY_MOBILE_EVENTS = CONFIGURATIONS.BIGQUERY_MOBILE_EVENTS
 
     BIGQUERY_RAW_DATA = f"`{CONFIGURATIONS.BIGQUERY_RAW_DATA}`"
@@ -41,8 +60,7 @@ class EventsModel(BasePyMongoModel):
         super().__init__(tenant, collection_name="events")
 
     @classmethod
-    @cache.memoize()
-    def download_from_bigquery(
+    def download_query(
         cls,
         devices,
         sites,
@@ -52,212 +70,58 @@ class EventsModel(BasePyMongoModel):
         frequency,
         pollutants,
         weather_fields,
-    ) -> pd.DataFrame:
-        decimal_places = cls.DATA_EXPORT_DECIMAL_PLACES
-
-        # Data sources
-        sites_table = cls.BIGQUERY_SITES
-        airqlouds_sites_table = cls.BIGQUERY_AIRQLOUDS_SITES
-        devices_table = cls.BIGQUERY_DEVICES
-        airqlouds_table = cls.BIGQUERY_AIRQLOUDS
-
-        sorting_cols = ["site_id", "datetime", "device_name"]
-
-        if frequency == "raw":
-            data_table = cls.BIGQUERY_RAW_DATA
-        elif frequency == "daily":
-            data_table = cls.BIGQUERY_DAILY_DATA
-        elif frequency == "hourly":
-            data_table = cls.BIGQUERY_HOURLY_DATA
-        else:
-            raise Exception("Invalid frequency")
-
-        pollutant_columns = []
-        bam_pollutant_columns = []
-        weather_columns = []
-        for pollutant in pollutants:
-            pollutant_mapping = BIGQUERY_FREQUENCY_MAPPER.get(frequency).get(
-                pollutant, []
-            )
-            pollutant_columns.extend(
-                [
-                    f"ROUND({data_table}.{mapping}, {decimal_places}) AS {mapping}"
-                    for mapping in pollutant_mapping
-                ]
+    ) -> DataQuery:
+        """Builds the parameterized data download query for the canonical form of the request."""
+        return data_query(
+            DataQueryParameters.create(
+                devices=devices,
+                sites=sites,
+                airqlouds=airqlouds,
+                start_date=start_date,
+                end_date=end_date,
+                frequency=frequency,
+                pollutants=pollutants,
+                weather_fields=weather_fields,
             )
-
-            if pollutant == "pm2_5":
-                bam_pollutant_columns.extend(
-                    ["pm2_5 as pm2_5_raw_value", "pm2_5 as pm2_5_calibrated_value"]
-                )
-            elif pollutant == "pm10":
-                bam_pollutant_columns.extend(
-                    ["pm10 as pm10_raw_value", "pm10 as pm10_calibrated_value"]
-                )
-            elif pollutant == "no2":
-                bam_pollutant_columns.extend(
-                    ["no2 as no2_raw_value", "no2 as no2_calibrated_value"]
-                )
-
-        if weather_fields is not None:
-            for field in weather_fields:
-                weather_mapping = WEATHER_FIELDS_MAPPER.get(field, None)
-                weather_columns.extend(
-                    [
-                        f"ROUND({data_table}.{weather_mapping}, {decimal_places}) AS {weather_mapping}"
-                    ]
-                )
-        pollutants_query = (
-            f" SELECT {', '.join(map(str, set(pollutant_columns + weather_columns)))} ,"
-            f" FORMAT_DATETIME('%Y-%m-%d %H:%M:%S', {data_table}.timestamp) AS datetime "
-        )
-        bam_pollutants_query = (
-            f" SELECT {', '.join(map(str, set(bam_pollutant_columns)))} ,"
-            f" FORMAT_DATETIME('%Y-%m-%d %H:%M:%S', {cls.BIGQUERY_BAM_DATA}.timestamp) AS datetime "
         )
 
-        if len(devices) != 0:
-            # Adding device information, start and end times
-            query = (
-                f" {pollutants_query} , "
-                f" {devices_table}.device_id AS device_name , "
-                f" {devices_table}.site_id AS site_id , "
-                f" {devices_table}.tenant AS tenant , "
-                f" {devices_table}.approximate_latitude AS device_latitude , "
-                f" {devices_table}.approximate_longitude  AS device_longitude , "
-                f" FROM {data_table} "
-                f" JOIN {devices_table} ON {devices_table}.device_id = {data_table}.device_id "
-                f" WHERE {data_table}.timestamp >= '{start_date}' "
-                f" AND {data_table}.timestamp <= '{end_date}' "
-                f" AND {devices_table}.device_id IN UNNEST({devices}) "
-            )
-
-            bam_query = (
-                f" {bam_pollutants_query} , "
-                f" {devices_table}.device_id AS device_name , "
-                f" {devices_table}.site_id AS site_id , "
-                f" {devices_table}.tenant AS tenant , "
-                f" {devices_table}.approximate_latitude AS device_latitude , "
-                f" {devices_table}.approximate_longitude  AS device_longitude , "
-                f" FROM {cls.BIGQUERY_BAM_DATA} "
-                f" JOIN {devices_table} ON {devices_table}.device_id = {cls.BIGQUERY_BAM_DATA}.device_id "
-                f" WHERE {cls.BIGQUERY_BAM_DATA}.timestamp >= '{start_date}' "
-                f" AND {cls.BIGQUERY_BAM_DATA}.timestamp <= '{end_date}' "
-                f" AND {devices_table}.device_id IN UNNEST({devices}) "
-            )
-
-            # Adding site information
-            query = (
-                f" SELECT "
-                f" {sites_table}.name AS site_name , "
-                f" {sites_table}.approximate_latitude AS site_latitude , "
-                f" {sites_table}.approximate_longitude  AS site_longitude , "
-                f" data.* "
-                f" FROM {sites_table} "
-                f" RIGHT JOIN ({query}) data ON data.site_id = {sites_table}.id "
-            )
-
-            bam_query = (
-                f" SELECT "
-                f" {sites_table}.name AS site_name , "
-                f" {sites_table}.approximate_latitude AS site_latitude , "
-                f" {sites_table}.approximate_longitude  AS site_longitude , "
-                f" data.* "
-                f" FROM {sites_table} "
-                f" RIGHT JOIN ({bam_query}) data ON data.site_id = {sites_table}.id "
-            )
-
-            if frequency == "hourly":
-                query = f"{query} UNION ALL {bam_query}"
-
-        elif len(sites) != 0:
-            # Adding site information, start and end times
-            query = (
-                f" {pollutants_query} , "
-                f" {sites_table}.tenant AS tenant , "
-                f" {sites_table}.id AS site_id , "
-                f" {sites_table}.name AS site_name , "
-                f" {sites_table}.approximate_latitude AS site_latitude , "
-                f" {sites_table}.approximate_longitude  AS site_longitude , "
-                f" {data_table}.device_id AS device_name , "
-                f" FROM {data_table} "
-                f" JOIN {sites_table} ON {sites_table}.id = {data_table}.site_id "
-                f" WHERE {data_table}.timestamp >= '{start_date}' "
-                f" AND {data_table}.timestamp <= '{end_date}' "
-                f" AND {sites_table}.id IN UNNEST({sites}) "
-            )
-
-            # Adding device information
-            query = (
-                f" SELECT "
-                f" {devices_table}.approximate_latitude AS device_latitude , "
-                f" {devices_table}.approximate_longitude  AS device_longitude , "
-                f" {devices_table}.device_id AS device_name , "
-                f" data.* "
-                f" FROM {devices_table} "
-                f" RIGHT JOIN ({query}) data ON data.device_name = {devices_table}.device_id "
-            )
-        else:
-            sorting_cols = ["airqloud_id", "site_id", "datetime", "device_name"]
-
-            meta_data_query = (
-                f" SELECT {airqlouds_sites_table}.tenant , "
-                f" {airqlouds_sites_table}.airqloud_id , "
-                f" {airqlouds_sites_table}.site_id , "
-                f" FROM {airqlouds_sites_table} "
-                f" WHERE {airqlouds_sites_table}.airqloud_id IN UNNEST({airqlouds}) "
-            )
-
-            # Adding airqloud information
-            meta_data_query = (
-                f" SELECT "
-                f" {airqlouds_table}.name  AS airqloud_name , "
-                f" meta_data.* "
-                f" FROM {airqlouds_table} "
-                f" RIGHT JOIN ({meta_data_query}) meta_data ON meta_data.airqloud_id = {airqlouds_table}.id "
-            )
-
-            # Adding site information
-            meta_data_query = (
-                f" SELECT "
-                f" {sites_table}.approximate_latitude AS site_latitude , "
-                f" {sites_table}.approximate_longitude  AS site_longitude , "
-                f" {sites_table}.name  AS site_name , "
-                f" meta_data.* "
-                f" FROM {sites_table} "
-                f" RIGHT JOIN ({meta_data_query}) meta_data ON meta_data.site_id = {sites_table}.id "
-            )
-
-            # Adding device information
-            meta_data_query = (
-                f" SELECT "
-                f" {devices_table}.approximate_latitude AS device_latitude , "
-                f" {devices_table}.approximate_longitude  AS device_longitude , "
-                f" {devices_table}.device_id AS device_name , "
-                f" meta_data.* "
-                f" FROM {devices_table} "
-                f" RIGHT JOIN ({meta_data_query}) meta_data ON meta_data.site_id = {devices_table}.site_id "
-            )
+    @classmethod
+    def download_from_bigquery(
+        cls,
+        devices,
+        sites,
+        airqlouds,
+        start_date,
+        end_date,
+        frequency,
+        pollutants,
+        weather_fields,
+    ) -> pd.DataFrame:
+        parameters = DataQueryParameters.create(
+            devices=devices,
+            sites=sites,
+            airqlouds=airqlouds,
+            start_date=start_date,
+            end_date=end_date,
+            frequency=frequency,
+            pollutants=pollutants,
+            weather_fields=weather_fields,
+        )
+        return cls.download_data(parameters)
 
-            # Adding start and end times
-            query = (
-                f" {pollutants_query} , "
-                f" meta_data.* "
-                f" FROM {data_table} "
-                f" RIGHT JOIN ({meta_data_query}) meta_data ON meta_data.site_id = {data_table}.site_id "
-                f" WHERE {data_table}.timestamp >= '{start_date}' "
-                f" AND {data_table}.timestamp <= '{end_date}' "
-                f" ORDER BY {data_table}.timestamp "
-            )
+    @classmethod
+    @cache.memoize()
+    def download_data(cls, parameters: DataQueryParameters) -> pd.DataFrame:
+        """Memoized on the canonical request, so requests for the same data share a cache entry."""
+        query = data_query(parameters).wrap(
+            f"select distinct * from ({{query}}) limit {cls.DATA_EXPORT_LIMIT}"
+        )
+        sorting_cols = list(query.sorting_cols)
+        frequency = parameters.frequency
 
-        job_config = bigquery.QueryJobConfig()
-        job_config.use_query_cache = True
         dataframe = (
             bigquery.Client()
-            .query(
-                f"select distinct * from ({query}) limit {cls.DATA_EXPORT_LIMIT}",
-                job_config,
-            )
+            .query(query.sql, job_config=query.job_config())
             .result()
             .to_dataframe()
         )
@@ -274,7 +138,7 @@ class EventsModel(BasePyMongoModel):
         return dataframe
 
     @classmethod
-    def data_export_query(
+    def stream_from_bigquery(
         cls,
         devices,
         sites,
@@ -283,198 +147,84 @@ class EventsModel(BasePyMongoModel):
         end_date,
         frequency,
         pollutants,
-    ) -> str:
-        decimal_places = cls.DATA_EXPORT_DECIMAL_PLACES
-
-        # Data sources
-        sites_table = cls.BIGQUERY_SITES
-        airqlouds_sites_table = cls.BIGQUERY_AIRQLOUDS_SITES
-        devices_table = cls.BIGQUERY_DEVICES
-        airqlouds_table = cls.BIGQUERY_AIRQLOUDS
-
-        if frequency == "raw":
-            data_table = cls.BIGQUERY_RAW_DATA
-        elif frequency == "daily":
-            data_table = cls.BIGQUERY_DAILY_DATA
-        elif frequency == "hourly":
-            data_table = cls.BIGQUERY_HOURLY_DATA
-        else:
-            raise Exception("Invalid frequency")
-
-        pollutant_columns = []
-        bam_pollutant_columns = []
-        for pollutant in pollutants:
-            pollutant_mapping = BIGQUERY_FREQUENCY_MAPPER.get(frequency).get(
-                pollutant, []
-            )
-            pollutant_columns.extend(
-                [
-                    f"ROUND({data_table}.{mapping}, {decimal_places}) AS {mapping}"
-                    for mapping in pollutant_mapping
-                ]
-            )
-
-            if pollutant == "pm2_5":
-                bam_pollutant_columns.extend(
-                    ["pm2_5 as pm2_5_raw_value", "pm2_5 as pm2_5_calibrated_value"]
-                )
-            elif pollutant == "pm10":
-                bam_pollutant_columns.extend(
-                    ["pm10 as pm10_raw_value", "pm10 as pm10_calibrated_value"]
-                )
-            elif pollutant == "no2":
-                bam_pollutant_columns.extend(
-                    ["no2 as no2_raw_value", "no2 as no2_calibrated_value"]
-                )
+        weather_fields,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Same data as `download_from_bigquery` but paged, so that only one page of results is held in memory at a
+        time. Duplicates are removed and rows are sorted by BigQuery rather than in pandas, and the number of rows
+        is capped by DATA_EXPORT_STREAM_LIMIT instead of DATA_EXPORT_LIMIT.
 
-        pollutants_query = (
-            f" SELECT {', '.join(map(str, set(pollutant_columns)))} ,"
-            f" FORMAT_DATETIME('%Y-%m-%d %H:%M:%S', {data_table}.timestamp) AS datetime "
+        Yields:
+            pd.DataFrame: Non-empty pages of at most DATA_EXPORT_PAGE_SIZE rows.
+        """
+        query = cls.download_query(
+            devices=devices,
+            sites=sites,
+            airqlouds=airqlouds,
+            start_date=start_date,
+            end_date=end_date,
+            frequency=frequency,
+            pollutants=pollutants,
+            weather_fields=weather_fields,
         )
-        bam_pollutants_query = (
-            f" SELECT {', '.join(map(str, set(bam_pollutant_columns)))} ,"
-            f" FORMAT_DATETIME('%Y-%m-%d %H:%M:%S', {cls.BIGQUERY_BAM_DATA}.timestamp) AS datetime "
+        query = query.wrap(
+            f" select * from (select distinct * from ({{query}})) "
+            f" where true "
+            f" qualify row_number() over (partition by datetime, device_name) = 1 "
+            f" order by {', '.join(query.sorting_cols)} "
+            f" limit {cls.DATA_EXPORT_STREAM_LIMIT} "
         )
 
-        if len(devices) != 0:
-            # Adding device information, start and end times
-            query = (
-                f" {pollutants_query} , "
-                f" {devices_table}.device_id AS device_name , "
-                f" {devices_table}.site_id AS site_id , "
-                f" {devices_table}.tenant AS tenant , "
-                f" {devices_table}.approximate_latitude AS device_latitude , "
-                f" {devices_table}.approximate_longitude  AS device_longitude , "
-                f" FROM {data_table} "
-                f" JOIN {devices_table} ON {devices_table}.device_id = {data_table}.device_id "
-                f" WHERE {data_table}.timestamp >= '{start_date}' "
-                f" AND {data_table}.timestamp <= '{end_date}' "
-                f" AND {devices_table}.device_id IN UNNEST({devices}) "
-            )
-
-            bam_query = (
-                f" {bam_pollutants_query} , "
-                f" {devices_table}.device_id AS device_name , "
-                f" {devices_table}.site_id AS site_id , "
-                f" {devices_table}.tenant AS tenant , "
-                f" {devices_table}.approximate_latitude AS device_latitude , "
-                f" {devices_table}.approximate_longitude  AS device_longitude , "
-                f" FROM {cls.BIGQUERY_BAM_DATA} "
-                f" JOIN {devices_table} ON {devices_table}.device_id = {cls.BIGQUERY_BAM_DATA}.device_id "
-                f" WHERE {cls.BIGQUERY_BAM_DATA}.timestamp >= '{start_date}' "
-                f" AND {cls.BIGQUERY_BAM_DATA}.timestamp <= '{end_date}' "
-                f" AND {devices_table}.device_id IN UNNEST({devices}) "
-            )
-
-            # Adding site information
-            query = (
-                f" SELECT "
-                f" {sites_table}.name AS site_name , "
-                f" {sites_table}.approximate_latitude AS site_latitude , "
-                f" {sites_table}.approximate_longitude  AS site_longitude , "
-                f" data.* "
-                f" FROM {sites_table} "
-                f" RIGHT JOIN ({query}) data ON data.site_id = {sites_table}.id "
-            )
-
-            bam_query = (
-                f" SELECT "
-                f" {sites_table}.name AS site_name , "
-                f" {sites_table}.approximate_latitude AS site_latitude , "
-                f" {sites_table}.approximate_longitude  AS site_longitude , "
-                f" data.* "
-                f" FROM {sites_table} "
-                f" RIGHT JOIN ({bam_query}) data ON data.site_id = {sites_table}.id "
-            )
-
-            if frequency == "hourly":
-                query = f"{query} UNION ALL {bam_query}"
-
-        elif len(sites) != 0:
-            # Adding site information, start and end times
-            query = (
-                f" {pollutants_query} , "
-                f" {sites_table}.tenant AS tenant , "
-                f" {sites_table}.id AS site_id , "
-                f" {sites_table}.name AS site_name , "
-                f" {sites_table}.approximate_latitude AS site_latitude , "
-                f" {sites_table}.approximate_longitude  AS site_longitude , "
-                f" {data_table}.device_id AS device_name , "
-                f" FROM {data_table} "
-                f" JOIN {sites_table} ON {sites_table}.id = {data_table}.site_id "
-                f" WHERE {data_table}.timestamp >= '{start_date}' "
-                f" AND {data_table}.timestamp <= '{end_date}' "
-                f" AND {sites_table}.id IN UNNEST({sites}) "
-            )
-
-            # Adding device information
-            query = (
-                f" SELECT "
-                f" {devices_table}.approximate_latitude AS device_latitude , "
-                f" {devices_table}.approximate_longitude  AS device_longitude , "
-                f" {devices_table}.device_id AS device_name , "
-                f" data.* "
-                f" FROM {devices_table} "
-                f" RIGHT JOIN ({query}) data ON data.device_name = {devices_table}.device_id "
-            )
-        else:
-            meta_data_query = (
-                f" SELECT {airqlouds_sites_table}.tenant , "
-                f" {airqlouds_sites_table}.airqloud_id , "
-                f" {airqlouds_sites_table}.site_id , "
-                f" FROM {airqlouds_sites_table} "
-                f" WHERE {airqlouds_sites_table}.airqloud_id IN UNNEST({airqlouds}) "
-            )
-
-            # Adding airqloud information
-            meta_data_query = (
-                f" SELECT "
-                f" {airqlouds_table}.name  AS airqloud_name , "
-                f" meta_data.* "
-                f" FROM {airqlouds_table} "
-                f" RIGHT JOIN ({meta_data_query}) meta_data ON meta_data.airqloud_id = {airqlouds_table}.id "
-            )
-
-            # Adding site information
-            meta_data_query = (
-                f" SELECT "
-                f" {sites_table}.approximate_latitude AS site_latitude , "
-                f" {sites_table}.approximate_longitude  AS site_longitude , "
-                f" {sites_table}.name  AS site_name , "
-                f" meta_data.* "
-                f" FROM {sites_table} "
-                f" RIGHT JOIN ({meta_data_query}) meta_data ON meta_data.site_id = {sites_table}.id "
-            )
+        rows = (
+            bigquery.Client()
+            .query(query.sql, job_config=query.job_config())
+            .result(page_size=int(cls.DATA_EXPORT_PAGE_SIZE))
+        )
 
-            # Adding device information
-            meta_data_query = (
-                f" SELECT "
-                f" {devices_table}.approximate_latitude AS device_latitude , "
-                f" {devices_table}.approximate_longitude  AS device_longitude , "
-                f" {devices_table}.device_id AS device_name , "
-                f" meta_data.* "
-                f" FROM {devices_table} "
-                f" RIGHT JOIN ({meta_data_query}) meta_data ON meta_data.site_id = {devices_table}.site_id "
-            )
+        for page in rows.to_dataframe_iterable():
+            if page.empty:
+                continue
+            page["frequency"] = frequency
+            yield page
 
-            # Adding start and end times
-            query = (
-                f" {pollutants_query} , "
-                f" meta_data.* "
-                f" FROM {data_table} "
-                f" RIGHT JOIN ({meta_data_query}) meta_data ON meta_data.site_id = {data_table}.site_id "
-                f" WHERE {data_table}.timestamp >= '{start_date}' "
-                f" AND {data_table}.timestamp <= '{end_date}' "
-                f" ORDER BY {data_table}.timestamp "
+    @classmethod
+    def data_export_query(
+        cls,
+        devices,
+        sites,
+        airqlouds,
+        start_date,
+        end_date,
+        frequency,
+        pollutants,
+    ) -> DataQuery:
+        query = data_query(
+            DataQueryParameters.create(
+                devices=devices,
+                sites=sites,
+                airqlouds=airqlouds,
+                start_date=start_date,
+                end_date=end_date,
+                frequency=frequency,
+                pollutants=pollutants,
             )
-
-        return f"select distinct * from ({query})"
+        )
+        return query.wrap("select distinct * from ({query})")
 
     @classmethod
     def get_devices_hourly_data(
         cls,
         day: datetime,
     ) -> pd.DataFrame:
+        return cls.get_devices_hourly_data_range(start_date=day, end_date=day)
+
+    @classmethod
+    def get_devices_hourly_data_range(
+        cls,
+        start_date: datetime,
+        end_date: datetime,
+    ) -> pd.DataFrame:
+        """Hourly PM2.5 records of all devices from start_date to end_date, both days inclusive, in one query."""
         hourly_data_table = cls.BIGQUERY_HOURLY_DATA
 
         query = (
@@ -484,11 +234,16 @@ class EventsModel(BasePyMongoModel):
             f" {hourly_data_table}.device_id AS device ,"
             f" FORMAT_DATETIME('%Y-%m-%d %H:%M:%S', {hourly_data_table}.timestamp) AS timestamp ,"
             f" FROM {hourly_data_table} "
-            f" WHERE DATE({hourly_data_table}.timestamp) = '{day.strftime('%Y-%m-%d')}' "
+            f" WHERE DATE({hourly_data_table}.timestamp) BETWEEN @start_date AND @end_date "
             f" AND {hourly_data_table}.pm2_5_raw_value is not null "
         )
 
-        job_config = bigquery.QueryJobConfig()
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("start_date", "DATE", start_date.date()),
+                bigquery.ScalarQueryParameter("end_date", "DATE", end_date.date()),
+            ]
+        )
         job_config.use_query_cache = True
 
         dataframe = (
@@ -892,37 +647,48 @@ class EventsModel(BasePyMongoModel):
             "daily": "%Y-%m-%d",
             "monthly": "%Y-%m-01",
         }
+        time_format = time_format_mapper.get(frequency) or time_format_mapper.get(
+            "hourly"
+        )
 
-        return (
-            self.project(
-                **{"values.time": 1, "values.site_id": 1, f"values.{pollutant}": 1}
-            )
-            .date_range("values.time", start_date=start_date, end_date=end_date)
-            .filter_by(**{"values.frequency": "raw"})
-            .unwind("values")
-            .replace_root("values")
-            .project(
-                _id=0,
-                time={
-                    "$dateToString": {
-                        "format": time_format_mapper.get(frequency)
-                        or time_format_mapper.get("hourly"),
-                        "date": "$time",
-                        "timezone": "Africa/Kampala",
-                    }
-                },
-                **{f"{pollutant}.value": 1},
-                site_id={"$toString": "$site_id"},
+        if frequency in CHART_ROLLUP_FREQUENCIES:
+            values = EventsRollupModel(self.tenant).chart_values(
+                sites, start_date, end_date, pollutant, frequency, time_format
             )
-            .remove_outliers(pollutant)
-            .match_in(site_id=sites)
-            .group(
-                _id={"site_id": "$site_id", "time": "$time"},
-                time={"$first": "$time"},
-                value={"$avg": f"${pollutant}.value"},
+        else:
+            values = (
+                self.project(
+                    **{"values.time": 1, "values.site_id": 1, f"values.{pollutant}": 1}
+                )
+                .date_range("values.time", start_date=start_date, end_date=end_date)
+                .filter_by(**{"values.frequency": "raw"})
+                .unwind("values")
+                .replace_root("values")
+                .project(
+                    _id=0,
+                    time={
+                        "$dateToString": {
+                            "format": time_format,
+                            "date": "$time",
+                            "timezone": ROLLUP_TIMEZONE,
+                        }
+                    },
+                    **{f"{pollutant}.value": 1},
+                    site_id={"$toString": "$site_id"},
+                )
+                .remove_outliers(pollutant)
+                .match_in(site_id=sites)
+                .group(
+                    _id={"site_id": "$site_id", "time": "$time"},
+                    site_id={"$first": "$site_id"},
+                    time={"$first": "$time"},
+                    value={"$avg": f"${pollutant}.value"},
+                )
             )
-            .group(
-                _id="$_id.site_id",
+
+        return (
+            values.group(
+                _id="$site_id",
                 values={
                     "$push": {
                         "time": "$time",
@@ -958,36 +724,47 @@ class EventsModel(BasePyMongoModel):
             "diurnal": f'{diurnal_end_date.strftime("%Y-%m-%d")}T%H:00:00%z',
         }
 
-        return (
-            self.project(
-                **{"values.time": 1, "values.site_id": 1, f"values.{pollutant}": 1}
-            )
-            .date_range("values.time", start_date=start_date, end_date=end_date)
-            .match_in(**{"values.site_id": self.to_object_ids(sites)})
-            .filter_by(**{"values.frequency": "raw"})
-            .unwind("values")
-            .replace_root("values")
-            .project(
-                _id=0,
-                time={
-                    "$dateToString": {
-                        "format": time_format_mapper.get(frequency)
-                        or time_format_mapper.get("hourly"),
-                        "date": "$time",
-                        "timezone": "Africa/Kampala",
-                    }
-                },
-                **{f"{pollutant}.value": 1},
-                site_id={"$toString": "$site_id"},
+        time_format = time_format_mapper.get(frequency) or time_format_mapper.get(
+            "hourly"
+        )
+
+        if frequency in CHART_ROLLUP_FREQUENCIES:
+            values = EventsRollupModel(self.tenant).chart_values(
+                sites, start_date, end_date, pollutant, frequency, time_format
             )
-            .remove_outliers(pollutant)
-            .group(
-                _id={"site_id": "$site_id", "time": "$time"},
-                time={"$first": "$time"},
-                site_id={"$first": "$site_id"},
-                value={"$avg": f"${pollutant}.value"},
+        else:
+            values = (
+                self.project(
+                    **{"values.time": 1, "values.site_id": 1, f"values.{pollutant}": 1}
+                )
+                .date_range("values.time", start_date=start_date, end_date=end_date)
+                .match_in(**{"values.site_id": self.to_object_ids(sites)})
+                .filter_by(**{"values.frequency": "raw"})
+                .unwind("values")
+                .replace_root("values")
+                .project(
+                    _id=0,
+                    time={
+                        "$dateToString": {
+                            "format": time_format,
+                            "date": "$time",
+                            "timezone": ROLLUP_TIMEZONE,
+                        }
+                    },
+                    **{f"{pollutant}.value": 1},
+                    site_id={"$toString": "$site_id"},
+                )
+                .remove_outliers(pollutant)
+                .group(
+                    _id={"site_id": "$site_id", "time": "$time"},
+                    time={"$first": "$time"},
+                    site_id={"$first": "$site_id"},
+                    value={"$avg": f"${pollutant}.value"},
+                )
             )
-            .sort(time=self.ASCENDING)
+
+        return (
+            values.sort(time=self.ASCENDING)
             .project(_id=0, site_id={"$toObjectId": "$site_id"}, time=1, value=1)
             .lookup("sites", local_field="site_id", foreign_field="_id", col_as="site")
             .project(
@@ -1003,36 +780,148 @@ class EventsModel(BasePyMongoModel):
             .exec()
         )
 
-    @cache.memoize()
+    def rollup_events(self, start: datetime, frequency: str):
+        """
+        Recomputes the rollups of the raw readings from `start`, which must be the start of a bucket, and merges
+        them into the rollup collection. Readings outside the pollutant's valid range are left out, as by
+        `remove_outliers`.
+        """
+
+        def is_valid(pollutant):
+            return {
+                "$and": [
+                    {"$gte": [f"${pollutant}.value", 0]},
+                    {"$lte": [f"${pollutant}.value", self.limit_mapper[pollutant]]},
+                ]
+            }
+
+        def valid_value(pollutant):
+            return {"$cond": [is_valid(pollutant), f"${pollutant}.value", None]}
+
+        aggregates = {}
+        for pollutant in ROLLUP_POLLUTANTS:
+            aggregates[f"{pollutant}_sum"] = {"$sum": valid_value(pollutant)}
+            aggregates[f"{pollutant}_count"] = {
+                "$sum": {"$cond": [is_valid(pollutant), 1, 0]}
+            }
+            aggregates[f"{pollutant}_min"] = {"$min": valid_value(pollutant)}
+            aggregates[f"{pollutant}_max"] = {"$max": valid_value(pollutant)}
+
+        return (
+            self.filter_by(**{"values.time": {"$gte": start}})
+            .filter_by(**{"values.frequency": "raw"})
+            .unwind("values")
+            .replace_root("values")
+            .match(time={"$gte": start}, frequency="raw")
+            .group(
+                _id={
+                    "site_id": "$site_id",
+                    "time": {
+                        "$dateFromString": {
+                            "dateString": {
+                                "$dateToString": {
+                                    "format": ROLLUP_BUCKET_FORMATS[frequency],
+                                    "date": "$time",
+                                    "timezone": ROLLUP_TIMEZONE,
+                                }
+                            },
+                            "timezone": ROLLUP_TIMEZONE,
+                        }
+                    },
+                },
+                **aggregates,
+            )
+            .project(
+                _id=0,
+                rollups=[
+                    {
+                        "site_id": "$_id.site_id",
+                        "time": "$_id.time",
+                        "frequency": {"$literal": frequency},
+                        "pollutant": {"$literal": pollutant},
+                        "sum": f"${pollutant}_sum",
+                        "count": f"${pollutant}_count",
+                        "min": f"${pollutant}_min",
+                        "max": f"${pollutant}_max",
+                    }
+                    for pollutant in ROLLUP_POLLUTANTS
+                ],
+            )
+            .unwind("rollups")
+            .replace_root("rollups")
+            .match(count={"$gt": 0})
+            .add_stages(
+                [
+                    {
+                        "$merge": {
+                            "into": ROLLUP_COLLECTION,
+                            "on": ["site_id", "pollutant", "frequency", "time"],
+                            "whenMatched": "replace",
+                            "whenNotMatched": "insert",
+                        }
+                    }
+                ]
+            )
+            .exec()
+        )
+
     def get_d3_chart_events_v2(
         self, sites, start_date, end_date, pollutant, frequency, tenant
     ):
+        return self.get_d3_chart_dataframe(
+            sites, start_date, end_date, pollutant, frequency, tenant
+        ).to_dict(orient="records")
+
+    def get_d3_chart_dataframe(
+        self, sites, start_date, end_date, pollutant, frequency, tenant
+    ) -> pd.DataFrame:
+        """Same data as `get_d3_chart_events_v2`, as a DataFrame"""
         if pollutant not in ["pm2_5", "pm10", "no2", "pm1"]:
             raise Exception("Invalid pollutant")
 
-        columns = [
-            "site_id",
-            "name",
-            "timestamp as time",
-            "description as generated_name",
-            f"{pollutant} as value",
-        ]
+        def fetch_events(sites, start_date, end_date) -> pd.DataFrame:
+            columns = [
+                "site_id",
+                "name",
+                "timestamp as time",
+                "description as generated_name",
+                f"{pollutant} as value",
+            ]
 
-        query = f"""
-          SELECT {', '.join(map(str, columns))} 
-          FROM {self.BIGQUERY_EVENTS}
-          JOIN {self.BIGQUERY_SITES} ON {self.BIGQUERY_SITES}.id = {self.BIGQUERY_EVENTS}.site_id 
-          WHERE  {self.BIGQUERY_EVENTS}.timestamp >= '{start_date}'
-          AND {self.BIGQUERY_EVENTS}.timestamp <= '{end_date}'
-          AND {self.BIGQUERY_EVENTS}.tenant = '{tenant}'
-          AND `airqo-250220.metadata.sites`.id in UNNEST({sites})
-        """
+            query = f"""
+              SELECT {', '.join(map(str, columns))} 
+              FROM {self.BIGQUERY_EVENTS}
+              JOIN {self.BIGQUERY_SITES} ON {self.BIGQUERY_SITES}.id = {self.BIGQUERY_EVENTS}.site_id 
+              WHERE  {self.BIGQUERY_EVENTS}.timestamp >= @start_date
+              AND {self.BIGQUERY_EVENTS}.timestamp <= @end_date
+              AND {self.BIGQUERY_EVENTS}.tenant = @tenant
+              AND {self.BIGQUERY_SITES}.id in UNNEST(@sites)
+            """
+
+            client = bigquery.Client()
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=[
+                    bigquery.ScalarQueryParameter(
+                        "start_date", "TIMESTAMP", start_date.to_pydatetime()
+                    ),
+                    bigquery.ScalarQueryParameter(
+                        "end_date", "TIMESTAMP", end_date.to_pydatetime()
+                    ),
+                    bigquery.ScalarQueryParameter("tenant", "STRING", tenant),
+                    bigquery.ArrayQueryParameter("sites", "STRING", sites),
+                ]
+            )
+            job_config.use_query_cache = True
 
-        client = bigquery.Client()
-        job_config = bigquery.QueryJobConfig()
-        job_config.use_query_cache = True
+            return client.query(query, job_config).result().to_dataframe()
 
-        dataframe = client.query(query, job_config).result().to_dataframe()
+        dataframe = chart_events_cache.get(
+            namespace=f"{tenant}:{pollutant}",
+            entities=sites,
+            start=start_date,
+            end=end_date,
+            fetch=fetch_events,
+        )
         dataframe["value"] = dataframe["value"].apply(lambda x: round(x, 2))
         site_groups = dataframe.groupby("site_id")
 
@@ -1058,9 +947,13 @@ class EventsModel(BasePyMongoModel):
             ave_values["name"] = site_group.iloc[0]["name"]
             ave_values = ave_values.fillna(0)
 
-            data.extend(ave_values.to_dict(orient="records"))
+            data.append(ave_values)
 
-        return data
+        if not data:
+            return pd.DataFrame(
+                columns=["value", "time", "site_id", "generated_name", "name"]
+            )
+        return pd.concat(data, ignore_index=True)
 
     def get_events(self, sites, start_date, end_date, frequency):
         time_format_mapper = {
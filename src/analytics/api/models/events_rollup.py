@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from api.models.base.base_model import BasePyMongoModel
+
+ROLLUP_COLLECTION = "events_rollups"
+ROLLUP_POLLUTANTS = ["pm2_5", "pm10", "no2"]
+ROLLUP_TIMEZONE = "Africa/Kampala"
+
+# Buckets are aligned to hours and days in ROLLUP_TIMEZONE
+ROLLUP_BUCKET_FORMATS = {
+    "hourly": "%Y-%m-%dT%H:00:00",
+    "daily": "%Y-%m-%dT00:00:00",
+}
+ROLLUP_BUCKET_SIZES = {
+    "hourly": timedelta(hours=1),
+    "daily": timedelta(days=1),
+}
+
+# Chart frequencies that can be computed from the rollups, and the rollup they use
+CHART_ROLLUP_FREQUENCIES = {
+    "hourly": "hourly",
+    "diurnal": "hourly",
+    "daily": "daily",
+    "monthly": "daily",
+}
+
+
+def rollup_day_start(time: datetime) -> datetime:
+    """Start, as a naive UTC datetime, of the ROLLUP_TIMEZONE day that contains `time` (naive UTC or aware)"""
+    if time.tzinfo is None:
+        time = pytz.utc.localize(time)
+    local_time = time.astimezone(pytz.timezone(ROLLUP_TIMEZONE))
+    day_start = pytz.timezone(ROLLUP_TIMEZONE).localize(
+        datetime(local_time.year, local_time.month, local_time.day)
+    )
+    return day_start.astimezone(pytz.utc).replace(tzinfo=None)
+
+
+class EventsRollupModel(BasePyMongoModel):
+    """
+    Sum, count, min and max of the raw site readings of each pollutant per site and hour or day. The documents
+    are maintained by `EventsModel.rollup_events`, so that charts of hourly or coarser data do not aggregate the
+    raw events on every request.
+    """
+
+    def __init__(self, tenant):
+        super().__init__(tenant, collection_name=ROLLUP_COLLECTION)
+
+    def create_indexes(self):
+        # Also the key the rollups are merged on
+        self.collection.create_index(
+            [("site_id", 1), ("pollutant", 1), ("frequency", 1), ("time", 1)],
+            unique=True,
+        )
+
+    def get_latest_time(self, frequency):
+        doc = self.collection.find_one(
+            {"frequency": frequency}, sort=[("time", self.DESCENDING)]
+        )
+        return doc["time"] if doc else None
+
+    def chart_values(
+        self, sites, start_date, end_date, pollutant, frequency, time_format
+    ):
+        """
+        Adds the stages that average the rollups of each site over `time_format` periods, in ROLLUP_TIMEZONE, into
+        documents with the site_id, time and value. The buckets that overlap start_date to end_date are used.
+        """
+        rollup_frequency = CHART_ROLLUP_FREQUENCIES[frequency]
+        start = datetime.strptime(start_date, "%Y-%m-%dT%H:%M:%S.%fZ")
+        end = (
+            end_date
+            and datetime.strptime(end_date, "%Y-%m-%dT%H:%M:%S.%fZ")
+            or datetime.now()
+        )
+
+        return (
+            self.match(
+                site_id={"$in": list(self.to_object_ids(sites))},
+                pollutant=pollutant,
+                frequency=rollup_frequency,
+                time={
+                    "$gt": start - ROLLUP_BUCKET_SIZES[rollup_frequency],
+                    "$lt": end,
+                },
+            )
+            .group(
+                _id={
+                    "site_id": {"$toString": "$site_id"},
+                    "time": {
+                        "$dateToString": {
+                            "format": time_format,
+                            "date": "$time",
+                            "timezone": ROLLUP_TIMEZONE,
+                        }
+                    },
+                },
+                sum={"$sum": "$sum"},
+                count={"$sum": "$count"},
+            )
+            .project(
+                _id=0,
+                site_id="$_id.site_id",
+                time="$_id.time",
+                value={"$divide": ["$sum", "$count"]},
+            )
+        )
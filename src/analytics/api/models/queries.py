@@ -0,0 +1,313 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+import pandas as pd
+from google.cloud import bigquery
+
+from api.utils.pollutants.pm_25 import (
+    BIGQUERY_FREQUENCY_MAPPER,
+    WEATHER_FIELDS_MAPPER,
+)
+from config import CONFIGURATIONS
+
+FREQUENCY_BOUNDARIES = {
+    "raw": pd.Timedelta(seconds=1),
+    "hourly": pd.Timedelta(hours=1),
+    "daily": pd.Timedelta(days=1),
+}
+
+BAM_POLLUTANT_COLUMNS = {
+    "pm2_5": ["pm2_5 as pm2_5_raw_value", "pm2_5 as pm2_5_calibrated_value"],
+    "pm10": ["pm10 as pm10_raw_value", "pm10 as pm10_calibrated_value"],
+    "no2": ["no2 as no2_raw_value", "no2 as no2_calibrated_value"],
+}
+
+
+def canonical_ids(ids) -> tuple[str, ...]:
+    """Sorts and de-duplicates a list of ids"""
+    return tuple(sorted({str(_id) for _id in ids or []}))
+
+
+def canonical_date(date, frequency: str, round_up: bool = False) -> datetime:
+    """
+    Converts a date string or datetime to UTC and rounds it to an hour, day or second boundary. Data timestamps
+    fall on these boundaries, so rounding the start of a range up and its end down selects the same rows.
+    """
+    timestamp = pd.Timestamp(date)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("UTC")
+    else:
+        timestamp = timestamp.tz_convert("UTC")
+
+    boundary = FREQUENCY_BOUNDARIES[frequency]
+    if round_up:
+        return timestamp.ceil(boundary).to_pydatetime()
+    return timestamp.floor(boundary).to_pydatetime()
+
+
+@dataclass(frozen=True)
+class DataQueryParameters:
+    """
+    Canonical form of a data download or export request.
+
+    Requests for the same data compare (and print) equal whatever the order of their ids or the precision of their
+    dates, so they share one cache entry and are sent to BigQuery as identical parameterized queries.
+    """
+
+    devices: tuple[str, ...]
+    sites: tuple[str, ...]
+    airqlouds: tuple[str, ...]
+    start_date: datetime
+    end_date: datetime
+    frequency: str
+    pollutants: tuple[str, ...]
+    weather_fields: tuple[str, ...]
+
+    @classmethod
+    def create(
+        cls,
+        devices,
+        sites,
+        airqlouds,
+        start_date,
+        end_date,
+        frequency,
+        pollutants,
+        weather_fields=None,
+    ) -> "DataQueryParameters":
+        if frequency not in BIGQUERY_FREQUENCY_MAPPER:
+            raise Exception("Invalid frequency")
+
+        return cls(
+            devices=canonical_ids(devices),
+            sites=canonical_ids(sites),
+            airqlouds=canonical_ids(airqlouds),
+            start_date=canonical_date(start_date, frequency, round_up=True),
+            end_date=canonical_date(end_date, frequency),
+            frequency=frequency,
+            pollutants=tuple(
+                pollutant
+                for pollutant in sorted(set(pollutants))
+                if pollutant in BIGQUERY_FREQUENCY_MAPPER[frequency]
+            ),
+            weather_fields=tuple(
+                field
+                for field in sorted(set(weather_fields or []))
+                if field in WEATHER_FIELDS_MAPPER
+            ),
+        )
+
+    def bigquery_parameters(self) -> list:
+        return [
+            bigquery.ScalarQueryParameter("start_date", "TIMESTAMP", self.start_date),
+            bigquery.ScalarQueryParameter("end_date", "TIMESTAMP", self.end_date),
+            bigquery.ArrayQueryParameter("devices", "STRING", list(self.devices)),
+            bigquery.ArrayQueryParameter("sites", "STRING", list(self.sites)),
+            bigquery.ArrayQueryParameter("airqlouds", "STRING", list(self.airqlouds)),
+        ]
+
+
+@dataclass(frozen=True)
+class DataQuery:
+    sql: str
+    parameters: DataQueryParameters
+    sorting_cols: tuple[str, ...]
+
+    def job_config(self, **kwargs) -> bigquery.QueryJobConfig:
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=self.parameters.bigquery_parameters(), **kwargs
+        )
+        job_config.use_query_cache = True
+        return job_config
+
+    def wrap(self, sql: str) -> "DataQuery":
+        """Returns a query that selects from this one. `sql` refers to this query as {query}."""
+        return DataQuery(
+            sql=sql.format(query=self.sql),
+            parameters=self.parameters,
+            sorting_cols=self.sorting_cols,
+        )
+
+
+def data_query(parameters: DataQueryParameters) -> DataQuery:
+    """
+    Builds the query shared by data downloads and exports. Ids and dates are passed as query parameters
+    (@devices, @sites, @airqlouds, @start_date and @end_date) and column names only come from the pollutant and
+    weather field mappers.
+    """
+    decimal_places = CONFIGURATIONS.DATA_EXPORT_DECIMAL_PLACES
+    frequency = parameters.frequency
+
+    # Data sources
+    sites_table = f"`{CONFIGURATIONS.BIGQUERY_SITES}`"
+    airqlouds_sites_table = f"`{CONFIGURATIONS.BIGQUERY_AIRQLOUDS_SITES}`"
+    devices_table = f"`{CONFIGURATIONS.BIGQUERY_DEVICES}`"
+    airqlouds_table = f"`{CONFIGURATIONS.BIGQUERY_AIRQLOUDS}`"
+    bam_table = f"`{CONFIGURATIONS.BIGQUERY_BAM_DATA}`"
+    data_table = {
+        "raw": f"`{CONFIGURATIONS.BIGQUERY_RAW_DATA}`",
+        "daily": f"`{CONFIGURATIONS.BIGQUERY_DAILY_DATA}`",
+        "hourly": f"`{CONFIGURATIONS.BIGQUERY_HOURLY_DATA}`",
+    }[frequency]
+
+    sorting_cols = ["site_id", "datetime", "device_name"]
+
+    pollutant_columns = set()
+    bam_pollutant_columns = set()
+    for pollutant in parameters.pollutants:
+        pollutant_columns.update(
+            f"ROUND({data_table}.{mapping}, {decimal_places}) AS {mapping}"
+            for mapping in BIGQUERY_FREQUENCY_MAPPER[frequency][pollutant]
+        )
+        bam_pollutant_columns.update(BAM_POLLUTANT_COLUMNS.get(pollutant, []))
+
+    for field in parameters.weather_fields:
+        weather_mapping = WEATHER_FIELDS_MAPPER[field]
+        pollutant_columns.add(
+            f"ROUND({data_table}.{weather_mapping}, {decimal_places}) AS {weather_mapping}"
+        )
+
+    pollutants_query = (
+        f" SELECT {', '.join(sorted(pollutant_columns))} ,"
+        f" FORMAT_DATETIME('%Y-%m-%d %H:%M:%S', {data_table}.timestamp) AS datetime "
+    )
+    bam_pollutants_query = (
+        f" SELECT {', '.join(sorted(bam_pollutant_columns))} ,"
+        f" FORMAT_DATETIME('%Y-%m-%d %H:%M:%S', {bam_table}.timestamp) AS datetime "
+    )
+
+    if len(parameters.devices) != 0:
+        # Adding device information, start and end times
+        query = (
+            f" {pollutants_query} , "
+            f" {devices_table}.device_id AS device_name , "
+            f" {devices_table}.site_id AS site_id , "
+            f" {devices_table}.tenant AS tenant , "
+            f" {devices_table}.approximate_latitude AS device_latitude , "
+            f" {devices_table}.approximate_longitude  AS device_longitude , "
+            f" FROM {data_table} "
+            f" JOIN {devices_table} ON {devices_table}.device_id = {data_table}.device_id "
+            f" WHERE {data_table}.timestamp >= @start_date "
+            f" AND {data_table}.timestamp <= @end_date "
+            f" AND {devices_table}.device_id IN UNNEST(@devices) "
+        )
+
+        bam_query = (
+            f" {bam_pollutants_query} , "
+            f" {devices_table}.device_id AS device_name , "
+            f" {devices_table}.site_id AS site_id , "
+            f" {devices_table}.tenant AS tenant , "
+            f" {devices_table}.approximate_latitude AS device_latitude , "
+            f" {devices_table}.approximate_longitude  AS device_longitude , "
+            f" FROM {bam_table} "
+            f" JOIN {devices_table} ON {devices_table}.device_id = {bam_table}.device_id "
+            f" WHERE {bam_table}.timestamp >= @start_date "
+            f" AND {bam_table}.timestamp <= @end_date "
+            f" AND {devices_table}.device_id IN UNNEST(@devices) "
+        )
+
+        # Adding site information
+        query = (
+            f" SELECT "
+            f" {sites_table}.name AS site_name , "
+            f" {sites_table}.approximate_latitude AS site_latitude , "
+            f" {sites_table}.approximate_longitude  AS site_longitude , "
+            f" data.* "
+            f" FROM {sites_table} "
+            f" RIGHT JOIN ({query}) data ON data.site_id = {sites_table}.id "
+        )
+
+        bam_query = (
+            f" SELECT "
+            f" {sites_table}.name AS site_name , "
+            f" {sites_table}.approximate_latitude AS site_latitude , "
+            f" {sites_table}.approximate_longitude  AS site_longitude , "
+            f" data.* "
+            f" FROM {sites_table} "
+            f" RIGHT JOIN ({bam_query}) data ON data.site_id = {sites_table}.id "
+        )
+
+        if frequency == "hourly":
+            query = f"{query} UNION ALL {bam_query}"
+
+    elif len(parameters.sites) != 0:
+        # Adding site information, start and end times
+        query = (
+            f" {pollutants_query} , "
+            f" {sites_table}.tenant AS tenant , "
+            f" {sites_table}.id AS site_id , "
+            f" {sites_table}.name AS site_name , "
+            f" {sites_table}.approximate_latitude AS site_latitude , "
+            f" {sites_table}.approximate_longitude  AS site_longitude , "
+            f" {data_table}.device_id AS device_name , "
+            f" FROM {data_table} "
+            f" JOIN {sites_table} ON {sites_table}.id = {data_table}.site_id "
+            f" WHERE {data_table}.timestamp >= @start_date "
+            f" AND {data_table}.timestamp <= @end_date "
+            f" AND {sites_table}.id IN UNNEST(@sites) "
+        )
+
+        # Adding device information
+        query = (
+            f" SELECT "
+            f" {devices_table}.approximate_latitude AS device_latitude , "
+            f" {devices_table}.approximate_longitude  AS device_longitude , "
+            f" {devices_table}.device_id AS device_name , "
+            f" data.* "
+            f" FROM {devices_table} "
+            f" RIGHT JOIN ({query}) data ON data.device_name = {devices_table}.device_id "
+        )
+    else:
+        sorting_cols = ["airqloud_id", "site_id", "datetime", "device_name"]
+
+        meta_data_query = (
+            f" SELECT {airqlouds_sites_table}.tenant , "
+            f" {airqlouds_sites_table}.airqloud_id , "
+            f" {airqlouds_sites_table}.site_id , "
+            f" FROM {airqlouds_sites_table} "
+            f" WHERE {airqlouds_sites_table}.airqloud_id IN UNNEST(@airqlouds) "
+        )
+
+        # Adding airqloud information
+        meta_data_query = (
+            f" SELECT "
+            f" {airqlouds_table}.name  AS airqloud_name , "
+            f" meta_data.* "
+            f" FROM {airqlouds_table} "
+            f" RIGHT JOIN ({meta_data_query}) meta_data ON meta_data.airqloud_id = {airqlouds_table}.id "
+        )
+
+        # Adding site information
+        meta_data_query = (
+            f" SELECT "
+            f" {sites_table}.approximate_latitude AS site_latitude , "
+            f" {sites_table}.approximate_longitude  AS site_longitude , "
+            f" {sites_table}.name  AS site_name , "
+            f" meta_data.* "
+            f" FROM {sites_table} "
+            f" RIGHT JOIN ({meta_data_query}) meta_data ON meta_data.site_id = {sites_table}.id "
+        )
+
+        # Adding device information
+        meta_data_query = (
+            f" SELECT "
+            f" {devices_table}.approximate_latitude AS device_latitude , "
+            f" {devices_table}.approximate_longitude  AS device_longitude , "
+            f" {devices_table}.device_id AS device_name , "
+            f" meta_data.* "
+            f" FROM {devices_table} "
+            f" RIGHT JOIN ({meta_data_query}) meta_data ON meta_data.site_id = {devices_table}.site_id "
+        )
+
+        # Adding start and end times
+        query = (
+            f" {pollutants_query} , "
+            f" meta_data.* "
+            f" FROM {data_table} "
+            f" RIGHT JOIN ({meta_data_query}) meta_data ON meta_data.site_id = {data_table}.site_id "
+            f" WHERE {data_table}.timestamp >= @start_date "
+            f" AND {data_table}.timestamp <= @end_date "
+            f" ORDER BY {data_table}.timestamp "
+        )
+
+    return DataQuery(sql=query, parameters=parameters, sorting_cols=tuple(sorting_cols))
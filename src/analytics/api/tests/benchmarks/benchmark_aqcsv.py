@@ -0,0 +1,130 @@
+"""
+Compares the record based AQCSV download path (DataFrame -> records -> AQCSV records with a per row date
+conversion -> CSV) with `format_dataframe_to_aqcsv` written straight to CSV.
+
+Run from src/analytics with:
+    python -m api.tests.benchmarks.benchmark_aqcsv
+"""
+
+import csv
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from api.utils.data_formatters import format_dataframe_to_aqcsv
+from api.utils.dates import str_to_aqcsv_date_format
+from api.utils.pollutants.pm_25 import (
+    AQCSV_DATA_STATUS_MAPPER,
+    AQCSV_PARAMETER_MAPPER,
+    AQCSV_QC_CODE_MAPPER,
+    AQCSV_UNIT_MAPPER,
+    BIGQUERY_FREQUENCY_MAPPER,
+    FREQUENCY_MAPPER,
+)
+
+ROWS = 1_000_000
+POLLUTANTS = ["pm2_5", "pm10"]
+
+
+def sample_data(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    sites = [f"site_{i}" for i in range(100)]
+    datetimes = pd.date_range(
+        "2023-01-01", periods=rows // len(sites), freq=pd.Timedelta(hours=1)
+    )
+    return pd.DataFrame(
+        {
+            "site_id": np.tile(sites, len(datetimes)),
+            "datetime": np.repeat(
+                datetimes.strftime("%Y-%m-%d %H:%M:%S").to_numpy(), len(sites)
+            ),
+            "pm2_5_calibrated_value": rng.uniform(5, 80, rows).round(2),
+            "pm2_5_raw_value": rng.uniform(5, 80, rows).round(2),
+            "pm10_calibrated_value": rng.uniform(5, 120, rows).round(2),
+            "pm10_raw_value": rng.uniform(5, 120, rows).round(2),
+            "site_latitude": np.tile(
+                rng.uniform(0, 1, len(sites)).round(6), len(datetimes)
+            ),
+            "site_longitude": np.tile(
+                rng.uniform(32, 33, len(sites)).round(6), len(datetimes)
+            ),
+            "device_name": np.tile(sites, len(datetimes)),
+            "frequency": "hourly",
+        }
+    )
+
+
+def legacy_format_to_aqcsv(data: list, pollutants: list, frequency: str) -> list:
+    """`format_to_aqcsv` as it was before the date conversion was vectorised."""
+    pollutant_mappers = BIGQUERY_FREQUENCY_MAPPER.get(frequency)
+
+    dataframe = pd.DataFrame(data)
+    dataframe.rename(
+        columns={"site_latitude": "lat", "site_longitude": "lon"}, inplace=True
+    )
+    dataframe["duration"] = FREQUENCY_MAPPER[frequency]
+    dataframe["poc"] = 1
+    dataframe["qc"] = AQCSV_QC_CODE_MAPPER["averaged"]
+    dataframe["datetime"] = dataframe["datetime"].apply(str_to_aqcsv_date_format)
+
+    for pollutant in pollutants:
+        if pollutant not in pollutant_mappers.keys():
+            continue
+        dataframe[f"parameter_{pollutant}"] = AQCSV_PARAMETER_MAPPER[pollutant]
+        dataframe[f"unit_{pollutant}"] = AQCSV_UNIT_MAPPER[pollutant]
+        dataframe.rename(
+            columns={f"{pollutant}_calibrated_value": f"value_{pollutant}"},
+            inplace=True,
+        )
+        dataframe[f"data_status_{pollutant}"] = AQCSV_DATA_STATUS_MAPPER[
+            f"{pollutant}_calibrated_value"
+        ]
+
+    dataframe.drop(
+        columns=["pm2_5_raw_value", "pm10_raw_value", "device_name", "frequency"],
+        inplace=True,
+    )
+    return dataframe.to_dict("records")
+
+
+def records_format(data: pd.DataFrame) -> list:
+    return legacy_format_to_aqcsv(data.to_dict("records"), POLLUTANTS, "hourly")
+
+
+def records_csv(data: pd.DataFrame) -> str:
+    rows = records_format(data)
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return output.getvalue()
+
+
+def dataframe_format(data: pd.DataFrame) -> pd.DataFrame:
+    return format_dataframe_to_aqcsv(data, POLLUTANTS, "hourly")
+
+
+def dataframe_csv(data: pd.DataFrame) -> str:
+    return dataframe_format(data).to_csv(index=False)
+
+
+def timed(function, data: pd.DataFrame):
+    start = time.perf_counter()
+    result = function(data)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    data = sample_data(ROWS)
+    print(f"rows: {ROWS}, pollutants: {len(POLLUTANTS)}")
+
+    for step, records_function, dataframe_function in [
+        ("format", records_format, dataframe_format),
+        ("format + csv", records_csv, dataframe_csv),
+    ]:
+        _, records_time = timed(records_function, data)
+        _, dataframe_time = timed(dataframe_function, data)
+        print(f"{step}: records {records_time:.3f}s, dataframe {dataframe_time:.3f}s")
+        print(f"{step} speedup: {records_time / dataframe_time:.1f}x")
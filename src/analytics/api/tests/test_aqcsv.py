@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from api.utils.data_formatters import format_dataframe_to_aqcsv, format_to_aqcsv
+
+
+def hourly_data():
+    return pd.DataFrame(
+        {
+            "site_id": ["site_1", "site_2"],
+            "site_name": ["Site 1", "Site 2"],
+            "datetime": ["2021-10-10 00:00:00", "2021-10-10 01:00:00"],
+            "pm2_5_calibrated_value": [1.2, np.nan],
+            "pm2_5_raw_value": [1.5, 1.6],
+            "pm10_calibrated_value": [2.2, 2.3],
+            "pm10_raw_value": [2.5, 2.6],
+            "site_latitude": [0.31, 0.32],
+            "site_longitude": [32.5, 32.6],
+            "device_name": ["device_1", "device_2"],
+            "frequency": ["hourly", "hourly"],
+        }
+    )
+
+
+def test_format_dataframe_to_aqcsv_is_long():
+    aqcsv = format_dataframe_to_aqcsv(hourly_data(), ["pm2_5", "pm10"], "hourly")
+
+    assert list(aqcsv.columns) == [
+        "site_id",
+        "site_name",
+        "datetime",
+        "lat",
+        "lon",
+        "parameter",
+        "value",
+        "unit",
+        "data_status",
+        "duration",
+        "qc",
+        "poc",
+    ]
+    assert aqcsv[["site_id", "datetime", "parameter", "value"]].values.tolist() == [
+        ["site_1", "20211010T0000", 88500, 1.2],
+        ["site_1", "20211010T0000", 85101, 2.2],
+        ["site_2", "20211010T0100", 85101, 2.3],
+    ]
+    assert aqcsv["unit"].tolist() == ["001", "001", "001"]
+    assert aqcsv["data_status"].tolist() == [1, 1, 1]
+    assert (aqcsv["duration"] == 60).all()
+    assert (aqcsv["qc"] == 2).all()
+
+
+def test_format_dataframe_to_aqcsv_matches_format_to_aqcsv():
+    data = hourly_data()
+    wide = pd.DataFrame(format_to_aqcsv(data.to_dict("records"), ["pm10"], "hourly"))
+    aqcsv = format_dataframe_to_aqcsv(data, ["pm10"], "hourly")
+
+    assert aqcsv["datetime"].tolist() == wide["datetime"].tolist()
+    assert aqcsv["value"].tolist() == wide["value_pm10"].tolist()
+    assert aqcsv["parameter"].tolist() == wide["parameter_pm10"].tolist()
+
+
+def test_format_dataframe_to_aqcsv_raw_data():
+    data = pd.DataFrame(
+        {
+            "site_id": ["site_1"],
+            "datetime": ["2021-10-10 00:01:00"],
+            "pm2_5": [3.0],
+            "s1_pm2_5": [2.0],
+            "s2_pm2_5": [4.0],
+        }
+    )
+
+    aqcsv = format_dataframe_to_aqcsv(data, ["pm2_5", "no2"], "raw")
+
+    assert aqcsv.to_dict("records") == [
+        {
+            "site_id": "site_1",
+            "datetime": "20211010T0001",
+            "parameter": 88500,
+            "value": 3.0,
+            "unit": "001",
+            "data_status": 0,
+            "duration": 1,
+            "qc": 4,
+            "poc": 1,
+        }
+    ]
@@ -0,0 +1,133 @@
+import pandas as pd
+import pytest
+
+from api.utils.bucket_cache import TimeBucketCache
+
+
+class DictCache:
+    def __init__(self):
+        self.data = {}
+
+    def get_many(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    def set_many(self, mapping, timeout=None):
+        self.data.update(mapping)
+
+
+class Source:
+    """Hourly readings for two sites, with a gap on 2023-01-03 for site_2."""
+
+    def __init__(self):
+        times = pd.date_range(
+            "2023-01-01", "2023-01-10", freq=pd.Timedelta(hours=1), tz="UTC"
+        )
+        frames = []
+        for site_id in ["site_1", "site_2"]:
+            frames.append(
+                pd.DataFrame(
+                    {"site_id": site_id, "time": times, "value": range(len(times))}
+                )
+            )
+        data = pd.concat(frames, ignore_index=True)
+        gap = (data["site_id"] == "site_2") & (data["time"].dt.day == 3)
+        self.data = data[~gap].reset_index(drop=True)
+        self.calls = []
+
+    def fetch(self, sites, start, end):
+        self.calls.append((tuple(sites), start, end))
+        data = self.data
+        return data[
+            data["site_id"].isin(sites)
+            & (data["time"] >= start)
+            & (data["time"] <= end)
+        ].reset_index(drop=True)
+
+
+@pytest.fixture
+def source():
+    return Source()
+
+
+@pytest.fixture
+def bucket_cache():
+    return TimeBucketCache(
+        DictCache(),
+        prefix="test",
+        entity_column="site_id",
+        time_column="time",
+        settle_time=pd.Timedelta(hours=6),
+    )
+
+
+def sort(data):
+    return data.sort_values(["site_id", "time"]).reset_index(drop=True)
+
+
+def test_result_matches_source(source, bucket_cache):
+    start, end = "2023-01-01T10:30:00.000Z", "2023-01-07T05:00:00.000Z"
+    now = pd.Timestamp("2023-01-07T12:00:00Z")
+
+    for _ in range(2):
+        data = bucket_cache.get(
+            "tenant:pm2_5", ["site_2", "site_1"], start, end, source.fetch, now=now
+        )
+        expected = source.fetch(
+            ["site_1", "site_2"], pd.Timestamp(start), pd.Timestamp(end)
+        )
+        pd.testing.assert_frame_equal(sort(data), sort(expected))
+
+
+def test_closed_buckets_are_only_fetched_once(source, bucket_cache):
+    now = pd.Timestamp("2023-01-07T12:00:00Z")
+    bucket_cache.get(
+        "ns",
+        ["site_1", "site_2"],
+        "2023-01-01",
+        "2023-01-07T12:00:00Z",
+        source.fetch,
+        now,
+    )
+    # closed buckets in one call, plus the live tail
+    assert len(source.calls) == 2
+    assert source.calls[1][1] == pd.Timestamp("2023-01-07T00:00:00Z")
+
+    source.calls.clear()
+    later = pd.Timestamp("2023-01-08T07:00:00Z")
+    bucket_cache.get(
+        "ns",
+        ["site_1", "site_2"],
+        "2023-01-02",
+        "2023-01-08T07:00:00Z",
+        source.fetch,
+        later,
+    )
+    # only the bucket that closed in the meantime and the new live tail are fetched
+    assert [call[1:] for call in source.calls] == [
+        (
+            pd.Timestamp("2023-01-07T00:00:00Z"),
+            pd.Timestamp("2023-01-07T23:59:59.999999Z"),
+        ),
+        (pd.Timestamp("2023-01-08T00:00:00Z"), pd.Timestamp("2023-01-08T07:00:00Z")),
+    ]
+
+
+def test_empty_buckets_are_cached(source, bucket_cache):
+    now = pd.Timestamp("2023-01-09T00:00:00Z")
+    for _ in range(2):
+        data = bucket_cache.get(
+            "ns", ["site_2"], "2023-01-03", "2023-01-03T23:00:00Z", source.fetch, now
+        )
+        assert data.empty
+
+    assert len(source.calls) == 1
+
+
+def test_namespaces_are_separate(source, bucket_cache):
+    now = pd.Timestamp("2023-01-09T00:00:00Z")
+    for namespace in ["airqo:pm2_5", "airqo:pm10", "airqo:pm2_5"]:
+        bucket_cache.get(
+            namespace, ["site_1"], "2023-01-01", "2023-01-02", source.fetch, now
+        )
+
+    assert len(source.calls) == 2
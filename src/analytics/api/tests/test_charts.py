@@ -0,0 +1,67 @@
+import numpy as np
+
+from api.utils.pollutants import (
+    d3_generate_pie_chart_data,
+    generate_pie_chart_data,
+    get_pollutant_category,
+)
+from api.utils.pollutants.pm_25 import categorise_pollutant_values
+
+
+def test_categorise_pollutant_values_matches_get_pollutant_category():
+    values = [-1, 0, 0.1, 12, 12.01, 35.4, 55.4, 100, 150.4, 250.4, 500.4, 500.5]
+
+    for pollutant in ["pm2_5", "pm10", "no2"]:
+        categories, codes = categorise_pollutant_values(values, pollutant)
+
+        assert [categories[code] for code in codes] == [
+            get_pollutant_category(value, pollutant) for value in values
+        ]
+
+
+def test_categorise_pollutant_values_missing_values_are_unknown():
+    categories, codes = categorise_pollutant_values([None, np.nan, 5], "pm2_5")
+
+    assert [categories[code] for code in codes] == ["Unknown", "Unknown", "Good"]
+
+
+def test_generate_pie_chart_data():
+    category_count = generate_pie_chart_data(np.array([5, 6, 20, 600]), "pm2_5")
+
+    assert category_count == {
+        "Good": 2,
+        "Moderate": 1,
+        "UHFSG": 0,
+        "Unhealthy": 0,
+        "VeryUnhealthy": 0,
+        "Hazardous": 0,
+        "Other": 0,
+        "Unknown": 1,
+    }
+    assert "Unknown" not in generate_pie_chart_data([5], "pm2_5")
+
+
+def test_d3_generate_pie_chart_data_counts_per_location():
+    data = d3_generate_pie_chart_data(
+        values=[5, 40, 6, 0],
+        names=["Site B", "Site A", "Site B", "Site A"],
+        pollutant="pm2_5",
+    )
+
+    assert [[item["name"] for item in location][0] for location in data] == [
+        "Site B",
+        "Site A",
+    ]
+    assert {item["category"]: item["value"] for item in data[0]} == {
+        "Good": 2,
+        "Moderate": 0,
+        "UHFSG": 0,
+        "Unhealthy": 0,
+        "VeryUnhealthy": 0,
+        "Hazardous": 0,
+        "Other": 0,
+        "Unknown": 0,
+    }
+    site_a = {item["category"]: item["value"] for item in data[1]}
+    assert site_a["UHFSG"] == 1 and site_a["Unknown"] == 1
+    assert data[1][2]["color"] == "#ee8310"
@@ -0,0 +1,123 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from api.models.data_export import (
+    DataExportFormat,
+    DataExportRequest,
+    DataExportStatus,
+    Frequency,
+)
+from celery_app import data_export_task, export_priority
+
+
+def export_request(request_id: str, user_id: str, day: int) -> DataExportRequest:
+    return DataExportRequest(
+        status=DataExportStatus.SCHEDULED,
+        frequency=Frequency.HOURLY,
+        export_format=DataExportFormat.CSV,
+        request_date=datetime(2023, 1, day),
+        start_date=datetime(2022, 1, 1),
+        end_date=datetime(2022, 12, 31),
+        data_links=[],
+        request_id=request_id,
+        user_id=user_id,
+        sites=["site_1"],
+        devices=[],
+        airqlouds=[],
+        pollutants=["pm2_5"],
+        retries=3,
+        meta_data={},
+    )
+
+
+def test_export_priority():
+    assert export_priority(0) == 0
+    assert export_priority(5 * 10**6) == 0
+    assert export_priority(5 * 10**9) == 3
+    assert export_priority(10**18) == 9
+
+
+@patch("celery_app.data_export_request_task")
+@patch("celery_app.EventsModel")
+@patch("celery_app.DataExportModel")
+def test_data_export_task_dispatches_within_user_limits(
+    data_export_model, events_model, data_export_request_task
+):
+    model = data_export_model.return_value
+    model.get_scheduled_and_failed_requests.return_value = [
+        export_request("request_3", "user_1", 3),
+        export_request("request_1", "user_1", 1),
+        export_request("request_2", "user_1", 2),
+        export_request("request_4", "user_2", 1),
+    ]
+    model.get_processing_requests_per_user.return_value = {"user_1": 1}
+    model.update_requests_status_and_retries.return_value = 2
+    model.estimate_query_bytes.side_effect = [10**11, 10**7]
+
+    with patch("celery_app.Config.DATA_EXPORT_USER_CONCURRENCY", 2):
+        data_export_task()
+
+    (claimed,) = model.update_requests_status_and_retries.call_args.args
+    assert [request.request_id for request in claimed] == ["request_1", "request_4"]
+    assert all(request.status == DataExportStatus.PROCESSING for request in claimed)
+
+    dispatched = [
+        (call.kwargs["args"], call.kwargs["priority"])
+        for call in data_export_request_task.apply_async.call_args_list
+    ]
+    assert dispatched == [(["request_1"], 5), (["request_4"], 1)]
+
+
+@patch("celery_app.data_export_request_task")
+@patch("celery_app.EventsModel")
+@patch("celery_app.DataExportModel")
+def test_data_export_task_puts_back_requests_that_were_not_claimed(
+    data_export_model, events_model, data_export_request_task
+):
+    model = data_export_model.return_value
+    failed_request = export_request("request_2", "user_2", 1)
+    failed_request.status = DataExportStatus.FAILED
+    model.get_scheduled_and_failed_requests.return_value = [
+        export_request("request_1", "user_1", 1),
+        failed_request,
+    ]
+    model.get_processing_requests_per_user.return_value = {}
+    model.update_requests_status_and_retries.return_value = 1
+
+    data_export_task()
+
+    data_export_request_task.apply_async.assert_not_called()
+    (put_back,) = model.update_requests_status_and_retries.call_args.args
+    assert [(request.request_id, request.status) for request in put_back] == [
+        ("request_1", DataExportStatus.SCHEDULED),
+        ("request_2", DataExportStatus.FAILED),
+    ]
+
+
+@patch("celery_app.data_export_request_task")
+@patch("celery_app.EventsModel")
+@patch("celery_app.DataExportModel")
+def test_data_export_task_puts_back_requests_that_were_not_dispatched(
+    data_export_model, events_model, data_export_request_task
+):
+    model = data_export_model.return_value
+    model.get_scheduled_and_failed_requests.return_value = [
+        export_request("request_1", "user_1", 1),
+        export_request("request_2", "user_2", 2),
+    ]
+    model.get_processing_requests_per_user.return_value = {}
+    model.update_requests_status_and_retries.return_value = 2
+    model.estimate_query_bytes.return_value = 0
+    data_export_request_task.apply_async.side_effect = [
+        ConnectionError("Broker unavailable"),
+        None,
+    ]
+
+    data_export_task()
+
+    assert data_export_request_task.apply_async.call_count == 2
+    (put_back,) = model.update_request_status_and_retries.call_args.args
+    model.update_request_status_and_retries.assert_called_once()
+    assert put_back.request_id == "request_1"
+    assert put_back.status == DataExportStatus.SCHEDULED
+    assert put_back.retries == 3
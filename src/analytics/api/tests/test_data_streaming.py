@@ -0,0 +1,44 @@
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+
+from api.utils.data_formatters import dataframes_to_csv, dataframes_to_ndjson
+from api.utils.http import gzip_chunks
+
+
+def pages():
+    return [
+        pd.DataFrame({"site_id": ["site_1", "site_2"], "pm2_5": [1.5, np.nan]}),
+        pd.DataFrame({"site_id": ["site_3"], "pm2_5": [2.5]}),
+    ]
+
+
+def test_dataframes_to_csv_writes_one_header():
+    csv = "".join(dataframes_to_csv(pages()))
+
+    assert csv.splitlines() == [
+        "site_id,pm2_5",
+        "site_1,1.5",
+        "site_2,",
+        "site_3,2.5",
+    ]
+
+
+def test_dataframes_to_ndjson():
+    lines = "".join(dataframes_to_ndjson(pages())).splitlines()
+
+    assert [json.loads(line) for line in lines] == [
+        {"site_id": "site_1", "pm2_5": 1.5},
+        {"site_id": "site_2", "pm2_5": None},
+        {"site_id": "site_3", "pm2_5": 2.5},
+    ]
+
+
+def test_gzip_chunks_is_one_gzip_stream():
+    chunks = list(dataframes_to_csv(pages()))
+
+    compressed = b"".join(gzip_chunks(iter(chunks)))
+
+    assert gzip.decompress(compressed).decode("utf-8") == "".join(chunks)
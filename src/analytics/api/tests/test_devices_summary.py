@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from api.utils.data_formatters import compute_devices_summary
+
+
+def hourly_data():
+    return pd.DataFrame(
+        {
+            "device": ["device_1", "device_1", "device_1", "device_1", "device_2"],
+            "site_id": ["site_1", "site_1", "site_1", "site_1", "site_2"],
+            "timestamp": [
+                "2023-01-01 00:00:00",
+                "2023-01-01 01:00:00",
+                "2023-01-01 01:00:00",
+                "2023-01-02 05:00:00",
+                "2023-01-01 03:00:00",
+            ],
+            "pm2_5_calibrated_value": [10.0, np.nan, np.nan, 12.0, np.nan],
+            "pm2_5_raw_value": [11.0, 13.0, 13.0, 14.0, 15.0],
+        }
+    )
+
+
+def test_compute_devices_summary_one_row_per_device_site_and_day():
+    summary = compute_devices_summary(hourly_data())
+
+    assert summary.to_dict("records") == [
+        {
+            "timestamp": pd.Timestamp("2023-01-01"),
+            "device": "device_1",
+            "site_id": "site_1",
+            "hourly_records": 2,
+            "calibrated_records": 1,
+            "uncalibrated_records": 1,
+            "calibrated_percentage": 50.0,
+            "uncalibrated_percentage": 50.0,
+        },
+        {
+            "timestamp": pd.Timestamp("2023-01-02"),
+            "device": "device_1",
+            "site_id": "site_1",
+            "hourly_records": 1,
+            "calibrated_records": 1,
+            "uncalibrated_records": 0,
+            "calibrated_percentage": 100.0,
+            "uncalibrated_percentage": 0.0,
+        },
+        {
+            "timestamp": pd.Timestamp("2023-01-01"),
+            "device": "device_2",
+            "site_id": "site_2",
+            "hourly_records": 1,
+            "calibrated_records": 0,
+            "uncalibrated_records": 1,
+            "calibrated_percentage": 0.0,
+            "uncalibrated_percentage": 100.0,
+        },
+    ]
+
+
+def test_compute_devices_summary_does_not_modify_data():
+    data = hourly_data()
+    compute_devices_summary(data)
+
+    pd.testing.assert_frame_equal(data, hourly_data())
+
+
+def test_compute_devices_summary_empty_data():
+    summary = compute_devices_summary(pd.DataFrame())
+
+    assert summary.empty
+    assert "hourly_records" in summary.columns
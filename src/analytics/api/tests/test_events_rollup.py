@@ -0,0 +1,51 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import pytz
+
+from api.models import EventsModel
+from api.models.events_rollup import EventsRollupModel, rollup_day_start
+
+
+def test_rollup_day_start_is_start_of_kampala_day():
+    assert rollup_day_start(datetime(2023, 1, 1, 20, 59)) == datetime(2022, 12, 31, 21)
+    assert rollup_day_start(datetime(2023, 1, 1, 21, 0)) == datetime(2023, 1, 1, 21)
+    assert rollup_day_start(
+        pytz.timezone("Africa/Kampala").localize(datetime(2023, 1, 2, 0, 30))
+    ) == datetime(2023, 1, 1, 21)
+
+
+def test_rollup_events_merges_into_rollups():
+    with patch.object(EventsModel, "aggregate", return_value=[]) as aggregate:
+        EventsModel("airqo").rollup_events(
+            start=datetime(2022, 12, 31, 21), frequency="daily"
+        )
+
+    (stages,) = aggregate.call_args.args
+    group = next(stage["$group"] for stage in stages if "$group" in stage)
+    assert {"pm2_5_sum", "pm2_5_count", "pm2_5_min", "pm2_5_max"} <= set(group)
+    assert stages[-1]["$merge"] == {
+        "into": "events_rollups",
+        "on": ["site_id", "pollutant", "frequency", "time"],
+        "whenMatched": "replace",
+        "whenNotMatched": "insert",
+    }
+
+
+def test_chart_values_reads_overlapping_buckets():
+    model = EventsRollupModel("airqo")
+    model.chart_values(
+        sites=["5f2036bc70223655545a8b26"],
+        start_date="2023-01-01T00:00:00.000Z",
+        end_date="2023-01-08T00:00:00.000Z",
+        pollutant="pm2_5",
+        frequency="monthly",
+        time_format="%Y-%m-01",
+    )
+
+    match = model.stages[0]["$match"]
+    assert match["frequency"] == "daily"
+    assert match["time"] == {
+        "$gt": datetime(2022, 12, 31),
+        "$lt": datetime(2023, 1, 8),
+    }
@@ -0,0 +1,90 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from api.models.queries import DataQueryParameters, canonical_date, data_query
+
+
+def parameters(**kwargs):
+    request = {
+        "devices": [],
+        "sites": ["site_2", "site_1", "site_2"],
+        "airqlouds": [],
+        "start_date": "2023-01-01T10:30:00.000Z",
+        "end_date": "2023-01-02T10:30:00.000Z",
+        "frequency": "hourly",
+        "pollutants": ["pm10", "pm2_5"],
+        "weather_fields": None,
+    }
+    request.update(kwargs)
+    return DataQueryParameters.create(**request)
+
+
+def test_equivalent_requests_are_canonicalized():
+    first = parameters()
+    second = parameters(
+        sites=["site_1", "site_2"],
+        start_date=datetime(2023, 1, 1, 10, 45),
+        end_date="2023-01-02T10:59:59.000Z",
+        pollutants=["pm2_5", "pm10", "pm2_5"],
+    )
+
+    assert first == second
+    assert repr(first) == repr(second)
+    assert first.sites == ("site_1", "site_2")
+    assert data_query(first).sql == data_query(second).sql
+
+
+def test_dates_are_rounded_inside_the_range():
+    assert canonical_date(
+        "2023-01-01T10:30:00.000Z", "hourly", round_up=True
+    ) == datetime(2023, 1, 1, 11, tzinfo=timezone.utc)
+    assert canonical_date("2023-01-01T10:30:00.000Z", "daily") == datetime(
+        2023, 1, 1, tzinfo=timezone.utc
+    )
+    assert canonical_date(datetime(2023, 1, 1, 10, 30, 5, 500), "raw") == datetime(
+        2023, 1, 1, 10, 30, 5, tzinfo=timezone.utc
+    )
+
+
+def test_ids_and_dates_are_query_parameters():
+    malicious_site = "site_1') OR TRUE --"
+    query = data_query(parameters(sites=[malicious_site]))
+
+    assert malicious_site not in query.sql
+    assert "IN UNNEST(@sites)" in query.sql
+    assert "@start_date" in query.sql and "@end_date" in query.sql
+
+    job_config = query.job_config()
+    values = {
+        parameter.name: getattr(parameter, "value", None)
+        or getattr(parameter, "values", None)
+        for parameter in job_config.query_parameters
+    }
+    assert values["sites"] == [malicious_site]
+    assert values["start_date"] == datetime(2023, 1, 1, 11, tzinfo=timezone.utc)
+    assert job_config.use_query_cache
+
+
+def test_unknown_pollutants_and_weather_fields_are_ignored():
+    query_parameters = parameters(
+        pollutants=["pm2_5", "co2"], weather_fields=["humidity", "x) AS y"]
+    )
+
+    assert query_parameters.pollutants == ("pm2_5",)
+    assert query_parameters.weather_fields == ("humidity",)
+    assert "device_humidity" in data_query(query_parameters).sql
+
+
+def test_invalid_frequency():
+    with pytest.raises(Exception, match="Invalid frequency"):
+        parameters(frequency="monthly")
+
+
+def test_wrap_keeps_parameters():
+    query = data_query(parameters())
+    wrapped = query.wrap("select distinct * from ({query})")
+
+    assert wrapped.sql == f"select distinct * from ({query.sql})"
+    assert wrapped.parameters == query.parameters
+    assert wrapped.sorting_cols == ("site_id", "datetime", "device_name")
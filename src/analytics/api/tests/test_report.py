@@ -0,0 +1,151 @@
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from api.utils.pollutants.report import (
+    PManalysis,
+    REPORT_AGGREGATES,
+    aggregate_pm,
+    convert_utc_to_local,
+    get_timezone,
+    results_to_dataframe,
+)
+
+KAMPALA = (0.3476, 32.5825)
+LAGOS = (6.5244, 3.3792)
+
+
+def test_convert_utc_to_local_single_timezone():
+    timestamps = pd.Series(
+        pd.to_datetime(["2023-01-01 00:00:00", "2023-01-01 01:00:00"], utc=True),
+        index=[3, 5],
+    )
+
+    local_times = convert_utc_to_local(timestamps, [KAMPALA[0]] * 2, [KAMPALA[1]] * 2)
+
+    assert str(local_times.dt.tz) == "Africa/Kampala"
+    assert list(local_times.index) == [3, 5]
+    assert list(local_times.dt.hour) == [3, 4]
+
+
+def test_convert_utc_to_local_mixed_timezones():
+    timestamps = pd.to_datetime(["2023-01-01 00:00:00"] * 3, utc=True)
+
+    local_times = convert_utc_to_local(
+        timestamps,
+        [KAMPALA[0], LAGOS[0], KAMPALA[0]],
+        [KAMPALA[1], LAGOS[1], KAMPALA[1]],
+    )
+
+    assert [local_time.hour for local_time in local_times] == [3, 1, 3]
+    assert [str(local_time.tzinfo) for local_time in local_times] == [
+        "Africa/Kampala",
+        "Africa/Lagos",
+        "Africa/Kampala",
+    ]
+
+
+def test_convert_utc_to_local_looks_up_each_site_once():
+    get_timezone.cache_clear()
+    timestamps = pd.Series(
+        pd.date_range("2023-01-01", periods=48, freq="60min", tz="UTC")
+    )
+
+    with patch(
+        "api.utils.pollutants.report.get_timezone_finder"
+    ) as get_timezone_finder:
+        get_timezone_finder.return_value.timezone_at.return_value = "Africa/Kampala"
+        convert_utc_to_local(timestamps, [KAMPALA[0]] * 48, [KAMPALA[1]] * 48)
+        convert_utc_to_local(timestamps, [KAMPALA[0]] * 48, [KAMPALA[1]] * 48)
+
+    get_timezone_finder.return_value.timezone_at.assert_called_once()
+    get_timezone.cache_clear()
+
+
+def report_data():
+    timestamps = pd.date_range(
+        "2023-12-31 20:00", periods=12, freq="3h", tz="Africa/Kampala"
+    )
+    data = pd.DataFrame(
+        {
+            "site_id": ["site_1", "site_2", "site_3"] * 4,
+            "timestamp": timestamps,
+            "site_name": ["Site 1", "Site 2", "Site 3"] * 4,
+            "site_latitude": [0.31, 0.32, 0.33] * 4,
+            "site_longitude": [32.5, 32.6, 32.7] * 4,
+            "country": "Uganda",
+            "region": ["Central", "Central", None] * 4,
+            "city": ["Kampala", "Wakiso", "Kampala"] * 4,
+            "county": "County",
+            "pm2_5_raw_value": np.arange(12, dtype=float),
+            "pm2_5_calibrated_value": [1.5, np.nan, np.nan] * 4,
+            "pm10_raw_value": np.arange(12, dtype=float) * 2,
+            "pm10_calibrated_value": np.arange(12, dtype=float) / 3,
+        }
+    )
+    return data
+
+
+def test_aggregate_pm_matches_pm_analysis():
+    data = report_data()
+    processed_data = results_to_dataframe(data)
+    expected = {
+        "diurnal": PManalysis.mean_pm2_5_by_hour(processed_data),
+        "annual_pm": PManalysis.mean_pm2_5_by_year(processed_data),
+        "monthly_pm": PManalysis.mean_pm2_5_by_month(processed_data),
+        "pm_by_month_name": PManalysis.mean_pm2_5_by_month_name(processed_data),
+        "site_monthly_mean_pm": PManalysis.monthly_mean_pm_site_name(processed_data),
+        "site_mean_pm": PManalysis.mean_pm2_5_by_site_name(processed_data),
+        "mean_pm_by_city": PManalysis.pm_by_city(processed_data),
+        "mean_pm_by_region": PManalysis.pm_by_region(processed_data),
+        "mean_pm_by_day_hour": PManalysis.pm_day_hour_name(processed_data),
+    }
+
+    aggregates = aggregate_pm(data, REPORT_AGGREGATES)
+
+    for name, result in expected.items():
+        result = result.astype(object).where(result.notna(), None)
+        assert aggregates[name] == result.to_dict(orient="records"), name
+
+
+def test_aggregate_pm_formats_dates_and_missing_values():
+    aggregates = aggregate_pm(report_data(), REPORT_AGGREGATES)
+
+    assert [row["date"] for row in aggregates["daily_mean_pm"]] == [
+        "2023-12-31",
+        "2024-01-01",
+        "2024-01-02",
+    ]
+    assert aggregates["datetime_mean_pm"][0]["timestamp"] == "2023-12-31 20:00 EAT"
+    assert aggregates["site_mean_pm"][-1]["pm2_5_calibrated_value"] is None
+    assert aggregate_pm(report_data().iloc[0:0], REPORT_AGGREGATES)["diurnal"] == []
+
+
+def test_aggregate_pm_mixed_timezones():
+    data = report_data().iloc[:3]
+    data = data.assign(
+        site_latitude=[KAMPALA[0], LAGOS[0], KAMPALA[0]],
+        site_longitude=[KAMPALA[1], LAGOS[1], KAMPALA[1]],
+        timestamp=convert_utc_to_local(
+            pd.to_datetime(
+                ["2023-12-31 23:00", "2023-12-31 23:00", "2024-01-01 00:00"], utc=True
+            ),
+            [KAMPALA[0], LAGOS[0], KAMPALA[0]],
+            [KAMPALA[1], LAGOS[1], KAMPALA[1]],
+        ),
+    )
+
+    aggregates = aggregate_pm(data, REPORT_AGGREGATES)
+
+    assert [(row["hour"], row["pm2_5_raw_value"]) for row in aggregates["diurnal"]] == [
+        (0, 1.0),
+        (2, 0.0),
+        (3, 2.0),
+    ]
+    assert [row["timestamp"] for row in aggregates["datetime_mean_pm"]] == [
+        "2024-01-01 02:00 EAT",
+        "2024-01-01 00:00 WAT",
+        "2024-01-01 03:00 EAT",
+    ]
+    assert [row["date"] for row in aggregates["daily_mean_pm"]] == ["2024-01-01"]
@@ -0,0 +1,136 @@
+from typing import Callable
+
+import pandas as pd
+
+
+def to_utc_timestamp(date) -> pd.Timestamp:
+    """Converts a date string or datetime to a UTC timestamp. Naive dates are taken to be in UTC."""
+    timestamp = pd.Timestamp(date)
+    if timestamp.tzinfo is None:
+        return timestamp.tz_localize("UTC")
+    return timestamp.tz_convert("UTC")
+
+
+class TimeBucketCache:
+    """
+    Caches time series rows per entity (e.g. site) in fixed size time buckets.
+
+    A requested range is split into closed buckets, which end at least `settle_time` before now and whose data no
+    longer changes, and a live tail that covers the rest of the range. Closed buckets are read from the cache and
+    only the missing ones are fetched, in one call, and stored with `timeout` (0 keeps them indefinitely). The
+    live tail is always fetched. The result is stitched together and trimmed to the requested range, so moving
+    windows such as "the last 7 days" only query their newest data.
+    """
+
+    def __init__(
+        self,
+        cache,
+        prefix: str,
+        entity_column: str,
+        time_column: str,
+        bucket_size: pd.Timedelta = pd.Timedelta(days=1),
+        settle_time: pd.Timedelta = pd.Timedelta(hours=6),
+        timeout: int = 0,
+    ):
+        self.cache = cache
+        self.prefix = prefix
+        self.entity_column = entity_column
+        self.time_column = time_column
+        self.bucket_size = bucket_size
+        self.settle_time = settle_time
+        self.timeout = timeout
+
+    def __key(self, namespace: str, entity: str, bucket: pd.Timestamp) -> str:
+        return f"{self.prefix}:{namespace}:{entity}:{bucket.isoformat()}"
+
+    def closed_buckets(self, start, end, now=None) -> list[pd.Timestamp]:
+        """Start times of the closed buckets that overlap start to end."""
+        start, end = to_utc_timestamp(start), to_utc_timestamp(end)
+        now = to_utc_timestamp(now) if now is not None else pd.Timestamp.now(tz="UTC")
+
+        closed_until = (now - self.settle_time).floor(self.bucket_size)
+        cached_end = min(closed_until, end.floor(self.bucket_size) + self.bucket_size)
+        return list(
+            pd.date_range(
+                start.floor(self.bucket_size),
+                cached_end,
+                freq=self.bucket_size,
+                inclusive="left",
+            )
+        )
+
+    def get(
+        self,
+        namespace: str,
+        entities: list,
+        start,
+        end,
+        fetch: Callable[[list, pd.Timestamp, pd.Timestamp], pd.DataFrame],
+        now=None,
+    ) -> pd.DataFrame:
+        """
+        Returns the rows of `entities` with start <= time <= end.
+
+        Args:
+            namespace: Distinguishes series of the same entity, e.g. the tenant and pollutant.
+            entities: Entity ids.
+            start: Start of the range.
+            end: End of the range, inclusive.
+            fetch: Called as fetch(entities, start, end) to load rows with start <= time <= end from the source.
+            now: Current time, used to decide which buckets are closed.
+        """
+        start, end = to_utc_timestamp(start), to_utc_timestamp(end)
+        entities = sorted({str(entity) for entity in entities})
+        if not entities or start > end:
+            return fetch(entities, start, end)
+
+        buckets = self.closed_buckets(start, end, now)
+        frames = []
+
+        if buckets:
+            keys = {
+                (entity, bucket): self.__key(namespace, entity, bucket)
+                for entity in entities
+                for bucket in buckets
+            }
+            cached = dict(zip(keys, self.cache.get_many(*keys.values())))
+            frames.extend(data for data in cached.values() if data is not None)
+
+            missing = [
+                entity_bucket for entity_bucket, data in cached.items() if data is None
+            ]
+            if missing:
+                missing_start = min(bucket for _, bucket in missing)
+                missing_end = max(bucket for _, bucket in missing) + self.bucket_size
+                fetched = fetch(
+                    sorted({entity for entity, _ in missing}),
+                    missing_start,
+                    missing_end - pd.Timedelta(microseconds=1),
+                )
+
+                time = pd.to_datetime(fetched[self.time_column], utc=True)
+                groups = dict(
+                    list(
+                        fetched.groupby(
+                            [
+                                fetched[self.entity_column].astype(str),
+                                time.dt.floor(self.bucket_size),
+                            ]
+                        )
+                    )
+                )
+                # Empty buckets are stored too, so that they are not fetched again
+                new_buckets = {
+                    keys[entity_bucket]: groups.get(entity_bucket, fetched.iloc[0:0])
+                    for entity_bucket in missing
+                }
+                self.cache.set_many(new_buckets, timeout=self.timeout)
+                frames.extend(new_buckets.values())
+
+        tail_start = buckets[-1] + self.bucket_size if buckets else start
+        if tail_start <= end:
+            frames.append(fetch(entities, max(tail_start, start), end))
+
+        data = pd.concat(frames, ignore_index=True)
+        time = pd.to_datetime(data[self.time_column], utc=True)
+        return data[(time >= start) & (time <= end)].reset_index(drop=True)
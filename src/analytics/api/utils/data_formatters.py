@@ -1,10 +1,10 @@
 from enum import Enum
-from typing import Any
+from typing import Any, Iterable, Iterator
 
+import numpy as np
 import pandas as pd
 import requests
 
-from api.utils.dates import str_to_aqcsv_date_format
 from api.utils.pollutants.pm_25 import (
     AQCSV_PARAMETER_MAPPER,
     FREQUENCY_MAPPER,
@@ -22,48 +22,47 @@ class Entity(Enum):
 
 
 def compute_devices_summary(data: pd.DataFrame) -> pd.DataFrame:
-    devices_summary = pd.DataFrame()
-    data["timestamp"] = pd.to_datetime(data["timestamp"])
-    data.drop_duplicates(subset=["device", "timestamp"], inplace=True)
-    data.index = data["timestamp"]
-
-    for _, by_device in data.groupby("device"):
-        for _, by_timestamp in by_device.groupby(pd.Grouper(key="timestamp", freq="D")):
-            device_data = pd.DataFrame(by_timestamp)
-            device_data["timestamp"] = pd.to_datetime(
-                device_data["timestamp"].dt.strftime("%Y-%m-%d")
-            )
-            device_data["hourly_records"] = int(len(device_data.index))
-            device_data["calibrated_records"] = int(
-                device_data.pm2_5_calibrated_value.count()
-            )
-            device_data["uncalibrated_records"] = int(
-                device_data.pm2_5_calibrated_value.isna().sum()
-            )
-            device_data["calibrated_percentage"] = (
-                device_data["calibrated_records"] / device_data["hourly_records"]
-            ) * 100
-            device_data["uncalibrated_percentage"] = (
-                device_data["uncalibrated_records"] / device_data["hourly_records"]
-            ) * 100
-            device_data = device_data[
-                [
-                    "timestamp",
-                    "device",
-                    "site_id",
-                    "hourly_records",
-                    "calibrated_records",
-                    "uncalibrated_records",
-                    "calibrated_percentage",
-                    "uncalibrated_percentage",
-                ]
-            ]
-            device_data["hourly_records"] = device_data["hourly_records"].astype(int)
-            devices_summary = pd.concat(
-                [devices_summary, device_data], ignore_index=True
-            )
+    """
+    Summarises hourly data into one row per device, site and day, with the number of hourly records and how many
+    of them are calibrated.
+    """
+    columns = [
+        "timestamp",
+        "device",
+        "site_id",
+        "hourly_records",
+        "calibrated_records",
+        "uncalibrated_records",
+        "calibrated_percentage",
+        "uncalibrated_percentage",
+    ]
+    if data.empty:
+        return pd.DataFrame(columns=columns)
 
-    return devices_summary
+    data = data.assign(timestamp=pd.to_datetime(data["timestamp"]))
+    data = data.drop_duplicates(subset=["device", "timestamp"])
+
+    devices_summary = (
+        data.groupby(
+            ["device", "site_id", data["timestamp"].dt.floor("D")], dropna=False
+        )
+        .agg(
+            hourly_records=("pm2_5_calibrated_value", "size"),
+            calibrated_records=("pm2_5_calibrated_value", "count"),
+        )
+        .reset_index()
+    )
+    devices_summary["uncalibrated_records"] = (
+        devices_summary["hourly_records"] - devices_summary["calibrated_records"]
+    )
+    devices_summary["calibrated_percentage"] = (
+        devices_summary["calibrated_records"] / devices_summary["hourly_records"]
+    ) * 100
+    devices_summary["uncalibrated_percentage"] = (
+        devices_summary["uncalibrated_records"] / devices_summary["hourly_records"]
+    ) * 100
+
+    return devices_summary[columns]
 
 
 def compute_airqloud_summary(
@@ -194,14 +193,14 @@ def compute_airqloud_summary(
 
 
 def format_to_aqcsv(
-    data: list, pollutants: list, frequency: str
+    data: list | pd.DataFrame, pollutants: list, frequency: str
 ) -> list[Any] | list[dict]:
     # Compulsory fields : site, datetime, parameter, duration, value, unit, qc, poc, data_status,
     # Optional fields : lat, lon,
 
     pollutant_mappers = BIGQUERY_FREQUENCY_MAPPER.get(frequency)
 
-    dataframe = pd.DataFrame(data)
+    dataframe = data.copy() if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
     if dataframe.empty:
         return []
     dataframe.rename(
@@ -220,7 +219,7 @@ def format_to_aqcsv(
         if frequency != "raw"
         else AQCSV_QC_CODE_MAPPER["estimated"]
     )
-    dataframe["datetime"] = dataframe["datetime"].apply(str_to_aqcsv_date_format)
+    dataframe["datetime"] = aqcsv_datetime(dataframe["datetime"])
 
     for pollutant in pollutants:
         if pollutant not in pollutant_mappers.keys():
@@ -260,6 +259,112 @@ def format_to_aqcsv(
     return dataframe.to_dict("records")
 
 
+def aqcsv_datetime(datetimes: pd.Series) -> pd.Series:
+    """
+    Converts '%Y-%m-%d %H:%M:%S' strings (or datetimes) to the AQCSV '%Y%m%dT%H%M' format. Each distinct value is
+    only formatted once, as exports repeat the same timestamps across many sites.
+    """
+    codes, uniques = pd.factorize(datetimes)
+    formatted = pd.to_datetime(uniques, format="%Y-%m-%d %H:%M:%S").strftime(
+        "%Y%m%dT%H%M"
+    )
+    # missing values have code -1, which picks the trailing None
+    formatted = np.append(np.asarray(formatted, dtype=object), None)
+    return pd.Series(formatted[codes], index=datetimes.index)
+
+
+def format_dataframe_to_aqcsv(
+    dataframe: pd.DataFrame, pollutants: list, frequency: str
+) -> pd.DataFrame:
+    """
+    Converts downloaded data to the long AQCSV layout, with one row per site, datetime and parameter.
+
+    The value of each pollutant is taken from the first of its BIGQUERY_FREQUENCY_MAPPER columns that is present,
+    i.e. the calibrated value for hourly and daily data and the sensor average for raw data. Readings without a
+    value are left out.
+    """
+    pollutant_mappers = BIGQUERY_FREQUENCY_MAPPER.get(frequency)
+    value_columns = {}
+    for pollutant in pollutants:
+        columns = [
+            column
+            for column in pollutant_mappers.get(pollutant, [])
+            if column in dataframe.columns
+        ]
+        if columns:
+            value_columns[columns[0]] = pollutant
+
+    excluded_columns = {
+        column
+        for pollutant in pollutant_mappers.values()
+        for column in pollutant
+        if column in dataframe.columns
+    }
+    excluded_columns.update(
+        [
+            "device_name",
+            "tenant",
+            "device_latitude",
+            "device_longitude",
+            "frequency",
+        ]
+    )
+    id_columns = [
+        column for column in dataframe.columns if column not in excluded_columns
+    ]
+
+    if dataframe.empty or not value_columns:
+        return pd.DataFrame(
+            columns=id_columns
+            + ["parameter", "value", "unit", "data_status", "duration", "qc", "poc"]
+        ).rename(columns={"site_latitude": "lat", "site_longitude": "lon"})
+
+    if "datetime" in id_columns:
+        dataframe = dataframe.assign(datetime=aqcsv_datetime(dataframe["datetime"]))
+
+    aqcsv = dataframe.melt(
+        id_vars=id_columns,
+        value_vars=list(value_columns),
+        var_name="parameter",
+        value_name="value",
+        ignore_index=False,
+    )
+    # melt stacks pollutants one after the other; restore the row order of the input
+    aqcsv = aqcsv.sort_index(kind="stable").reset_index(drop=True)
+    aqcsv.dropna(subset=["value"], inplace=True)
+
+    aqcsv["data_status"] = aqcsv["parameter"].map(AQCSV_DATA_STATUS_MAPPER)
+    pollutant = aqcsv["parameter"].map(value_columns)
+    aqcsv["parameter"] = pollutant.map(AQCSV_PARAMETER_MAPPER)
+    aqcsv.insert(
+        aqcsv.columns.get_loc("value") + 1, "unit", pollutant.map(AQCSV_UNIT_MAPPER)
+    )
+    aqcsv["duration"] = FREQUENCY_MAPPER[frequency]
+    aqcsv["qc"] = (
+        AQCSV_QC_CODE_MAPPER["averaged"]
+        if frequency != "raw"
+        else AQCSV_QC_CODE_MAPPER["estimated"]
+    )
+    aqcsv["poc"] = 1
+
+    return aqcsv.rename(columns={"site_latitude": "lat", "site_longitude": "lon"})
+
+
+def dataframes_to_csv(dataframes: Iterable[pd.DataFrame]) -> Iterator[str]:
+    """Serializes pages of a result to CSV text, one chunk per page. The header is only written for the first page."""
+    header = True
+    for dataframe in dataframes:
+        yield dataframe.to_csv(index=False, header=header)
+        header = False
+
+
+def dataframes_to_ndjson(dataframes: Iterable[pd.DataFrame]) -> Iterator[str]:
+    """Serializes pages of a result to newline delimited JSON, one chunk per page. Missing values become null."""
+    for dataframe in dataframes:
+        records = dataframe.to_json(orient="records", lines=True, date_format="iso")
+        yield records.rstrip("\n") + "\n"
+
+
 def tenant_to_str(tenant: str) -> str:
     try:
         if tenant.lower() == "airqo":
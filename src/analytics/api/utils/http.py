@@ -1,3 +1,9 @@
+import zlib
+from typing import Iterable, Iterator
+
+from flask import Response
+
+
 class Status:
     # informational
     HTTP_100_CONTINUE = 100
@@ -85,3 +91,33 @@ def create_response(message, data=None, success=True):
     }
 
     return response
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Compresses a stream of text chunks into a single gzip stream"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode("utf-8"))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def create_streaming_response(
+    chunks: Iterable[str], mimetype: str, file_name: str, compress: bool = True
+) -> Response:
+    """Function to create an http response that sends the chunks as they are generated, as a file attachment"""
+
+    headers = {
+        "Content-Disposition": f"attachment; filename={file_name}",
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+        chunks = gzip_chunks(chunks)
+    else:
+        chunks = (chunk.encode("utf-8") for chunk in chunks)
+
+    return Response(
+        chunks, status=Status.HTTP_200_OK, mimetype=mimetype, headers=headers
+    )
@@ -1,95 +1,83 @@
-from collections import defaultdict
+import numpy as np
+import pandas as pd
 
-from .pm_25 import get_pollutant_category, PM_COLOR_CATEGORY
+from .pm_25 import categorise_pollutant_values, PM_COLOR_CATEGORY
 
 
-def generate_pie_chart_data(records, key, pollutant):
+def count_pollutant_categories(values, pollutant, locations=None):
     """
-    Function to generate pie_chart data
+    Function to count pollutant values per category and location with a single np.bincount
     Args:
-        records (list): list of pollutant objects (dict)
-        key (str): a dict key to obtain the pollutant value from the record
+        values (array-like): pollutant values
         pollutant (str): string representing the pollutant
+        locations (array-like): location of each value, all values are counted together if not given
 
-    Returns: a dict containing the category count
+    Returns: the locations in order of appearance, the category names and a
+        (locations x categories) array of counts
     """
-    category_count = defaultdict(int)
-
-    category_count.update(
-        {
-            "Good": 0,
-            "Moderate": 0,
-            "UHFSG": 0,
-            "Unhealthy": 0,
-            "VeryUnhealthy": 0,
-            "Hazardous": 0,
-            "Other": 0,
-        }
-    )
-
-    for record in records:
-        value = record[key]
-        category = get_pollutant_category(value, pollutant=pollutant)
-        category_count[category] = category_count[category] + 1
-
-    return category_count
-
+    categories, category_codes = categorise_pollutant_values(values, pollutant)
+
+    if locations is None:
+        location_codes = np.zeros(len(category_codes), dtype=int)
+        location_names = [None]
+    else:
+        location_codes, location_names = pd.factorize(
+            np.asarray(locations, dtype=object), use_na_sentinel=False
+        )
 
-def _destructure_pie_data(generated_data):
-    result = []
-    for data in generated_data:
-        destructured = []
-        name = data.pop("name")
-        for key in data.keys():
-            destructured.append(
-                {
-                    "name": name,
-                    "category": key,
-                    "color": PM_COLOR_CATEGORY.get(key, "#808080"),
-                    "value": data[key],
-                }
-            )
-        result.append(destructured)
+    counts = np.bincount(
+        location_codes * len(categories) + category_codes,
+        minlength=len(location_names) * len(categories),
+    ).reshape(len(location_names), len(categories))
 
-    return result
+    return list(location_names), categories, counts
 
 
-def d3_generate_pie_chart_data(records, pollutant):
+def generate_pie_chart_data(values, pollutant):
     """
     Function to generate pie_chart data
     Args:
-        records (list): list of pollutant objects (dict)
-        key (str): a dict key to obtain the pollutant value from the record
+        values (array-like): pollutant values
         pollutant (str): string representing the pollutant
 
     Returns: a dict containing the category count
     """
+    _, categories, (counts,) = count_pollutant_categories(values, pollutant)
+    category_count = dict(zip(categories, counts.tolist()))
 
-    def default_value():
-        return {
-            "Good": 0,
-            "Moderate": 0,
-            "UHFSG": 0,
-            "Unhealthy": 0,
-            "VeryUnhealthy": 0,
-            "Hazardous": 0,
-            "Other": 0,
-            "Unknown": 0,
-        }
-
-    location_category_count = defaultdict(default_value)
-
-    for record in records:
-        value = record.get("value")
-        name = record.get("name") or record.get("generated_name")
-        category = get_pollutant_category(value, pollutant=pollutant)
-        location_category_count[name][category] = (
-            location_category_count[name][category] + 1
-        )
-        location_category_count[name][category] = (
-            location_category_count[name][category] + 1
-        )
-        location_category_count[name]["name"] = name
+    unknown = category_count.pop("Unknown")
+    category_count["Other"] = 0
+    if unknown:
+        category_count["Unknown"] = unknown
 
-    print(len(location_category_count.values()))
-    return _destructure_pie_data(location_category_count.values())
+    return category_count
+
+
+def d3_generate_pie_chart_data(values, names, pollutant):
+    """
+    Function to generate pie_chart data
+    Args:
+        values (array-like): pollutant values
+        names (array-like): name of the location of each value
+        pollutant (str): string representing the pollutant
+
+    Returns: a list with the category counts of each location
+    """
+    location_names, categories, counts = count_pollutant_categories(
+        values, pollutant, locations=names
+    )
+    categories = categories[:-1] + ["Other", "Unknown"]
+    counts = np.insert(counts, len(categories) - 2, 0, axis=1)
+
+    return [
+        [
+            {
+                "name": name,
+                "category": category,
+                "color": PM_COLOR_CATEGORY.get(category, "#808080"),
+                "value": value,
+            }
+            for category, value in zip(categories, location_counts.tolist())
+        ]
+        for name, location_counts in zip(location_names, counts)
+    ]
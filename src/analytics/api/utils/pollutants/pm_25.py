@@ -1,3 +1,5 @@
+import numpy as np
+
 PM_25_COLOR_MAPPER = {
     600.4: "#808080",
     500.4: "#81202e",
@@ -112,6 +114,12 @@ NO2_CATEGORY = {
     "All": [0, 2049],
 }
 
+POLLUTANT_CATEGORIES = {
+    "pm2_5": PM_25_CATEGORY,
+    "pm10": PM_10_CATEGORY,
+    "no2": NO2_CATEGORY,
+}
+
 WEATHER_FIELDS_MAPPER = {
     "temperature": "device_temperature",
     "humidity": "device_humidity",
@@ -155,10 +163,8 @@ def get_pollutant_category(value, pollutant):
     Returns: a string representing the category og the value
     """
 
-    mapper = {"pm2_5": PM_25_CATEGORY, "pm10": PM_10_CATEGORY, "no2": NO2_CATEGORY}
-
     try:
-        category_mapper = dict(mapper[pollutant])
+        category_mapper = dict(POLLUTANT_CATEGORIES[pollutant])
         del category_mapper["All"]
     except KeyError:
         raise Exception(f"Unknown category {pollutant}")
@@ -168,3 +174,36 @@ def get_pollutant_category(value, pollutant):
             return key
 
     return "Unknown"
+
+
+def categorise_pollutant_values(values, pollutant) -> tuple[list[str], np.ndarray]:
+    """
+    Vectorized get_pollutant_category
+    Args:
+        values (array-like): pollutant values, None and NaN are categorised as Unknown
+        pollutant (str): the name of the pollutant e.g pm2_5, pm10, no2
+
+    Returns: the category names, ending with "Unknown", and the index of each value's category in them
+    """
+    try:
+        categories = {
+            key: value
+            for key, value in POLLUTANT_CATEGORIES[pollutant].items()
+            if key != "All"
+        }
+    except KeyError:
+        raise Exception(f"Unknown category {pollutant}")
+
+    # The categories are contiguous, (min_value, max_value] intervals in ascending order
+    breakpoints = np.array(
+        [min_value for min_value, _ in categories.values()][:1]
+        + [max_value for _, max_value in categories.values()],
+        dtype=float,
+    )
+    codes = np.searchsorted(breakpoints, np.asarray(values, dtype=float), side="left")
+    # Values at or below the first breakpoint, above the last or NaN fall outside all categories
+    codes = np.where(
+        (codes == 0) | (codes == len(breakpoints)), len(categories) + 1, codes
+    )
+
+    return list(categories) + ["Unknown"], codes - 1
@@ -1,5 +1,7 @@
 import json
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 import requests
 import pandas as pd
 from google.cloud import bigquery
@@ -7,22 +9,61 @@ from google.oauth2 import service_account
 from config import Config
 import numpy as np
 from timezonefinder import TimezoneFinder
-import pytz
 
+# Site coordinates are rounded to this many decimal places (about 10 m) before looking up their timezone
+TIMEZONE_PRECISION = 4
 
-def convert_utc_to_local(timestamps, site_latitude, site_longitude):
-    tf = TimezoneFinder()
-    local_times = []
 
-    for timestamp, latitude, longitude in zip(
-        timestamps, site_latitude, site_longitude
-    ):
-        timezone_str = tf.timezone_at(lat=latitude, lng=longitude)
-        timezone = pytz.timezone(timezone_str)
-        local_time = timestamp.astimezone(timezone)
-        local_times.append(local_time)
+@lru_cache(maxsize=None)
+def get_timezone_finder() -> TimezoneFinder:
+    return TimezoneFinder()
 
-    return local_times
+
+@lru_cache(maxsize=4096)
+def get_timezone(latitude: float, longitude: float) -> str:
+    """Timezone name at a location, kept for the life of the process. Falls back to UTC, e.g. at sea."""
+    return get_timezone_finder().timezone_at(lat=latitude, lng=longitude) or "UTC"
+
+
+def convert_utc_to_local(timestamps, site_latitude, site_longitude) -> pd.Series:
+    """
+    Converts UTC timestamps to the local time of their sites. The timezone is looked up once per site and the
+    timestamps of each timezone are converted together. The result has a timezone aware dtype if all sites share a
+    timezone, otherwise it holds timezone aware timestamps as objects.
+    """
+    timestamps = pd.to_datetime(pd.Series(timestamps), utc=True)
+    locations = pd.DataFrame(
+        {
+            "latitude": np.round(
+                np.asarray(site_latitude, dtype=float), TIMEZONE_PRECISION
+            ),
+            "longitude": np.round(
+                np.asarray(site_longitude, dtype=float), TIMEZONE_PRECISION
+            ),
+        }
+    )
+    sites = locations.drop_duplicates()
+    sites = sites.assign(
+        timezone=[
+            get_timezone(latitude, longitude)
+            for latitude, longitude in sites.itertuples(index=False)
+        ]
+    )
+    timezones = locations.merge(sites, on=["latitude", "longitude"], how="left")[
+        "timezone"
+    ].to_numpy()
+
+    unique_timezones = pd.unique(timezones)
+    if len(unique_timezones) == 1:
+        return timestamps.dt.tz_convert(unique_timezones[0])
+
+    local_times = np.empty(len(timestamps), dtype=object)
+    for timezone in unique_timezones:
+        in_timezone = timezones == timezone
+        local_times[in_timezone] = (
+            timestamps[in_timezone].dt.tz_convert(timezone).astype(object).to_numpy()
+        )
+    return pd.Series(local_times, index=timestamps.index)
 
 
 def fetch_air_quality_data(grid_id, start_time, end_time) -> list:
@@ -56,10 +97,6 @@ def fetch_air_quality_data(grid_id, start_time, end_time) -> list:
         return []
 
 
-# Create a BigQuery client
-client = bigquery.Client()
-
-
 def query_bigquery(site_ids, start_time, end_time):
     # Construct the BigQuery SQL query
     query = f"""
@@ -74,7 +111,7 @@ def query_bigquery(site_ids, start_time, end_time):
 
     try:
         # Execute the query
-        query_job = client.query(query)
+        query_job = bigquery.Client().query(query)
 
         # Fetch and return the results as a Pandas DataFrame
         data = query_job.to_dataframe()
@@ -227,3 +264,206 @@ class PManalysis:
     def gridname(dataframe):
         unique_cities = dataframe["city"].unique().tolist()
         return unique_cities
+
+
+@dataclass(frozen=True)
+class Aggregate:
+    """Mean of `columns` grouped by `keys`, rounded to `decimals` and optionally sorted by `sort_by`, descending."""
+
+    keys: tuple[str, ...]
+    columns: tuple[str, ...] = tuple(PM_COLUMNS)
+    decimals: int = 4
+    sort_by: str = None
+
+
+# Grouping keys that are derived from the local timestamps, as a DatetimeIndex or one Timestamp at a time
+TIME_KEYS = {
+    "timestamp": lambda timestamp: timestamp,
+    "date": lambda timestamp: timestamp.normalize().tz_localize(None),
+    "day": lambda timestamp: timestamp.day_name(),
+    "hour": lambda timestamp: timestamp.hour,
+    "month": lambda timestamp: timestamp.month,
+    "month_name": lambda timestamp: timestamp.month_name(),
+    "year": lambda timestamp: timestamp.year,
+}
+LOCATION_KEYS = ["site_name", "city", "country", "region"]
+KEY_FORMATS = {"timestamp": "%Y-%m-%d %H:%M %Z", "date": "%Y-%m-%d"}
+
+REPORT_AGGREGATES = {
+    "daily_mean_pm": Aggregate(keys=("date",)),
+    "datetime_mean_pm": Aggregate(keys=("timestamp",)),
+    "diurnal": Aggregate(keys=("hour",)),
+    "annual_pm": Aggregate(keys=("year",)),
+    "monthly_pm": Aggregate(keys=("month",), decimals=2),
+    "pm_by_month_year": Aggregate(keys=("month", "year")),
+    "pm_by_month_name": Aggregate(keys=("month_name",)),
+    "site_monthly_mean_pm": Aggregate(
+        keys=("site_name", "month", "year"), columns=tuple(PM_COLUMNS_CORD)
+    ),
+    "site_annual_mean_pm": Aggregate(
+        keys=("site_name", "year"), columns=tuple(PM_COLUMNS_CORD)
+    ),
+    "site_mean_pm": Aggregate(
+        keys=("site_name",),
+        columns=tuple(PM_COLUMNS_CORD),
+        sort_by="pm2_5_calibrated_value",
+    ),
+    "mean_pm_by_city": Aggregate(keys=("city", "month", "year")),
+    "mean_pm_by_country": Aggregate(keys=("country",), decimals=2),
+    "mean_pm_by_region": Aggregate(keys=("region",)),
+    "mean_pm_by_day_of_week": Aggregate(keys=("day",)),
+    "mean_pm_by_day_hour": Aggregate(keys=("day", "hour")),
+}
+
+
+def sum_and_count(values: pd.DataFrame, keys: dict) -> pd.DataFrame:
+    """Sums and counts of the non-missing values per combination of key codes."""
+    return (
+        pd.DataFrame(
+            {
+                **keys,
+                **{f"{column}_sum": values[column].fillna(0) for column in values},
+                **{f"{column}_count": values[column].notna() for column in values},
+            }
+        )
+        .groupby(list(keys), sort=False)
+        .sum()
+        .reset_index()
+    )
+
+
+def factorize_timestamps(timestamps: pd.Series):
+    """
+    Sorted integer codes and unique values of local timestamps. Timestamps in several timezones are held as objects,
+    which compare equal across timezones at the same instant, so they are factorized on their instant and timezone.
+    """
+    if pd.api.types.is_datetime64_any_dtype(timestamps):
+        return pd.factorize(timestamps, sort=True)
+
+    codes, _ = pd.factorize(
+        pd.MultiIndex.from_arrays(
+            [
+                pd.to_datetime(timestamps, utc=True),
+                timestamps.map(lambda timestamp: str(timestamp.tzinfo)),
+            ]
+        ),
+        sort=True,
+    )
+    _, first_rows = np.unique(codes, return_index=True)
+    return codes, pd.Index(timestamps.iloc[first_rows].to_numpy(), dtype=object)
+
+
+def aggregate_pm(data: pd.DataFrame, aggregates: dict) -> dict:
+    """
+    Computes the report aggregates of the data returned by `query_bigquery`, with the same results as the
+    matching `PManalysis` methods.
+
+    Grouping keys are encoded once as sorted integer codes, and keys derived from the local timestamp are computed
+    for its unique values only. The data is reduced to sums and counts per timestamp and per location and month,
+    and each aggregate is rolled up from the smallest of those that has its keys. Missing means are returned as
+    None, so the result can be serialized to JSON as is.
+
+    Returns:
+        dict: The records of each aggregate, by name.
+    """
+    if data.empty:
+        return {name: [] for name in aggregates}
+
+    values = data[
+        sorted(
+            {
+                column
+                for aggregate in aggregates.values()
+                for column in aggregate.columns
+            }
+        )
+    ].astype(float)
+
+    timestamp_codes, timestamps = factorize_timestamps(data["timestamp"])
+    key_values, time_codes, location_codes = {}, {}, {}
+    for key, to_value in TIME_KEYS.items():
+        if key == "timestamp":
+            # Already unique, and equal instants in different timezones must stay apart
+            time_codes[key] = np.arange(len(timestamps))
+            key_values[key] = timestamps
+            continue
+        # Timestamps in several timezones are not a DatetimeIndex and are converted one by one
+        time_values = (
+            to_value(timestamps)
+            if isinstance(timestamps, pd.DatetimeIndex)
+            else [to_value(timestamp) for timestamp in timestamps]
+        )
+        time_codes[key], key_values[key] = pd.factorize(
+            pd.Index(time_values), sort=True
+        )
+    for key in LOCATION_KEYS:
+        location_codes[key], key_values[key] = pd.factorize(data[key], sort=True)
+
+    def row_codes(keys) -> dict:
+        return {
+            key: (
+                location_codes[key]
+                if key in location_codes
+                else time_codes[key][timestamp_codes]
+            )
+            for key in keys
+        }
+
+    # Sums and counts are computed once per grain, and each aggregate is rolled up from the first grain that has
+    # its keys. Keys derived from the timestamp are looked up from its code.
+    grains = [("timestamp",), tuple(LOCATION_KEYS) + ("month", "year")]
+    partials = {}
+
+    results = {}
+    for name, aggregate in aggregates.items():
+        keys = list(aggregate.keys)
+        grain = next(
+            (
+                grain
+                for grain in grains
+                if set(keys)
+                <= set(grain) | ({*TIME_KEYS} if "timestamp" in grain else set())
+            ),
+            None,
+        )
+        if grain is None:
+            totals = sum_and_count(values[list(aggregate.columns)], row_codes(keys))
+        else:
+            if grain not in partials:
+                partials[grain] = sum_and_count(values, row_codes(grain))
+            totals = partials[grain].assign(
+                **{
+                    key: time_codes[key][partials[grain]["timestamp"]]
+                    for key in keys
+                    if key not in grain
+                }
+            )
+
+        # Rows with a missing key are left out, as by groupby
+        totals = totals[(totals[keys] >= 0).all(axis=1)].groupby(keys).sum()
+
+        result = pd.DataFrame(
+            {
+                key: key_values[key].take(totals.index.get_level_values(key))
+                for key in keys
+            }
+        )
+        for key in set(keys) & set(KEY_FORMATS):
+            result[key] = (
+                result[key].dt.strftime(KEY_FORMATS[key])
+                if pd.api.types.is_datetime64_any_dtype(result[key])
+                else result[key].map(lambda value: value.strftime(KEY_FORMATS[key]))
+            )
+        for column in aggregate.columns:
+            means = totals[f"{column}_sum"] / totals[f"{column}_count"].replace(
+                0, np.nan
+            )
+            result[column] = means.round(aggregate.decimals).to_numpy()
+        if aggregate.sort_by:
+            result = result.sort_values(by=aggregate.sort_by, ascending=False)
+
+        results[name] = (
+            result.astype(object).where(result.notna(), None).to_dict(orient="records")
+        )
+
+    return results
@@ -71,7 +71,8 @@ class ChartDataResource(Resource):
             )
             if chart_type.lower() == "pie":
                 category_count = generate_pie_chart_data(
-                    records=sorted_values, key="value", pollutant=pollutant
+                    values=[item.get("value") for item in sorted_values],
+                    pollutant=pollutant,
                 )
 
                 try:
@@ -157,12 +158,17 @@ class D3ChartDataResource(Resource):
 
         events_model = EventsModel(tenant)
         # data = events_model.get_d3_chart_events(sites, start_date, end_date, pollutant, frequency)
-        data = events_model.get_d3_chart_events_v2(
+        data = events_model.get_d3_chart_dataframe(
             sites, start_date, end_date, pollutant, frequency, tenant
         )
 
         if chart_type.lower() == "pie":
-            data = d3_generate_pie_chart_data(data, pollutant)
+            names = data["name"].where(
+                data["name"].notna() & (data["name"] != ""), data["generated_name"]
+            )
+            data = d3_generate_pie_chart_data(data["value"], names, pollutant)
+        else:
+            data = data.to_dict(orient="records")
 
         return (
             create_response("successfully retrieved d3 chart data", data=data),
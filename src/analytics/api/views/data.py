@@ -1,4 +1,5 @@
 import datetime
+import itertools
 import traceback
 
 import flask_excel as excel
@@ -22,12 +23,19 @@ from api.utils.data_formatters import filter_non_private_entities, Entity
 # Middlewares
 from api.utils.data_formatters import (
     format_to_aqcsv,
+    format_dataframe_to_aqcsv,
     compute_airqloud_summary,
+    dataframes_to_csv,
+    dataframes_to_ndjson,
 )
 from api.utils.dates import str_to_date, date_to_str
 from api.utils.exceptions import ExportRequestNotFound
-from api.utils.http import create_response, Status
-from api.utils.request_validators import validate_request_json, validate_request_params
+from api.utils.http import create_response, create_streaming_response, Status
+from api.utils.request_validators import (
+    validate_request_json,
+    validate_request_params,
+    Validator,
+)
 from main import rest_api_v2
 
 
@@ -53,6 +61,7 @@ class DataExportResource(Resource):
         "sites|optional:list",
         "devices|optional:list",
         "airqlouds|optional:list",
+        "stream|optional:bool",
     )
     def post(self):
         valid_pollutants = ["pm2_5", "pm10", "no2"]
@@ -80,6 +89,7 @@ class DataExportResource(Resource):
         output_format = (
             f"{json_data.get('outputFormat', valid_output_formats[0])}".lower()
         )
+        stream = Validator.str_to_bool(json_data.get("stream", False))
 
         if sum([len(sites) == 0, len(devices) == 0, len(airqlouds) == 0]) == 3:
             return (
@@ -138,6 +148,21 @@ class DataExportResource(Resource):
 
         postfix = "-" if output_format == "airqo-standard" else "-aqcsv-"
 
+        if stream:
+            return self.stream_data(
+                sites=sites,
+                devices=devices,
+                airqlouds=airqlouds,
+                start_date=start_date,
+                end_date=end_date,
+                frequency=frequency,
+                pollutants=pollutants,
+                weather_fields=weather_fields,
+                download_type=download_type,
+                output_format=output_format,
+                file_name=f"{frequency}-air-quality{postfix}data",
+            )
+
         try:
             data_frame = EventsModel.download_from_bigquery(
                 sites=sites,
@@ -156,12 +181,12 @@ class DataExportResource(Resource):
                     Status.HTTP_404_NOT_FOUND,
                 )
 
-            records = data_frame.to_dict("records")
-
             if output_format == "aqcsv":
                 records = format_to_aqcsv(
-                    data=records, frequency=frequency, pollutants=pollutants
+                    data=data_frame, frequency=frequency, pollutants=pollutants
                 )
+            else:
+                records = data_frame.to_dict("records")
 
             if download_type == "json":
                 return (
@@ -185,6 +210,79 @@ class DataExportResource(Resource):
                 Status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    @staticmethod
+    def stream_data(
+        sites,
+        devices,
+        airqlouds,
+        start_date,
+        end_date,
+        frequency,
+        pollutants,
+        weather_fields,
+        download_type,
+        output_format,
+        file_name,
+    ):
+        """
+        Streams the download page by page as gzipped CSV or newline delimited JSON, so memory use does not grow
+        with the size of the export.
+        """
+        try:
+            pages = EventsModel.stream_from_bigquery(
+                sites=sites,
+                devices=devices,
+                airqlouds=airqlouds,
+                start_date=start_date,
+                end_date=end_date,
+                frequency=frequency,
+                pollutants=pollutants,
+                weather_fields=weather_fields,
+            )
+
+            # Fetching the first page runs the query, so errors and empty results can still be reported
+            first_page = next(pages, None)
+            if first_page is None:
+                return (
+                    create_response("No data found", data=[]),
+                    Status.HTTP_404_NOT_FOUND,
+                )
+            pages = itertools.chain([first_page], pages)
+        except Exception as ex:
+            print(ex)
+            traceback.print_exc()
+            return (
+                create_response(
+                    f"An Error occurred while processing your request. Please contact support",
+                    success=False,
+                ),
+                Status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        if output_format == "aqcsv":
+            pages = (
+                format_dataframe_to_aqcsv(
+                    dataframe=page, frequency=frequency, pollutants=pollutants
+                )
+                for page in pages
+            )
+
+        if download_type == "json":
+            chunks = dataframes_to_ndjson(pages)
+            mimetype = "application/x-ndjson"
+            file_name = f"{file_name}.json"
+        else:
+            chunks = dataframes_to_csv(pages)
+            mimetype = "text/csv"
+            file_name = f"{file_name}.csv"
+
+        return create_streaming_response(
+            chunks,
+            mimetype=mimetype,
+            file_name=file_name,
+            compress="gzip" in request.accept_encodings,
+        )
+
 
 @rest_api_v2.route("/data-export")
 class DataExportV2Resource(Resource):
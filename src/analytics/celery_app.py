@@ -1,4 +1,5 @@
 import logging
+import math
 import traceback
 from datetime import timedelta
 
@@ -40,6 +41,13 @@ def make_celery():
             }
         },
         "app_name": "data_export",
+        # Exports are queued with priorities 0 (smallest) to 9 (largest), see export_priority
+        "broker_transport_options": {
+            "queue_order_strategy": "priority",
+            "priority_steps": list(range(10)),
+            "sep": ":",
+        },
+        "worker_prefetch_multiplier": 1,
     }
 
     celery_application = Celery(config["app_name"], broker=config["broker_url"])
@@ -50,8 +58,30 @@ def make_celery():
 celery = make_celery()
 
 
+def export_priority(total_bytes: int) -> int:
+    """Queue priority of an export, one step per order of magnitude from 0 (up to 10 MB) to 9"""
+    return min(9, max(0, int(math.log10(max(total_bytes, 1))) - 6))
+
+
+def export_query(request: DataExportRequest):
+    return EventsModel.data_export_query(
+        sites=request.sites,
+        devices=request.devices,
+        airqlouds=request.airqlouds,
+        start_date=request.start_date,
+        end_date=request.end_date,
+        frequency=request.frequency.value,
+        pollutants=request.pollutants,
+    )
+
+
 @celery.task(name="data_export_periodic_task")
 def data_export_task():
+    """
+    Dispatches pending export requests, each to its own data_export_request_task. A user has at most
+    DATA_EXPORT_USER_CONCURRENCY requests processing at a time, and requests are prioritised by the bytes their
+    query would scan, so that small exports are not queued behind large ones.
+    """
     celery_logger.info("Data export periodic task running")
 
     data_export_model = DataExportModel()
@@ -60,60 +90,92 @@ def data_export_task():
     if len(pending_requests) == 0:
         celery_logger.info("No data for processing")
         return
-    else:
-        celery_logger.info(f"Commenced processing {len(pending_requests)} request(s)")
 
-    requests_for_processing: [DataExportRequest] = []
+    processing_per_user = data_export_model.get_processing_requests_per_user()
+    requests_for_processing: list[DataExportRequest] = []
+    previous_status: dict[str, DataExportStatus] = {}
 
-    for request in pending_requests:
+    for request in sorted(pending_requests, key=lambda x: x.request_date):
+        processing = processing_per_user.get(request.user_id, 0)
+        if processing >= int(Config.DATA_EXPORT_USER_CONCURRENCY):
+            continue
+        processing_per_user[request.user_id] = processing + 1
+        previous_status[request.request_id] = request.status
         request.status = DataExportStatus.PROCESSING
-        success = data_export_model.update_request_status_and_retries(request)
-        if success:
-            requests_for_processing.append(request)
+        requests_for_processing.append(request)
+
+    # Requests are only dispatched once all of them are marked as processing. Otherwise they are put back, to be
+    # picked up by the next run.
+    updated = data_export_model.update_requests_status_and_retries(
+        requests_for_processing
+    )
+    if updated != len(requests_for_processing):
+        celery_logger.warning(
+            f"Marked {updated} of {len(requests_for_processing)} request(s) as processing, none dispatched"
+        )
+        for request in requests_for_processing:
+            request.status = previous_status[request.request_id]
+        data_export_model.update_requests_status_and_retries(requests_for_processing)
+        return
 
+    dispatched = 0
     for request in requests_for_processing:
         try:
-            query = EventsModel.data_export_query(
-                sites=request.sites,
-                devices=request.devices,
-                airqlouds=request.airqlouds,
-                start_date=request.start_date,
-                end_date=request.end_date,
-                frequency=request.frequency.value,
-                pollutants=request.pollutants,
-            )
+            total_bytes = data_export_model.estimate_query_bytes(export_query(request))
+        except Exception as ex:
+            celery_logger.warning(f"Dry run of {request.request_id} failed: {ex}")
+            total_bytes = 0
 
-            has_data = data_export_model.has_data(query)
+        try:
+            data_export_request_task.apply_async(
+                args=[request.request_id], priority=export_priority(total_bytes)
+            )
+            dispatched += 1
+        except Exception as ex:
+            celery_logger.error(f"Dispatch of {request.request_id} failed: {ex}")
+            request.status = previous_status[request.request_id]
+            data_export_model.update_request_status_and_retries(request)
 
-            if not has_data:
-                request.status = DataExportStatus.NO_DATA
-                data_export_model.update_request_status_and_retries(request)
-                continue
+    celery_logger.info(f"Dispatched {dispatched} of {len(pending_requests)} request(s)")
 
-            data_export_model.export_query_results_to_table(
-                query=query, export_request=request
-            )
-            data_export_model.export_table_to_gcs(export_request=request)
-            data_links: [str] = data_export_model.get_data_links(export_request=request)
 
-            request.data_links = data_links
-            request.status = DataExportStatus.READY
+@celery.task(name="data_export_request_task")
+def data_export_request_task(request_id: str):
+    data_export_model = DataExportModel()
+    request = data_export_model.get_request_by_id(request_id)
 
-            success = data_export_model.update_request_status_and_data_links(request)
+    try:
+        query = export_query(request)
 
-            if not success:
-                raise Exception("Update failed")
+        has_data = data_export_model.has_data(query)
 
-        except Exception as ex:
-            print(ex)
-            traceback.print_exc()
-            request.status = DataExportStatus.FAILED
-            request.retries = request.retries - 1
+        if not has_data:
+            request.status = DataExportStatus.NO_DATA
             data_export_model.update_request_status_and_retries(request)
+            return
 
-        celery_logger.info(
-            f"Finished processing {len(requests_for_processing)} request(s)"
+        data_export_model.export_query_results_to_table(
+            query=query, export_request=request
         )
+        data_export_model.export_table_to_gcs(export_request=request)
+        data_links: [str] = data_export_model.get_data_links(export_request=request)
+
+        request.data_links = data_links
+        request.status = DataExportStatus.READY
+
+        success = data_export_model.update_request_status_and_data_links(request)
+
+        if not success:
+            raise Exception("Update failed")
+
+    except Exception as ex:
+        print(ex)
+        traceback.print_exc()
+        request.status = DataExportStatus.FAILED
+        request.retries = request.retries - 1
+        data_export_model.update_request_status_and_retries(request)
+
+    celery_logger.info(f"Finished processing request {request_id}")
 
 
 if __name__ == "__main__":
@@ -48,7 +48,12 @@ class Config:
     BIGQUERY_BAM_DATA = env_var("BIGQUERY_BAM_DATA")
     BIGQUERY_DAILY_DATA = env_var("BIGQUERY_DAILY_DATA")
     DATA_EXPORT_LIMIT = os.getenv("DATA_EXPORT_LIMIT", 2000)
+    DATA_EXPORT_STREAM_LIMIT = os.getenv("DATA_EXPORT_STREAM_LIMIT", 5000000)
+    DATA_EXPORT_PAGE_SIZE = os.getenv("DATA_EXPORT_PAGE_SIZE", 10000)
+    CHART_CACHE_SETTLE_TIME = os.getenv("CHART_CACHE_SETTLE_TIME", 21600)  # seconds
+    CHART_CACHE_TIMEOUT = os.getenv("CHART_CACHE_TIMEOUT", 0)  # 0 never expires
     DATA_SUMMARY_DAYS_INTERVAL = os.getenv("DATA_SUMMARY_DAYS_INTERVAL", 2)
+    EVENTS_ROLLUP_LOOKBACK_HOURS = os.getenv("EVENTS_ROLLUP_LOOKBACK_HOURS", 24)
     AIRQO_API_TOKEN = os.getenv("AIRQO_API_TOKEN")
 
     DEVICES_SUMMARY_TABLE = env_var("DEVICES_SUMMARY_TABLE")
@@ -57,6 +62,7 @@ class Config:
     DATA_EXPORT_DATASET = env_var("DATA_EXPORT_DATASET")
     DATA_EXPORT_GCP_PROJECT = env_var("DATA_EXPORT_GCP_PROJECT")
     DATA_EXPORT_COLLECTION = env_var("DATA_EXPORT_COLLECTION", "data_export")
+    DATA_EXPORT_USER_CONCURRENCY = os.getenv("DATA_EXPORT_USER_CONCURRENCY", 2)
 
     SWAGGER = {
         "swagger": "2.0",
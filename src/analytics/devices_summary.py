@@ -1,4 +1,4 @@
-import copy
+import argparse
 from datetime import datetime, timedelta
 
 from api.models import EventsModel
@@ -7,32 +7,41 @@ from api.utils.dates import str_to_date
 from config import Config
 
 
-def create_date_list(start_date: datetime, end_date: datetime):
-    date_list: list[datetime] = []
-    current_date = start_date
-
-    while current_date <= end_date:
-        date_list.append(current_date)
-        current_date += timedelta(days=1)
-
-    return date_list
-
-
-def compute_historical_summary():
+def compute_historical_summary(start_date: datetime, end_date: datetime):
+    """
+    Backfills the devices summary from start_date to end_date, both days inclusive. The hourly data of the whole
+    range is read in one query and the summary is saved in one load job.
+    """
     model = EventsModel("airqo")
-    start_date = str_to_date("2023-01-01", format="%Y-%m-%d")
-    end_date = str_to_date("2023-01-10", format="%Y-%m-%d")
-    date_list = create_date_list(start_date, end_date)
-    for date in date_list:
-        date_data = model.get_devices_hourly_data(day=date)
-        date_summary = compute_devices_summary(copy.deepcopy(date_data))
-        model.save_devices_summary_data(copy.deepcopy(date_summary))
+    data = model.get_devices_hourly_data_range(start_date=start_date, end_date=end_date)
+    summary = compute_devices_summary(data)
+    model.save_devices_summary_data(summary)
 
 
 if __name__ == "__main__":
-    events_model = EventsModel("airqo")
-    data = events_model.get_devices_hourly_data(
-        day=datetime.utcnow() - timedelta(days=int(Config.DATA_SUMMARY_DAYS_INTERVAL))
+    parser = argparse.ArgumentParser(description="save the devices summary.")
+    parser.add_argument(
+        "--start-date",
+        help="first day (YYYY-MM-DD) to backfill, requires --end-date",
+    )
+    parser.add_argument(
+        "--end-date",
+        help="last day (YYYY-MM-DD) to backfill, requires --start-date",
     )
-    summary = compute_devices_summary(copy.deepcopy(data))
-    events_model.save_devices_summary_data(copy.deepcopy(summary))
+    args = parser.parse_args()
+
+    if args.start_date or args.end_date:
+        if not (args.start_date and args.end_date):
+            parser.error("--start-date and --end-date must be used together")
+        compute_historical_summary(
+            start_date=str_to_date(args.start_date, format="%Y-%m-%d"),
+            end_date=str_to_date(args.end_date, format="%Y-%m-%d"),
+        )
+    else:
+        events_model = EventsModel("airqo")
+        data = events_model.get_devices_hourly_data(
+            day=datetime.utcnow()
+            - timedelta(days=int(Config.DATA_SUMMARY_DAYS_INTERVAL))
+        )
+        summary = compute_devices_summary(data)
+        events_model.save_devices_summary_data(summary)
@@ -0,0 +1,53 @@
+import argparse
+from datetime import datetime, timedelta
+
+from api.models import EventsModel
+from api.models.events_rollup import (
+    EventsRollupModel,
+    ROLLUP_BUCKET_FORMATS,
+    rollup_day_start,
+)
+from api.utils.dates import str_to_date
+from config import Config
+
+
+def update_events_rollups(tenant: str, start_date: datetime = None):
+    """
+    Updates the hourly and daily rollups of the events. Rollups are recomputed from the day of the latest hourly
+    rollup, or EVENTS_ROLLUP_LOOKBACK_HOURS ago if that is earlier so that late readings are included, or from
+    start_date if given.
+    """
+    rollup_model = EventsRollupModel(tenant)
+    rollup_model.create_indexes()
+
+    if start_date is None:
+        start_date = datetime.utcnow() - timedelta(
+            hours=int(Config.EVENTS_ROLLUP_LOOKBACK_HOURS)
+        )
+        latest_time = rollup_model.get_latest_time("hourly")
+        if latest_time is not None:
+            start_date = min(start_date, latest_time)
+
+    # Whole days are recomputed, so that every daily bucket is complete
+    start = rollup_day_start(start_date)
+    for frequency in ROLLUP_BUCKET_FORMATS:
+        EventsModel(tenant).rollup_events(start=start, frequency=frequency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="update the events rollups.")
+    parser.add_argument(
+        "--tenant",
+        default="airqo",
+        help="the tenant key is the organisation name",
+    )
+    parser.add_argument(
+        "--start-date",
+        help="day (YYYY-MM-DD) to rebuild the rollups from",
+    )
+    args = parser.parse_args()
+
+    update_events_rollups(
+        tenant=args.tenant,
+        start_date=args.start_date and str_to_date(args.start_date, format="%Y-%m-%d"),
+    )
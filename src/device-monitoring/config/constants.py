@@ -70,6 +70,10 @@ class Config:
     COLLOCATION_CELERY_MINUTES_INTERVAL = int(
         os.getenv("COLLOCATION_CELERY_MINUTES_INTERVAL", 10)
     )
+    # Raw data older than this is taken to be complete when collocation results are updated incrementally
+    COLLOCATION_RESULTS_SETTLE_MINUTES = int(
+        os.getenv("COLLOCATION_RESULTS_SETTLE_MINUTES", 60)
+    )
     BIGQUERY_DEVICE_UPTIME_TABLE = os.getenv("BIGQUERY_DEVICE_UPTIME_TABLE")
 
     USERS_BASE_URL = os.getenv("USERS_BASE_URL")
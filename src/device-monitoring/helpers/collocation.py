@@ -2,7 +2,8 @@ import copy
 import os
 import tempfile
 import traceback
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Optional
 
 import numpy as np
 import pandas as pd
@@ -23,6 +24,8 @@ from helpers.collocation_utils import (
     map_data_to_api_format,
     compute_hourly_intra_sensor_correlation,
     compute_data_completeness_using_hourly_records,
+    compute_batch_results_from_state,
+    CollocationBatchState,
 )
 from helpers.exceptions import CollocationBatchNotFound
 from models.base import BaseModel
@@ -219,6 +222,42 @@ class Collocation(BaseModel):
             errors=errors,
         )
 
+    @staticmethod
+    def compute_batch_results_incrementally(
+        collocation_batch: CollocationBatch, state: Optional[CollocationBatchState]
+    ) -> tuple[CollocationBatchResult, Optional[CollocationBatchState]]:
+        """
+        Brings the running statistics of the batch up to the last settled hour, fetching only the data after the
+        previous checkpoint, and computes the results from them. Once all the data of the batch has settled, the
+        results are computed from the full data a last time, which also gives the percentiles, and no state is
+        returned.
+        """
+        checkpoint = (
+            datetime.utcnow()
+            - timedelta(minutes=Config.COLLOCATION_RESULTS_SETTLE_MINUTES)
+        ).replace(minute=0, second=0, microsecond=0)
+
+        if checkpoint >= collocation_batch.end_date:
+            return Collocation.compute_batch_results(collocation_batch), None
+
+        if state is None or not state.matches(collocation_batch):
+            state = CollocationBatchState.empty(collocation_batch)
+
+        if checkpoint > state.checkpoint:
+            data, data_source = Collocation.get_data(
+                devices=state.devices,
+                start_date_time=state.checkpoint,
+                end_date_time=checkpoint - timedelta(microseconds=1),
+            )
+            state.update(
+                data=data,
+                checkpoint=checkpoint,
+                data_source=data_source,
+                completeness_parameter=collocation_batch.data_completeness_parameter,
+            )
+
+        return compute_batch_results_from_state(collocation_batch, state), state
+
     @staticmethod
     @cache.memoize(timeout=1800)
     def get_data(
@@ -377,15 +416,30 @@ class Collocation(BaseModel):
 
     def compute_and_update_results(self, batches: list[CollocationBatch]):
         for batch in batches:
-            results = self.compute_batch_results(batch)
-            self.__update_batch_results((batch.batch_id, results))
+            state = self.__query_batch_state(batch.batch_id)
+            results, state = self.compute_batch_results_incrementally(batch, state)
+            self.__update_batch_results((batch.batch_id, results), state)
+
+    def __query_batch_state(self, batch_id: str) -> Optional[CollocationBatchState]:
+        doc = self.collection.find_one(
+            {"_id": ObjectId(batch_id)}, projection={"results_state": 1}
+        )
+        if doc is None or doc.get("results_state") is None:
+            return None
+        return CollocationBatchState.from_dict(doc["results_state"])
 
     def __update_batch_results(
-        self, batch_tuple: tuple[str, CollocationBatchResult]
+        self,
+        batch_tuple: tuple[str, CollocationBatchResult],
+        state: Optional[CollocationBatchState] = None,
     ) -> CollocationBatch:
         _batch_id, _results = batch_tuple
         filter_set = {"_id": ObjectId(_batch_id)}
         update_set = {"$set": {"results": _results.to_dict()}}
+        if state is None:
+            update_set["$unset"] = {"results_state": ""}
+        else:
+            update_set["$set"]["results_state"] = state.to_dict()
         self.collection.update_one(filter_set, update_set)
         print(f"updated results for batch {_batch_id}")
         return self.__query_by_batch_id(_batch_id)
@@ -427,7 +481,7 @@ class Collocation(BaseModel):
         reset_batch.set_status()
 
         filter_set = {"_id": ObjectId(reset_batch.batch_id)}
-        update_set = {"$set": reset_batch.to_dict()}
+        update_set = {"$set": reset_batch.to_dict(), "$unset": {"results_state": ""}}
         self.collection.update_one(filter_set, update_set)
         reset_batch = self.__query_by_batch_id(reset_batch.batch_id)
         return reset_batch
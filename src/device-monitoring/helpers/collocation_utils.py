@@ -1,5 +1,6 @@
 import copy
 import math
+from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 
 import numpy as np
@@ -14,8 +15,15 @@ from models.collocation import (
     IntraSensorCorrelationResult,
     IntraSensorData,
     CollocationBatch,
+    CollocationBatchResult,
 )
 
+# The readings of the two sensors of a device, per parameter
+INTRA_SENSOR_COLUMNS = {
+    "pm2_5": ("s1_pm2_5", "s2_pm2_5"),
+    "pm10": ("s1_pm10", "s2_pm10"),
+}
+
 
 def populate_missing_columns(data: pd.DataFrame, cols: list) -> pd.DataFrame:
     for col in cols:
@@ -47,6 +55,151 @@ def device_pairs(devices: list[str]) -> list[list[str]]:
     return pairs
 
 
+def devices_matrix(
+    data: dict[str, pd.DataFrame], devices: list[str], parameters: list[str]
+) -> dict[str, np.ndarray]:
+    """
+    Aligns the data of all devices on timestamp into one (timestamps x devices) matrix per parameter.
+    Devices without data, or without a parameter, have NaN columns.
+    """
+    frames = [
+        pd.DataFrame(
+            {
+                "timestamp": device_data["timestamp"],
+                "device": device,
+                **{
+                    parameter: pd.to_numeric(device_data[parameter], errors="coerce")
+                    for parameter in parameters
+                    if parameter in device_data.columns
+                },
+            }
+        )
+        for device, device_data in data.items()
+        if device in devices and "timestamp" in device_data.columns
+    ]
+    frames = [frame for frame in frames if len(frame.index) != 0]
+    if not frames:
+        return {
+            parameter: np.full((0, len(devices)), np.nan) for parameter in parameters
+        }
+
+    wide_data = (
+        pd.concat(frames, ignore_index=True)
+        .groupby(["timestamp", "device"])
+        .mean(numeric_only=True)
+        .unstack("device")
+    )
+
+    matrices = {}
+    for parameter in parameters:
+        if parameter not in wide_data.columns.get_level_values(0):
+            matrices[parameter] = np.full((len(wide_data.index), len(devices)), np.nan)
+            continue
+        matrices[parameter] = (
+            wide_data[parameter].reindex(columns=devices).to_numpy(dtype=float)
+        )
+
+    return matrices
+
+
+@dataclass
+class PairMoments:
+    """
+    Count, means, sums of squared deviations and sum of cross deviations of pairs of series, over the rows where
+    both series have values. Moments of consecutive windows of data can be merged, so that correlations can be
+    kept up to date without revisiting old data.
+    """
+
+    count: np.ndarray
+    mean_x: np.ndarray
+    mean_y: np.ndarray
+    m2_x: np.ndarray
+    m2_y: np.ndarray
+    c_xy: np.ndarray
+
+    @staticmethod
+    def of_columns(x_matrix: np.ndarray, y_matrix: np.ndarray) -> "PairMoments":
+        """Moments of every pair of a column of x_matrix and a column of y_matrix, as (x columns x y columns) arrays"""
+        x_present = ~np.isnan(x_matrix)
+        y_present = ~np.isnan(y_matrix)
+        # Centering first keeps the sums of squares small
+        x_shift = np.where(x_present, x_matrix, 0.0).sum(axis=0) / np.maximum(
+            x_present.sum(axis=0), 1
+        )
+        y_shift = np.where(y_present, y_matrix, 0.0).sum(axis=0) / np.maximum(
+            y_present.sum(axis=0), 1
+        )
+        x_values = np.where(x_present, x_matrix - x_shift, 0.0)
+        y_values = np.where(y_present, y_matrix - y_shift, 0.0)
+        x_mask = x_present.astype(float)
+        y_mask = y_present.astype(float)
+
+        count = x_mask.T @ y_mask
+        divisor = np.maximum(count, 1)
+        # sum_x[i, j] is the sum of column i of x over the rows where column j of y also has a value
+        sum_x = x_values.T @ y_mask
+        sum_y = x_mask.T @ y_values
+        empty = count == 0
+
+        return PairMoments(
+            count=count,
+            mean_x=np.where(empty, 0.0, sum_x / divisor + x_shift[:, None]),
+            mean_y=np.where(empty, 0.0, sum_y / divisor + y_shift[None, :]),
+            m2_x=np.maximum((x_values**2).T @ y_mask - sum_x**2 / divisor, 0),
+            m2_y=np.maximum(x_mask.T @ (y_values**2) - sum_y**2 / divisor, 0),
+            c_xy=x_values.T @ y_values - sum_x * sum_y / divisor,
+        )
+
+    def merge(self, other: "PairMoments") -> "PairMoments":
+        count = self.count + other.count
+        divisor = np.maximum(count, 1)
+        weight = self.count * other.count / divisor
+        delta_x = other.mean_x - self.mean_x
+        delta_y = other.mean_y - self.mean_y
+
+        return PairMoments(
+            count=count,
+            mean_x=self.mean_x + delta_x * other.count / divisor,
+            mean_y=self.mean_y + delta_y * other.count / divisor,
+            m2_x=self.m2_x + other.m2_x + delta_x**2 * weight,
+            m2_y=self.m2_y + other.m2_y + delta_y**2 * weight,
+            c_xy=self.c_xy + other.c_xy + delta_x * delta_y * weight,
+        )
+
+    def diagonal(self) -> "PairMoments":
+        return PairMoments(
+            **{
+                field: np.diagonal(value).copy()
+                for field, value in asdict(self).items()
+            }
+        )
+
+    def pearson(self) -> np.ndarray:
+        """Pearson correlations, NaN for pairs with fewer than two rows or a constant series"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = self.c_xy / np.sqrt(self.m2_x * self.m2_y)
+
+        correlation[(self.count < 2) | (self.m2_x <= 0) | (self.m2_y <= 0)] = np.nan
+        return np.clip(correlation, -1, 1)
+
+    def to_dict(self) -> dict:
+        return {field: value.tolist() for field, value in asdict(self).items()}
+
+    @staticmethod
+    def from_dict(data: dict) -> "PairMoments":
+        return PairMoments(
+            **{field: np.asarray(value, dtype=float) for field, value in data.items()}
+        )
+
+
+def pairwise_pearson(matrix: np.ndarray) -> np.ndarray:
+    """
+    Pearson correlation of every pair of columns, each over the rows where both columns have values,
+    as DataFrame.corr() computes it. Pairs with fewer than two rows or a constant column are NaN.
+    """
+    return PairMoments.of_columns(matrix, matrix).pearson()
+
+
 def compute_differences(
     statistics: list[dict],
     parameter: str,
@@ -63,39 +216,36 @@ def compute_differences(
             error_devices=[],
         )
 
-    statistics_list = copy.copy(statistics)
     differences = []
     # TODO compute base device
-    data: dict[str, dict] = {}
-    for device_statistics in statistics_list:
-        device = device_statistics.pop("device_name")
-        data[device] = device_statistics
+    statistics_df = pd.DataFrame(statistics).set_index("device_name")
+    statistics_df = statistics_df[~statistics_df.index.duplicated(keep="last")]
+    statistics_cols = statistics_df.columns.to_list()
+    statistics_matrix = statistics_df.apply(pd.to_numeric, errors="coerce").to_numpy(
+        dtype=float
+    )
 
-    pairs = device_pairs(list(data.keys()))
+    pairs = device_pairs(statistics_df.index.to_list())
     passed_devices: list[str] = []
     failed_devices: list[str] = []
 
-    for device_pair in pairs:
+    device_indices = {device: index for index, device in enumerate(statistics_df.index)}
+    x_indices = [device_indices[device_x] for device_x, _ in pairs]
+    y_indices = [device_indices[device_y] for _, device_y in pairs]
+    differences_matrix = np.abs(
+        statistics_matrix[x_indices] - statistics_matrix[y_indices]
+    )
+
+    for device_pair, pair_differences in zip(pairs, differences_matrix.tolist()):
         device_x = device_pair[0]
         device_y = device_pair[1]
 
-        device_x_data = pd.DataFrame([data.get(device_x)])
-        device_y_data = pd.DataFrame([data.get(device_y)])
-
-        differences_df = abs(device_x_data - device_y_data)
-        differences_df.replace(np.nan, None, inplace=True)
-        results = differences_df.to_dict("records")
-
-        try:
-            results = results[0]
-            passed = (
-                results[f"{parameter}_mean"] <= threshold
-                if results[f"{parameter}_mean"]
-                else False
-            )
-        except IndexError:
-            results = []
-            passed = False
+        results = {
+            col: None if math.isnan(value) else value
+            for col, value in zip(statistics_cols, pair_differences)
+        }
+        parameter_difference = results.get(f"{parameter}_mean", None)
+        passed = parameter_difference <= threshold if parameter_difference else False
 
         differences.append(
             {
@@ -134,49 +284,29 @@ def compute_differences(
 
 
 def compute_devices_inter_sensor_correlation(
-    data: dict[str, pd.DataFrame],
+    correlations: dict[str, np.ndarray],
+    device_indices: dict[str, int],
     device_x: str,
     device_y: str,
-    correlation_cols: list,
     threshold: float,
     r2_threshold: float,
     parameter: str,
 ) -> dict:
-    device_x_data = data.get(device_x, pd.DataFrame())
-
-    device_x_data = device_x_data[correlation_cols]
-    device_x_data = device_x_data.add_prefix(f"{device_x}_")
-    device_x_data.rename(columns={f"{device_x}_timestamp": "timestamp"}, inplace=True)
-
-    device_y_data = data.get(device_y, pd.DataFrame())
-    device_y_data = device_y_data[correlation_cols]
-    device_y_data = device_y_data.add_prefix(f"{device_y}_")
-    device_y_data.rename(columns={f"{device_y}_timestamp": "timestamp"}, inplace=True)
-
-    device_pair_data = pd.merge(
-        left=device_x_data,
-        right=device_y_data,
-        on=["timestamp"],
-    )
-    device_pair_data = device_pair_data.select_dtypes(include="number")
-
     device_pair_correlation: dict = dict()
+    x_index = device_indices[device_x]
+    y_index = device_indices[device_y]
 
-    for col in correlation_cols:
-        try:
-            if col == "timestamp":
-                continue
-
-            comp_cols = [f"{device_x}_{col}", f"{device_y}_{col}"]
-
-            device_pair_correlation_data = device_pair_data[comp_cols].corr().round(4)
-            device_pair_correlation_data.replace(np.nan, None, inplace=True)
-            correlation_value = device_pair_correlation_data.iloc[0][comp_cols[1]]
-            device_pair_correlation[f"{col}_pearson"] = correlation_value
-
-            device_pair_correlation[f"{col}_r2_pearson"] = math.sqrt(correlation_value)
-        except Exception:
-            device_pair_correlation[f"{col}_r2_pearson"] = None
+    for col, correlation in correlations.items():
+        correlation_value = correlation[x_index, y_index]
+        correlation_value = (
+            None if np.isnan(correlation_value) else round(float(correlation_value), 4)
+        )
+        device_pair_correlation[f"{col}_pearson"] = correlation_value
+        device_pair_correlation[f"{col}_r2_pearson"] = (
+            math.sqrt(correlation_value)
+            if correlation_value is not None and correlation_value >= 0
+            else None
+        )
 
     parameter_value = device_pair_correlation.get(f"{parameter}_pearson", None)
     parameter_r2_value = device_pair_correlation.get(f"{parameter}_r2_pearson", None)
@@ -203,6 +333,44 @@ def compute_inter_sensor_correlation(
     base_device: str,
     other_parameters: list[str],
 ) -> BaseResult:
+    correlation_cols = [parameter]
+    correlation_cols.extend(other_parameters)
+    correlation_cols = list(dict.fromkeys(correlation_cols))
+
+    matrix_devices = list(dict.fromkeys([*devices, *data.keys(), base_device]))
+    correlations = {
+        col: pairwise_pearson(matrix)
+        for col, matrix in devices_matrix(
+            data=data, devices=matrix_devices, parameters=correlation_cols
+        ).items()
+    }
+
+    return inter_sensor_correlation_result(
+        devices=devices,
+        data_devices=list(data.keys()),
+        correlations=correlations,
+        device_indices={device: index for index, device in enumerate(matrix_devices)},
+        threshold=threshold,
+        r2_threshold=r2_threshold,
+        parameter=parameter,
+        base_device=base_device,
+    )
+
+
+def inter_sensor_correlation_result(
+    devices: list[str],
+    data_devices: list[str],
+    correlations: dict[str, np.ndarray],
+    device_indices: dict[str, int],
+    threshold: float,
+    r2_threshold: float,
+    parameter: str,
+    base_device: str,
+) -> BaseResult:
+    """
+    Pass/fail results of the device pairs from (devices x devices) correlation matrices per parameter, whose rows
+    and columns are given by device_indices. With a base device, data_devices are compared to it.
+    """
     if len(devices) < 2:
         return BaseResult(
             results=[],
@@ -216,20 +384,16 @@ def compute_inter_sensor_correlation(
     failed_devices: list[str] = []
     results: list[dict] = []
 
-    correlation_cols = ["timestamp", parameter]
-    correlation_cols.extend(other_parameters)
-    correlation_cols = list(set(correlation_cols))
-
     if base_device is not None and base_device != "":
-        for device in data.keys():
+        for device in data_devices:
             if device == base_device:
                 continue
 
             device_pair_correlation = compute_devices_inter_sensor_correlation(
-                correlation_cols=correlation_cols,
+                correlations=correlations,
+                device_indices=device_indices,
                 device_x=base_device,
                 device_y=device,
-                data=data,
                 parameter=parameter,
                 threshold=threshold,
                 r2_threshold=r2_threshold,
@@ -251,10 +415,10 @@ def compute_inter_sensor_correlation(
             device_y = device_pair[1]
 
             device_pair_correlation = compute_devices_inter_sensor_correlation(
-                correlation_cols=correlation_cols,
+                correlations=correlations,
+                device_indices=device_indices,
                 device_x=device_x,
                 device_y=device_y,
-                data=data,
                 parameter=parameter,
                 threshold=threshold,
                 r2_threshold=r2_threshold,
@@ -304,11 +468,39 @@ def compute_intra_sensor_correlation(
     parameter: str,
     r2_threshold: float,
 ) -> IntraSensorCorrelationResult:
-    correlation: list[IntraSensorCorrelation] = []
+    pearson: dict[str, dict[str, float]] = {}
 
     for device in devices:
         device_data = data.get(device, pd.DataFrame())
         if len(device_data.index) == 0:
+            continue
+
+        pearson[device] = {
+            col: device_data[[sensor_x, sensor_y]].corr().iloc[0][sensor_y]
+            for col, (sensor_x, sensor_y) in INTRA_SENSOR_COLUMNS.items()
+        }
+
+    return intra_sensor_correlation_result(
+        devices=devices,
+        pearson=pearson,
+        threshold=threshold,
+        parameter=parameter,
+        r2_threshold=r2_threshold,
+    )
+
+
+def intra_sensor_correlation_result(
+    devices: list[str],
+    pearson: dict[str, dict[str, float]],
+    threshold: float,
+    parameter: str,
+    r2_threshold: float,
+) -> IntraSensorCorrelationResult:
+    """Pass/fail results of the devices from the correlations between their two sensors, for devices with data"""
+    correlation: list[IntraSensorCorrelation] = []
+
+    for device in devices:
+        if device not in pearson:
             device_correlation = IntraSensorCorrelation(
                 device_name=device,
                 pm2_5_pearson=None,
@@ -320,21 +512,22 @@ def compute_intra_sensor_correlation(
             correlation.append(device_correlation)
             continue
 
-        pm2_5_pearson = device_data[["s1_pm2_5", "s2_pm2_5"]].corr().round(4)
-        pm2_5_pearson = pm2_5_pearson.iloc[0]["s2_pm2_5"]
-        pm10_pearson = device_data[["s1_pm10", "s2_pm10"]].corr().round(4)
-        pm10_pearson = pm10_pearson.iloc[0]["s2_pm10"]
-        pm2_5_r2 = None
-        pm10_r2 = None
+        pm2_5_pearson = round(float(pearson[device]["pm2_5"]), 4)
+        pm10_pearson = round(float(pearson[device]["pm10"]), 4)
 
-        try:
-            pm2_5_r2 = math.sqrt(pm2_5_pearson)
-            pm10_r2 = math.sqrt(pm10_pearson)
-        except Exception:
-            pass
+        pm2_5_pearson = None if math.isnan(pm2_5_pearson) else pm2_5_pearson
+        pm10_pearson = None if math.isnan(pm10_pearson) else pm10_pearson
 
-        pm2_5_pearson = None if pm2_5_pearson is np.NAN else pm2_5_pearson
-        pm10_pearson = None if pm10_pearson is np.NAN else pm10_pearson
+        pm2_5_r2 = (
+            math.sqrt(pm2_5_pearson)
+            if pm2_5_pearson is not None and pm2_5_pearson >= 0
+            else None
+        )
+        pm10_r2 = (
+            math.sqrt(pm10_pearson)
+            if pm10_pearson is not None and pm10_pearson >= 0
+            else None
+        )
 
         if parameter == "pm10":
             passed = bool(pm10_pearson >= threshold) if pm10_pearson else False
@@ -546,46 +739,67 @@ def compute_data_completeness_using_raw_records(
     )
 
 
+def hourly_records_count(device_data: pd.DataFrame, parameter: str) -> int:
+    """Number of hours in which the device has records with the parameter and values for all the columns"""
+    device_data = device_data.dropna(subset=[parameter])
+    if len(device_data.index) == 0:
+        return 0
+
+    device_data = device_data.resample(pd.Timedelta(hours=1), on="timestamp").mean(
+        numeric_only=True
+    )
+    device_data = device_data.dropna(
+        subset=list(set(device_data.columns.to_list()).difference(["timestamp"])),
+    )
+    return len(device_data.index)
+
+
 def compute_data_completeness_using_hourly_records(
     data: dict[str, pd.DataFrame],
     collocation_batch: CollocationBatch,
 ) -> DataCompletenessResult:
+    hourly_records: dict[str, int] = {}
+
+    for device in collocation_batch.devices:
+        try:
+            hourly_records[device] = hourly_records_count(
+                data.get(device, pd.DataFrame()),
+                collocation_batch.data_completeness_parameter,
+            )
+        except Exception as ex:
+            print(f"Data completeness computation error: {ex}")
+
+    return data_completeness_result(
+        collocation_batch=collocation_batch, hourly_records=hourly_records
+    )
+
+
+def data_completeness_result(
+    collocation_batch: CollocationBatch, hourly_records: dict[str, int]
+) -> DataCompletenessResult:
+    """Pass/fail results of the devices from their number of complete hours, for devices that have one"""
     now = datetime.utcnow()
     end_date_time = (
         now if now < collocation_batch.end_date else collocation_batch.end_date
     )
 
-    data = data.copy()
     total_records = (end_date_time - collocation_batch.start_date).days * 24
-    expected_records = int((collocation_batch.data_completeness_threshold / 100) * total_records)
+    expected_records = int(
+        (collocation_batch.data_completeness_threshold / 100) * total_records
+    )
     completeness: list[DataCompleteness] = []
 
     for device in collocation_batch.devices:
+        if device not in hourly_records:
+            continue
         try:
-            device_data = data.get(device, pd.DataFrame())
-            device_data.dropna(
-                subset=[collocation_batch.data_completeness_parameter], inplace=True
-            )
-            actual = len(device_data.index)
+            actual = hourly_records[device]
 
             if actual == 0:
                 device_completeness = 0.0
 
             else:
-                device_data = device_data.resample("1H", on="timestamp").mean(
-                    numeric_only=True
-                )
-                device_data.dropna(
-                    subset=list(
-                        set(device_data.columns.to_list()).difference(["timestamp"])
-                    ),
-                    inplace=True,
-                )
-                actual = len(device_data.index)
-
-                device_completeness = (
-                    round(actual / total_records, 2) * 100
-                )
+                device_completeness = round(actual / total_records, 2) * 100
                 device_completeness = (
                     100 if device_completeness > 100 else device_completeness
                 )
@@ -641,3 +855,271 @@ def map_data_to_api_format(data: list) -> dict[str, dict]:
         api_data[device] = data
 
     return api_data
+
+
+@dataclass
+class CollocationBatchState:
+    """
+    Running statistics of the data of a collocation batch from its start date up to the checkpoint, from which
+    its results can be computed: per device the number of records and complete hours, per column the moments of
+    every device pair and the minimum and maximum of every device, and per parameter the moments of the two
+    sensors of every device. Percentiles can not be kept this way and are left out.
+    """
+
+    start_date: datetime
+    checkpoint: datetime
+    devices: list[str]
+    records: np.ndarray
+    hourly_records: np.ndarray
+    moments: dict[str, PairMoments]
+    minimum: dict[str, np.ndarray]
+    maximum: dict[str, np.ndarray]
+    intra_sensor_moments: dict[str, PairMoments]
+    data_source: str
+
+    @staticmethod
+    def batch_devices(collocation_batch: CollocationBatch) -> list[str]:
+        devices = list(collocation_batch.devices)
+        if (
+            collocation_batch.base_device
+            and collocation_batch.base_device not in devices
+        ):
+            devices.append(collocation_batch.base_device)
+        return devices
+
+    @staticmethod
+    def empty(collocation_batch: CollocationBatch) -> "CollocationBatchState":
+        devices = CollocationBatchState.batch_devices(collocation_batch)
+        return CollocationBatchState(
+            start_date=collocation_batch.start_date,
+            checkpoint=collocation_batch.start_date,
+            devices=devices,
+            records=np.zeros(len(devices)),
+            hourly_records=np.zeros(len(devices)),
+            moments={},
+            minimum={},
+            maximum={},
+            intra_sensor_moments={},
+            data_source="",
+        )
+
+    def matches(self, collocation_batch: CollocationBatch) -> bool:
+        return self.start_date == collocation_batch.start_date and (
+            self.devices == CollocationBatchState.batch_devices(collocation_batch)
+        )
+
+    def update(
+        self,
+        data: dict[str, pd.DataFrame],
+        checkpoint: datetime,
+        data_source: str,
+        completeness_parameter: str,
+    ):
+        """Adds the data from the previous checkpoint up to `checkpoint`"""
+        columns = list(
+            dict.fromkeys(
+                col
+                for device_data in data.values()
+                for col in device_data.select_dtypes(include="number").columns
+            )
+        )
+        matrices = devices_matrix(data=data, devices=self.devices, parameters=columns)
+
+        for col, matrix in matrices.items():
+            moments = PairMoments.of_columns(matrix, matrix)
+            self.moments[col] = (
+                self.moments[col].merge(moments) if col in self.moments else moments
+            )
+            self.minimum[col] = np.fmin(
+                self.minimum.get(col, np.nan),
+                np.fmin.reduce(matrix, axis=0, initial=np.nan),
+            )
+            self.maximum[col] = np.fmax(
+                self.maximum.get(col, np.nan),
+                np.fmax.reduce(matrix, axis=0, initial=np.nan),
+            )
+
+        for col, (sensor_x, sensor_y) in INTRA_SENSOR_COLUMNS.items():
+            if sensor_x not in matrices or sensor_y not in matrices:
+                continue
+            moments = PairMoments.of_columns(
+                matrices[sensor_x], matrices[sensor_y]
+            ).diagonal()
+            self.intra_sensor_moments[col] = (
+                self.intra_sensor_moments[col].merge(moments)
+                if col in self.intra_sensor_moments
+                else moments
+            )
+
+        for index, device in enumerate(self.devices):
+            device_data = data.get(device, pd.DataFrame())
+            if len(device_data.index) == 0:
+                continue
+            self.records[index] += len(device_data.index)
+            self.hourly_records[index] += hourly_records_count(
+                device_data, completeness_parameter
+            )
+
+        self.checkpoint = checkpoint
+        self.data_source = data_source
+
+    def statistics(self) -> list[dict]:
+        """Statistics of each device in the format of `compute_statistics`, with None percentiles"""
+        statistics = []
+        for index, device in enumerate(self.devices):
+            device_statistics = {}
+            for col, moments in self.moments.items():
+                count = moments.count[index, index]
+                mean = moments.mean_x[index, index]
+                m2 = moments.m2_x[index, index]
+                minimum = self.minimum[col][index]
+                maximum = self.maximum[col][index]
+                device_statistics = {
+                    **device_statistics,
+                    **{
+                        f"{col}_mean": float(mean) if count > 0 else None,
+                        f"{col}_std": (
+                            math.sqrt(m2 / (count - 1)) if count > 1 else None
+                        ),
+                        f"{col}_min": None if np.isnan(minimum) else float(minimum),
+                        f"{col}_max": None if np.isnan(maximum) else float(maximum),
+                        f"{col}_25_percentile": None,
+                        f"{col}_50_percentile": None,
+                        f"{col}_75_percentile": None,
+                    },
+                }
+
+            statistics.append({**device_statistics, **{"device_name": device}})
+
+        return statistics
+
+    def to_dict(self) -> dict:
+        return {
+            "start_date": self.start_date,
+            "checkpoint": self.checkpoint,
+            "devices": self.devices,
+            "records": self.records.tolist(),
+            "hourly_records": self.hourly_records.tolist(),
+            "moments": {col: value.to_dict() for col, value in self.moments.items()},
+            "minimum": {col: value.tolist() for col, value in self.minimum.items()},
+            "maximum": {col: value.tolist() for col, value in self.maximum.items()},
+            "intra_sensor_moments": {
+                col: value.to_dict() for col, value in self.intra_sensor_moments.items()
+            },
+            "data_source": self.data_source,
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> "CollocationBatchState":
+        return CollocationBatchState(
+            start_date=data["start_date"],
+            checkpoint=data["checkpoint"],
+            devices=data["devices"],
+            records=np.asarray(data["records"], dtype=float),
+            hourly_records=np.asarray(data["hourly_records"], dtype=float),
+            moments={
+                col: PairMoments.from_dict(value)
+                for col, value in data["moments"].items()
+            },
+            minimum={
+                col: np.asarray(value, dtype=float)
+                for col, value in data["minimum"].items()
+            },
+            maximum={
+                col: np.asarray(value, dtype=float)
+                for col, value in data["maximum"].items()
+            },
+            intra_sensor_moments={
+                col: PairMoments.from_dict(value)
+                for col, value in data["intra_sensor_moments"].items()
+            },
+            data_source=data["data_source"],
+        )
+
+
+def compute_batch_results_from_state(
+    collocation_batch: CollocationBatch, state: CollocationBatchState
+) -> CollocationBatchResult:
+    device_indices = {device: index for index, device in enumerate(state.devices)}
+    devices_with_data = [
+        device
+        for device in collocation_batch.devices
+        if state.records[device_indices[device]] > 0
+    ]
+
+    data_completeness = data_completeness_result(
+        collocation_batch=collocation_batch,
+        hourly_records={
+            device: int(state.hourly_records[device_indices[device]])
+            for device in collocation_batch.devices
+        },
+    )
+
+    intra_sensor_pearson = {
+        col: moments.pearson() for col, moments in state.intra_sensor_moments.items()
+    }
+    intra_sensor_correlation = intra_sensor_correlation_result(
+        devices=collocation_batch.devices,
+        pearson={
+            device: {
+                col: (
+                    intra_sensor_pearson[col][device_indices[device]]
+                    if col in intra_sensor_pearson
+                    else np.nan
+                )
+                for col in INTRA_SENSOR_COLUMNS
+            }
+            for device in devices_with_data
+        },
+        threshold=collocation_batch.intra_correlation_threshold,
+        parameter=collocation_batch.intra_correlation_parameter,
+        r2_threshold=collocation_batch.intra_correlation_r2_threshold,
+    )
+
+    correlation_cols = [collocation_batch.inter_correlation_parameter]
+    correlation_cols.extend(collocation_batch.inter_correlation_additional_parameters)
+    inter_sensor_correlation = inter_sensor_correlation_result(
+        devices=collocation_batch.devices,
+        data_devices=collocation_batch.devices,
+        correlations={
+            col: (
+                state.moments[col].pearson()
+                if col in state.moments
+                else np.full((len(state.devices), len(state.devices)), np.nan)
+            )
+            for col in dict.fromkeys(correlation_cols)
+        },
+        device_indices=device_indices,
+        threshold=collocation_batch.inter_correlation_threshold,
+        r2_threshold=collocation_batch.inter_correlation_r2_threshold,
+        parameter=collocation_batch.inter_correlation_parameter,
+        base_device=collocation_batch.base_device,
+    )
+
+    statistics = [
+        device_statistics
+        for device_statistics in state.statistics()
+        if device_statistics["device_name"] in collocation_batch.devices
+    ]
+    differences = compute_differences(
+        statistics=copy.deepcopy(statistics),
+        base_device=collocation_batch.base_device,
+        devices=collocation_batch.devices,
+        parameter=collocation_batch.differences_parameter,
+        threshold=collocation_batch.differences_threshold,
+    )
+    errors = []
+    errors.extend(inter_sensor_correlation.errors)
+    errors.extend(differences.errors)
+    errors.extend(intra_sensor_correlation.errors)
+    errors.extend(data_completeness.errors)
+
+    return CollocationBatchResult(
+        data_completeness=data_completeness,
+        intra_sensor_correlation=intra_sensor_correlation,
+        data_source=state.data_source,
+        statistics=statistics,
+        inter_sensor_correlation=inter_sensor_correlation,
+        differences=differences,
+        errors=errors,
+    )
@@ -69,67 +69,125 @@ def get_all_devices():
     return active_devices
 
 
-def compute_number_of_months_between_two_dates(start_date, end_date):
-    number_of_months = (end_date.year - start_date.year) * \
-        12 + (end_date.month - start_date.month)
-    return number_of_months
+HOURLY_FIELDS = ['s1_pm2_5', 's1_pm10', 's2_pm2_5', 's2_pm10', 'battery_voltage',
+                 's1_s2_average_pm2_5', 's1_s2_average_pm10']
 
 
-def get_raw_channel_data(channel_id: int, hours=24):
-    channel_id = str(channel_id)
+def query_hourly_channels_data(select: str, channel_ids: list, hours: int) -> pd.DataFrame:
+    """
+    Runs `select` over hourly_data, the hourly averages of the raw feeds of all the channels over the last `hours` hours
+    """
     client = bigquery.Client()
-    sql_query = """ 
-           
-            SELECT SAFE_CAST(TIMESTAMP(created_at) as DATETIME) as time, channel_id,field1 as s1_pm2_5,
-            field2 as s1_pm10, field3 as s2_pm2_5, field4 as s2_pm10, field7 as battery_voltage
-            FROM `airqo-250220.thingspeak.raw_feeds_pms` 
-            WHERE channel_id = {0} AND CAST(created_at as TIMESTAMP) >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL {1} HOUR) 
-            ORDER BY time DESC           
-            
+    sql_query = f"""
+            WITH hourly_data AS (
+                SELECT channel_id, time, AVG(s1_pm2_5) as s1_pm2_5, AVG(s1_pm10) as s1_pm10,
+                AVG(s2_pm2_5) as s2_pm2_5, AVG(s2_pm10) as s2_pm10, AVG(battery_voltage) as battery_voltage,
+                AVG(ROUND((COALESCE(s1_pm2_5, s2_pm2_5) + COALESCE(s2_pm2_5, s1_pm2_5)) / 2, 2)) as s1_s2_average_pm2_5,
+                AVG(ROUND((COALESCE(s1_pm10, s2_pm10) + COALESCE(s2_pm10, s1_pm10)) / 2, 2)) as s1_s2_average_pm10
+                FROM (
+                    SELECT CAST(channel_id as STRING) as channel_id,
+                    TIMESTAMP_TRUNC(CAST(created_at as TIMESTAMP), HOUR) as time,
+                    SAFE_CAST(field1 as FLOAT64) as s1_pm2_5, SAFE_CAST(field2 as FLOAT64) as s1_pm10,
+                    SAFE_CAST(field3 as FLOAT64) as s2_pm2_5, SAFE_CAST(field4 as FLOAT64) as s2_pm10,
+                    SAFE_CAST(field7 as FLOAT64) as battery_voltage
+                    FROM `airqo-250220.thingspeak.raw_feeds_pms`
+                    WHERE CAST(channel_id as STRING) IN UNNEST(@channel_ids)
+                    AND CAST(created_at as TIMESTAMP) >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL @hours HOUR)
+                )
+                GROUP BY channel_id, time
+            )
+            {select}
         """
-    xx = "'" + channel_id + "'"
-    sql_query = sql_query.format(xx, hours)
 
-    job_config = bigquery.QueryJobConfig()
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ArrayQueryParameter("channel_ids", "STRING", channel_ids),
+            bigquery.ScalarQueryParameter("hours", "INT64", hours),
+        ]
+    )
     job_config.use_legacy_sql = False
 
     df = client.query(sql_query, job_config=job_config).to_dataframe()
-    df['time'] = pd.to_datetime(df['time'])
-    df['time'] = df['time']
-    df['s1_pm2_5'] = pd.to_numeric(df['s1_pm2_5'], errors='coerce')
-    df['channel_id'] = pd.to_numeric(df['channel_id'], errors='coerce')
-    df['s1_pm10'] = pd.to_numeric(df['s1_pm10'], errors='coerce')
-    df['s2_pm2_5'] = pd.to_numeric(df['s2_pm2_5'], errors='coerce')
-    df['s2_pm10'] = pd.to_numeric(df['s2_pm10'], errors='coerce')
-    df['s1_s2_average_pm2_5'] = df[[
-        's1_pm2_5', 's2_pm2_5']].mean(axis=1).round(2)
-    df['s1_s2_average_pm10'] = df[['s1_pm10', 's2_pm10']].mean(axis=1).round(2)
-    df['battery_voltage'] = pd.to_numeric(
-        df['battery_voltage'], errors='coerce')
-    time_indexed_data = df.set_index('time')
-    final_hourly_data = time_indexed_data.resample('H').mean().round(2)
-
-    final_hourly_data_copy = final_hourly_data.resample('D').mean().dropna()
-    sensor_one_pm2_5_readings = final_hourly_data_copy['s1_pm2_5'].tolist()
-    sensor_two_pm2_5_readings = final_hourly_data_copy['s2_pm2_5'].tolist()
-    battery_voltage_readings = final_hourly_data_copy['battery_voltage'].tolist(
+    df['time'] = pd.to_datetime(df['time'], utc=True).dt.tz_localize(None)
+    return df
+
+
+def get_hourly_channels_data(channel_ids: list, hours: int) -> pd.DataFrame:
+    """
+    Gets the hourly averages of the raw feeds of all the channels over the last `hours` hours, with one grouped query
+    """
+    df = query_hourly_channels_data(
+        "SELECT * FROM hourly_data", channel_ids, hours)
+    df[HOURLY_FIELDS] = df[HOURLY_FIELDS].apply(
+        pd.to_numeric, errors='coerce').round(2)
+    return df
+
+
+def get_valid_channel_hours(channel_ids: list, hours: int) -> pd.DataFrame:
+    """
+    Gets the channel_id and time of the valid hours of all the channels over the last `hours` hours.
+    An hour is valid when all the fields have values and the average PM2.5 is positive.
+    """
+    has_values = ' AND '.join(
+        f'{field} IS NOT NULL' for field in HOURLY_FIELDS)
+    return query_hourly_channels_data(
+        f"SELECT channel_id, time FROM hourly_data WHERE {has_values} AND ROUND(s1_s2_average_pm2_5, 2) > 0",
+        channel_ids, hours)
+
+
+def compute_valid_hours_from(valid_hours: pd.DataFrame, start: datetime, end: datetime) -> pd.DataFrame:
+    """
+    Builds the (hours x channels) matrix of the number of valid hours of each channel from each hour up to end,
+    from the channel_id and time of the valid hours
+    """
+    hours = pd.date_range(floor_hour(start), floor_hour(end),
+                          freq=pd.Timedelta(hours=1))
+
+    valid_hours = (
+        valid_hours.assign(valid=1)
+        .pivot(index='time', columns='channel_id', values='valid')
+        .reindex(index=hours)
+        .fillna(0)
     )
-    time_readings = final_hourly_data_copy.index.tolist()
+    return valid_hours.iloc[::-1].cumsum().iloc[::-1]
 
-    total_hourly_records_count = final_hourly_data.shape[0]
 
-    records_with_valid_values = final_hourly_data[final_hourly_data['s1_s2_average_pm2_5'] <= 500.4]
-    records_with_valid_values = final_hourly_data[final_hourly_data['s1_s2_average_pm2_5'] > 0]
+def floor_hour(date):
+    return date.replace(minute=0, second=0, microsecond=0)
 
-    records_with_valid_values_count = records_with_valid_values.shape[0]
 
-    invalid_records_count = records_with_valid_values - records_with_valid_values_count
+def get_specified_hours(time_period: dict, device: dict, now: datetime) -> int:
+    """
+    Gets the number of hours the uptime of the device is computed over, for the time period
+    """
+    if time_period['label'] == 'twelve_months':
+        twelve_months_ago = (pd.Timestamp(now.date()) -
+                             pd.DateOffset(years=1)).date()
+        start_date = max(twelve_months_ago, device['createdAt'].date())
+        specified_hours = (now.date() - start_date).days * 24
+
+    elif time_period['label'] == 'all_time':
+        specified_hours = (now.date() - device['createdAt'].date()).days * 24
+
+    else:
+        specified_hours = int(time_period['specified_hours'])
+
+    if device['mobility'] == 'Mobile':
+        # divide the specified hours by 2.. for mobile devices, use 12 hours
+        specified_hours = int(specified_hours/2)
 
-    valid_hourly_records_with_out_null_values = records_with_valid_values.dropna().reset_index()
-    valid_hourly_records_with_out_null_values_count = valid_hourly_records_with_out_null_values.shape[
-        0]
+    return specified_hours
 
-    return valid_hourly_records_with_out_null_values_count, total_hourly_records_count, sensor_one_pm2_5_readings, sensor_two_pm2_5_readings, battery_voltage_readings, time_readings
+
+def get_daily_readings(hourly_data: pd.DataFrame, start: datetime):
+    """
+    Gets the daily sensor one and two PM2.5, battery voltage and time readings of a channel since start
+    """
+    hourly_data = hourly_data[hourly_data['time'] >= floor_hour(start)]
+    daily_data = hourly_data.set_index('time')[HOURLY_FIELDS].resample(
+        pd.Timedelta(days=1)).mean().dropna()
+
+    return daily_data['s1_pm2_5'].tolist(), daily_data['s2_pm2_5'].tolist(), daily_data['battery_voltage'].tolist(), daily_data.index.tolist()
 
 
 def calculate_device_uptime(expected_total_records_count, actual_valid_records_count):
@@ -149,72 +207,55 @@ def compute_uptime_for_all_devices():
 
     time_periods = [{'label': 'twenty_four_hours', 'specified_hours': 24, 'specifed_hours_mobile': 12}, {'label': 'seven_days', 'specified_hours': 168, 'specifed_hours_mobile': 84},
                     {'label': 'twenty_eight_days', 'specified_hours': 672, 'specifed_hours_mobile': 336}, {'label': 'twelve_months', 'specified_hours': 0, 'specifed_hours_mobile': 0}, {'label': 'all_time', 'specified_hours': 0, 'specifed_hours_mobile': 0}]
-
-    average_uptime_for_entire_network_in_percentage_for_twentyfour_hours = {}
-    twentyfour_hours = 0
-    average_uptime_for_entire_network_in_percentage_for_seven_days = {}
-    seven_days = 0
-    average_uptime_for_entire_network_in_percentage_for_twenty_eight_days = {}
-    twenty_eight_days = 0
-    average_uptime_for_entire_network_in_percentage_for_twelve_months = {}
-    twelve_months = 0
-    average_uptime_for_entire_network_in_percentage_for_all_time = {}
-    all_time = 0
+    network_uptime_keys = {'twenty_four_hours': 'average_uptime_for_entire_network_for_twentyfour_hours',
+                           'seven_days': 'average_uptime_for_entire_network_for_seven_days',
+                           'twenty_eight_days': 'average_uptime_for_entire_network_for_twenty_eight_days',
+                           'twelve_months': 'average_uptime_for_entire_network_for_twelve_months',
+                           'all_time': 'average_uptime_for_entire_network_for_all_time'}
+
+    results = get_all_devices()
+    now = datetime.utcnow()
+    specified_hours = {
+        (time_period['label'], str(device['channelID'])): get_specified_hours(time_period, device, now)
+        for time_period in time_periods
+        for device in results
+    }
+    longest_hours = max(specified_hours.values(), default=0)
+    print('longest specified hours\t' + str(longest_hours))
+
+    # One query of the valid hours over the longest window, from which the uptime of every period is derived
+    channel_ids = list({str(device['channelID']) for device in results})
+    valid_hours_from = compute_valid_hours_from(
+        get_valid_channel_hours(channel_ids, longest_hours), now - timedelta(hours=longest_hours), now)
+
+    # The readings are only kept for the twenty eight days period
+    readings_hours = max((hours for (label, _), hours in specified_hours.items()
+                          if label == 'twenty_eight_days'), default=0)
+    hourly_data = get_hourly_channels_data(channel_ids, readings_hours)
+    hourly_data_by_channel = dict(list(hourly_data.groupby('channel_id')))
+
+    entire_network_uptime_record_for_all_periods = {}
 
     for time_period in time_periods:
-        results = get_all_devices()
-        specified_hours = int(time_period['specified_hours'])
         device_uptime_records = []
         all_devices_uptime_series = []
 
-        if time_period['label'] == 'twelve_months':
-            today = dt.date.today()
-            past_day = today.day
-            past_month = (today.month - 12) % 12
-            past_year = today.year - ((today.month + 12)//12)
-            twelve_months_later = dt.date(past_year, past_month, past_day)
-            delta = datetime.now().date() - twelve_months_later
-            no_of_days = delta.days
-            specified_hours = no_of_days * 24
-
-        elif time_period['label'] == 'all_time':
-            no_of_days = 365
-            specified_hours = no_of_days * 24
-
-        print('specified hours\t' + str(specified_hours))
         for device in results:
             channel_id = device['channelID']
-            mobililty = device['mobility']
             device_id = device['_id']
             device_name = device['name']
-
-            if time_period['label'] == 'twelve_months':
-                device_registration_date = device['createdAt']
-                end_date = datetime.now().date()
-                start_date = device_registration_date.date()
-                number_of_months = compute_number_of_months_between_two_dates(
-                    start_date, end_date)
-                if number_of_months < 12:
-                    delta = end_date - device_registration_date.date()
-                    no_of_days = delta.days
-                    specified_hours = no_of_days * 24
-
-            if time_period['label'] == 'all_time':
-                device_registration_date = device['createdAt']
-                delta = datetime.now().date() - device_registration_date.date()
-                no_of_days = delta.days
-                specified_hours = no_of_days * 24
-
-            if mobililty == 'Mobile':
-                # divide the specified hours by 2.. for mobile devices, use 12 hours
-                specified_hours = int(specified_hours/2)
-
-            valid_hourly_records_with_out_null_values_count, total_hourly_records_count, sensor_one_pm2_5_readings, sensor_two_pm2_5_readings, battery_voltage_readings, time_readings = get_raw_channel_data(
-                channel_id, specified_hours)
+            device_specified_hours = specified_hours[(
+                time_period['label'], str(channel_id))]
+            start = now - timedelta(hours=device_specified_hours)
+
+            valid_hourly_records_with_out_null_values_count = 0
+            if str(channel_id) in valid_hours_from.columns:
+                valid_hourly_records_with_out_null_values_count = int(
+                    valid_hours_from.at[floor_hour(start), str(channel_id)])
             print('valid records count' +
                   str(valid_hourly_records_with_out_null_values_count))
             device_uptime_in_percentage, device_downtime_in_percentage = calculate_device_uptime(
-                specified_hours, valid_hourly_records_with_out_null_values_count)
+                device_specified_hours, valid_hourly_records_with_out_null_values_count)
             print('device-uptime \t' + str(device_uptime_in_percentage) +
                   '\n downtime \t' + str(device_downtime_in_percentage))
 
@@ -223,9 +264,11 @@ def compute_uptime_for_all_devices():
             all_devices_uptime_series.append(device_uptime_in_percentage)
             device_uptime_record = {"device_uptime_in_percentage": device_uptime_in_percentage,
                                     "device_downtime_in_percentage": device_downtime_in_percentage, "created_at": created_at,
-                                    "device_channel_id": channel_id, "specified_time_in_hours": specified_hours, "device_name": device_name, "device_id": device_id}
+                                    "device_channel_id": channel_id, "specified_time_in_hours": device_specified_hours, "device_name": device_name, "device_id": device_id}
 
             if time_period['label'] == 'twenty_eight_days':
+                sensor_one_pm2_5_readings, sensor_two_pm2_5_readings, battery_voltage_readings, time_readings = get_daily_readings(
+                    hourly_data_by_channel.get(str(channel_id), hourly_data.iloc[0:0]), start)
                 device_uptime_record["device_sensor_one_pm2_5_readings"] = sensor_one_pm2_5_readings
                 device_uptime_record["device_sensor_two_pm2_5_readings"] = sensor_two_pm2_5_readings
                 device_uptime_record["device_battery_voltage_readings"] = battery_voltage_readings
@@ -237,63 +280,20 @@ def compute_uptime_for_all_devices():
             np.mean(all_devices_uptime_series), 2)
         created_at = str_to_date(date_to_str(datetime.now()))
 
-        print('average uptime for entire network in percentage is : {}%'.format(
-            average_uptime_for_entire_network_in_percentage_for_selected_timeperiod))
-
-        if time_period['label'] == 'twenty_four_hours':
-            entire_network_uptime_record = {"average_uptime_for_entire_network_in_percentage": average_uptime_for_entire_network_in_percentage_for_selected_timeperiod,
-                                            "device_uptime_records": device_uptime_records, "created_at": created_at, 'specified_time_in_hours': specified_hours}
-
-            twentyfour_hours = average_uptime_for_entire_network_in_percentage_for_selected_timeperiod
-            average_uptime_for_entire_network_in_percentage_for_twentyfour_hours = entire_network_uptime_record
-            print('twenty four hours' +
-                  str(average_uptime_for_entire_network_in_percentage_for_selected_timeperiod))
-        elif time_period['label'] == 'seven_days':
-            entire_network_uptime_record = {"average_uptime_for_entire_network_in_percentage": average_uptime_for_entire_network_in_percentage_for_selected_timeperiod,
-                                            "device_uptime_records": device_uptime_records, "created_at": created_at, 'specified_time_in_hours': specified_hours}
-
-            seven_days = average_uptime_for_entire_network_in_percentage_for_selected_timeperiod
-            average_uptime_for_entire_network_in_percentage_for_seven_days = entire_network_uptime_record
-        elif time_period['label'] == 'twelve_months':
-            entire_network_uptime_record = {"average_uptime_for_entire_network_in_percentage": average_uptime_for_entire_network_in_percentage_for_selected_timeperiod,
-                                            "device_uptime_records": device_uptime_records, "created_at": created_at, 'specified_time_in_hours': specified_hours}
-
-            twelve_months = average_uptime_for_entire_network_in_percentage_for_selected_timeperiod
-            print('twelve_months' +
-                  str(average_uptime_for_entire_network_in_percentage_for_selected_timeperiod))
-            average_uptime_for_entire_network_in_percentage_for_twelve_months = entire_network_uptime_record
-        elif time_period['label'] == 'twenty_eight_days':
-            entire_network_uptime_record = {"average_uptime_for_entire_network_in_percentage": average_uptime_for_entire_network_in_percentage_for_selected_timeperiod,
-                                            "device_uptime_records": device_uptime_records, "created_at": created_at, 'specified_time_in_hours': specified_hours}
-
-            twenty_eight_days = average_uptime_for_entire_network_in_percentage_for_selected_timeperiod
-            print(
-                '28 days' + str(average_uptime_for_entire_network_in_percentage_for_selected_timeperiod))
-            average_uptime_for_entire_network_in_percentage_for_twenty_eight_days = entire_network_uptime_record
-        elif time_period['label'] == 'all_time':
-            entire_network_uptime_record = {"average_uptime_for_entire_network_in_percentage": average_uptime_for_entire_network_in_percentage_for_selected_timeperiod,
-                                            "device_uptime_records": device_uptime_records, "created_at": created_at, 'specified_time_in_hours': specified_hours}
-
-            all_time = average_uptime_for_entire_network_in_percentage_for_selected_timeperiod
-            print(
-                'alltime' + str(average_uptime_for_entire_network_in_percentage_for_selected_timeperiod))
-            average_uptime_for_entire_network_in_percentage_for_all_time = entire_network_uptime_record
+        print('{} average uptime for entire network in percentage is : {}%'.format(
+            time_period['label'], average_uptime_for_entire_network_in_percentage_for_selected_timeperiod))
+
+        entire_network_uptime_record = {"average_uptime_for_entire_network_in_percentage": average_uptime_for_entire_network_in_percentage_for_selected_timeperiod,
+                                        "device_uptime_records": device_uptime_records, "created_at": created_at, 'specified_time_in_hours': max([record['specified_time_in_hours'] for record in device_uptime_records], default=0)}
+        entire_network_uptime_record_for_all_periods[network_uptime_keys[time_period['label']]] = entire_network_uptime_record
 
     all_network_device_uptime_records = []
 
-    entire_network_uptime_record_for_all_periods = {"average_uptime_for_entire_network_for_twentyfour_hours": average_uptime_for_entire_network_in_percentage_for_twentyfour_hours,
-                                                    "average_uptime_for_entire_network_for_seven_days": average_uptime_for_entire_network_in_percentage_for_seven_days,
-                                                    "average_uptime_for_entire_network_for_twenty_eight_days": average_uptime_for_entire_network_in_percentage_for_twenty_eight_days,
-                                                    "average_uptime_for_entire_network_for_twelve_months": average_uptime_for_entire_network_in_percentage_for_twelve_months,
-                                                    "average_uptime_for_entire_network_for_all_time": average_uptime_for_entire_network_in_percentage_for_all_time,
-                                                    "created_at": created_at}
+    entire_network_uptime_record_for_all_periods["created_at"] = created_at
 
     all_network_device_uptime_records.append(
         entire_network_uptime_record_for_all_periods)
 
-    # print('average uptime for entire network is : {}%'.format(
-    # entire_network_uptime_record_for_all_periods))
-
     save_network_uptime_analysis_results(all_network_device_uptime_records)
 
 
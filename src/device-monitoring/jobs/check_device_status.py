@@ -2,9 +2,11 @@ import base64
 import datetime as dt
 from bson import json_util, ObjectId
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime,timedelta
 from pymongo import MongoClient
 import requests
+from requests.adapters import HTTPAdapter
 import math
 import os
 
@@ -13,6 +15,11 @@ MONGO_URI = os.getenv("MONGO_URI")
 client = MongoClient(MONGO_URI)
 db=client['airqo_netmanager']
 
+BASE_API_URL='https://data-manager-dot-airqo-250220.uc.r.appspot.com/api/v1/data/'
+# Number of recent feed requests in flight at a time, and the seconds to wait for each
+RECENT_FEEDS_MAX_WORKERS = int(os.getenv("RECENT_FEEDS_MAX_WORKERS", 16))
+RECENT_FEEDS_TIMEOUT = float(os.getenv("RECENT_FEEDS_TIMEOUT", 30))
+
 def function_to_execute(event, context):
     """Triggered from a message on a Cloud Pub/Sub topic.
     Args:
@@ -61,17 +68,36 @@ def date_to_formated_str(date):
     return datetime.strftime(date,'%Y-%m-%d %H:%M')
 
 def get_all_devices():
-    results = list(db.devices.find({"locationID":{ '$ne': '' } },{'_id':0}))
-    active_devices = []
+    results = list(db.devices.find({"locationID":{ '$ne': '' }, "isActive": True },{'_id':0}))
     for device in results:
-        print(device['name'])        
-        if(device['isActive'] == True):
-            active_devices.append(device)
-    return active_devices
+        print(device['name'])
+    return results
+
+def get_recent_feed(session, channel_id):
+    """
+    Gets the most recent feed of the channel, or None if it can not be retrieved
+    """
+    latest_device_status_request_api_url = '{0}{1}{2}'.format(BASE_API_URL,'feeds/recent/', channel_id )
+    try:
+        latest_device_status_response = session.get(latest_device_status_request_api_url, timeout=RECENT_FEEDS_TIMEOUT)
+    except requests.exceptions.RequestException as ex:
+        print('Cannot get the recent feed of channel {}: {}'.format(channel_id, ex))
+        return None
+
+    if latest_device_status_response.status_code != 200:
+        return None
+    return latest_device_status_response.json()
+
+def get_recent_feeds(channel_ids):
+    """
+    Gets the most recent feeds of the channels concurrently, over one pool of kept alive connections
+    """
+    with requests.Session() as session:
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=RECENT_FEEDS_MAX_WORKERS))
+        with ThreadPoolExecutor(max_workers=RECENT_FEEDS_MAX_WORKERS) as executor:
+            return list(executor.map(lambda channel_id: get_recent_feed(session, channel_id), channel_ids))
 
 def get_device_channel_status():
-        BASE_API_URL='https://data-manager-dot-airqo-250220.uc.r.appspot.com/api/v1/data/'
-        
         api_url = '{0}{1}'.format(BASE_API_URL,'channels')
         print(api_url)         
         results = get_all_devices()
@@ -80,13 +106,11 @@ def get_device_channel_status():
         online_devices=[]
         offline_devices=[]
         count_of_offline_devices =0
-        for channel in results:
+        recent_feeds = get_recent_feeds([channel['channelID'] for channel in results])
+        for channel, result in zip(results, recent_feeds):
             print(channel['channelID'])
-            latest_device_status_request_api_url = '{0}{1}{2}'.format(BASE_API_URL,'feeds/recent/', channel['channelID'] )
-            latest_device_status_response = requests.get(latest_device_status_request_api_url)
-            if latest_device_status_response.status_code == 200:
-                print(latest_device_status_response.json())
-                result = latest_device_status_response.json()
+            if result is not None:
+                print(result)
                 count += 1
                 current_datetime=   datetime.now()
                 
@@ -133,10 +157,9 @@ def get_device_channel_status():
 def save_hourly_device_status_check_results(data):
     """
     """
-    for i  in data:
-        print(i)
-        db.device_status_hourly_check_results.insert_one(i)
-        print('saved')
+    print(data)
+    db.device_status_hourly_check_results.insert_many(data)
+    print('saved')
 
 
 if __name__ == '__main__':    
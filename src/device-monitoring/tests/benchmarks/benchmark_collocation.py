@@ -0,0 +1,143 @@
+"""
+Compares the pair by pair inter sensor correlation and differences (a timestamp merge, a `.corr()` frame per
+column and one row frames per pair) with the matrix based `compute_inter_sensor_correlation` and
+`compute_differences`, for batches of 5, 20 and 50 devices.
+
+Run from src/device-monitoring with:
+    python -m tests.benchmarks.benchmark_collocation
+"""
+
+import copy
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from helpers.collocation_utils import (
+    compute_differences,
+    compute_inter_sensor_correlation,
+    compute_statistics,
+    device_pairs,
+)
+
+DEVICES = [5, 20, 50]
+HOURS = 14 * 24
+PARAMETER = "pm2_5"
+OTHER_PARAMETERS = [
+    "pm10",
+    "internal_temperature",
+    "internal_humidity",
+    "external_temperature",
+    "external_humidity",
+    "battery_voltage",
+]
+
+
+def sample_data(devices: int) -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(0)
+    timestamps = pd.date_range("2023-01-01", periods=HOURS, freq=pd.Timedelta(hours=1))
+    signal = rng.uniform(10, 80, len(timestamps))
+    data = {}
+    for device in range(devices):
+        readings = {
+            parameter: signal * rng.uniform(0.9, 1.1) + rng.normal(0, 2, HOURS)
+            for parameter in [PARAMETER, *OTHER_PARAMETERS]
+        }
+        device_data = pd.DataFrame({"timestamp": timestamps, **readings})
+        data[f"aq_{device}"] = device_data[rng.uniform(size=HOURS) > 0.1]
+    return data
+
+
+def legacy_pair_correlation(data, device_x, device_y, correlation_cols) -> dict:
+    """The per pair merge and `.corr()` of `compute_devices_inter_sensor_correlation` before the matrices."""
+    device_x_data = data[device_x][correlation_cols].add_prefix(f"{device_x}_")
+    device_x_data.rename(columns={f"{device_x}_timestamp": "timestamp"}, inplace=True)
+    device_y_data = data[device_y][correlation_cols].add_prefix(f"{device_y}_")
+    device_y_data.rename(columns={f"{device_y}_timestamp": "timestamp"}, inplace=True)
+
+    device_pair_data = pd.merge(
+        left=device_x_data, right=device_y_data, on=["timestamp"]
+    )
+    device_pair_data = device_pair_data.select_dtypes(include="number")
+
+    device_pair_correlation = {}
+    for col in correlation_cols:
+        if col == "timestamp":
+            continue
+        comp_cols = [f"{device_x}_{col}", f"{device_y}_{col}"]
+        correlation = device_pair_data[comp_cols].corr().round(4)
+        correlation_value = correlation.iloc[0][comp_cols[1]]
+        device_pair_correlation[f"{col}_pearson"] = correlation_value
+        device_pair_correlation[f"{col}_r2_pearson"] = math.sqrt(correlation_value)
+    return device_pair_correlation
+
+
+def legacy_inter_sensor_correlation(data: dict[str, pd.DataFrame]) -> list[dict]:
+    correlation_cols = ["timestamp", PARAMETER, *OTHER_PARAMETERS]
+    return [
+        legacy_pair_correlation(data, device_x, device_y, correlation_cols)
+        for device_x, device_y in device_pairs(list(data.keys()))
+    ]
+
+
+def legacy_differences(statistics: list[dict]) -> list[dict]:
+    data = {row.pop("device_name"): row for row in copy.deepcopy(statistics)}
+    differences = []
+    for device_x, device_y in device_pairs(list(data.keys())):
+        device_x_data = pd.DataFrame([data[device_x]])
+        device_y_data = pd.DataFrame([data[device_y]])
+        differences.append(abs(device_x_data - device_y_data).to_dict("records")[0])
+    return differences
+
+
+def matrix_inter_sensor_correlation(data: dict[str, pd.DataFrame]):
+    return compute_inter_sensor_correlation(
+        devices=list(data.keys()),
+        data=data,
+        threshold=0.98,
+        r2_threshold=0.98,
+        parameter=PARAMETER,
+        base_device="",
+        other_parameters=OTHER_PARAMETERS,
+    )
+
+
+def matrix_differences(statistics: list[dict]):
+    return compute_differences(
+        statistics=statistics,
+        parameter=PARAMETER,
+        threshold=5,
+        base_device="",
+        devices=[row["device_name"] for row in statistics],
+    )
+
+
+def timed(function, data):
+    start = time.perf_counter()
+    result = function(data)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    print(f"hours: {HOURS}, parameters: {len(OTHER_PARAMETERS) + 1}")
+
+    for devices in DEVICES:
+        data = sample_data(devices)
+        statistics = compute_statistics(data)
+
+        for step, data_arg, legacy_function, matrix_function in [
+            (
+                "inter sensor correlation",
+                data,
+                legacy_inter_sensor_correlation,
+                matrix_inter_sensor_correlation,
+            ),
+            ("differences", statistics, legacy_differences, matrix_differences),
+        ]:
+            _, legacy_time = timed(legacy_function, data_arg)
+            _, matrix_time = timed(matrix_function, data_arg)
+            print(
+                f"{devices} devices, {step}: pairs {legacy_time:.3f}s, "
+                f"matrix {matrix_time:.3f}s, speedup {legacy_time / matrix_time:.1f}x"
+            )
@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from jobs.calculate_devices_uptime import (
+    HOURLY_FIELDS,
+    compute_valid_hours_from,
+    get_daily_readings,
+    get_specified_hours,
+)
+
+
+def test_compute_valid_hours_from():
+    valid_hours = pd.DataFrame(
+        {
+            "channel_id": ["1", "1", "1", "2"],
+            "time": pd.to_datetime(
+                [
+                    "2023-01-01 00:00",
+                    "2023-01-01 02:00",
+                    "2023-01-01 03:00",
+                    "2023-01-01 01:00",
+                ]
+            ),
+        }
+    )
+
+    valid_hours_from = compute_valid_hours_from(
+        valid_hours, datetime(2023, 1, 1, 0, 30), datetime(2023, 1, 1, 3, 45)
+    )
+
+    assert list(valid_hours_from.index) == list(
+        pd.date_range("2023-01-01 00:00", "2023-01-01 03:00", freq="60min")
+    )
+    assert valid_hours_from["1"].tolist() == [3, 2, 2, 1]
+    assert valid_hours_from["2"].tolist() == [1, 1, 0, 0]
+
+
+def test_compute_valid_hours_from_without_valid_hours():
+    valid_hours = pd.DataFrame(
+        {"channel_id": pd.Series(dtype=str), "time": pd.Series(dtype="datetime64[ns]")}
+    )
+
+    valid_hours_from = compute_valid_hours_from(
+        valid_hours, datetime(2023, 1, 1), datetime(2023, 1, 1, 5)
+    )
+
+    assert len(valid_hours_from) == 6
+    assert "1" not in valid_hours_from.columns
+
+
+@pytest.mark.parametrize(
+    "label, mobility, created_at, now, expected",
+    [
+        ("twenty_four_hours", "Static", datetime(2020, 1, 1), datetime(2023, 6, 1), 24),
+        ("twenty_four_hours", "Mobile", datetime(2020, 1, 1), datetime(2023, 6, 1), 12),
+        # Twelve months back from a December date
+        ("twelve_months", "Static", datetime(2020, 1, 1), datetime(2023, 12, 31), 8760),
+        ("twelve_months", "Mobile", datetime(2020, 1, 1), datetime(2023, 12, 15), 4380),
+        # Devices registered less than twelve months ago are capped at registration
+        ("twelve_months", "Static", datetime(2023, 3, 1), datetime(2023, 6, 1), 2208),
+        (
+            "twelve_months",
+            "Static",
+            datetime(2022, 12, 20),
+            datetime(2023, 12, 10),
+            8520,
+        ),
+        ("all_time", "Static", datetime(2022, 12, 31), datetime(2023, 1, 2), 48),
+        ("all_time", "Mobile", datetime(2022, 12, 31), datetime(2023, 1, 2), 24),
+    ],
+)
+def test_get_specified_hours(label, mobility, created_at, now, expected):
+    time_period = {"label": label, "specified_hours": 24}
+    device = {"createdAt": created_at, "mobility": mobility}
+
+    assert get_specified_hours(time_period, device, now) == expected
+
+
+def test_get_daily_readings():
+    times = pd.date_range("2023-01-01", periods=72, freq="60min")
+    hourly_data = pd.DataFrame({field: 1.0 for field in HOURLY_FIELDS}, index=times)
+    hourly_data["s1_pm2_5"] = np.arange(72, dtype=float)
+    hourly_data["s2_pm2_5"] = 2.0
+    # The second day has no battery readings, so it is left out
+    hourly_data.loc["2023-01-02", "battery_voltage"] = np.nan
+    hourly_data = hourly_data.rename_axis("time").reset_index()
+
+    s1_pm2_5, s2_pm2_5, battery_voltage, time_readings = get_daily_readings(
+        hourly_data, datetime(2023, 1, 1, 12, 30)
+    )
+
+    assert s1_pm2_5 == [17.5, 59.5]
+    assert s2_pm2_5 == [2.0, 2.0]
+    assert battery_voltage == [1.0, 1.0]
+    assert time_readings == [pd.Timestamp("2023-01-01"), pd.Timestamp("2023-01-03")]
@@ -0,0 +1,60 @@
+import time
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from jobs.check_device_status import (
+    BASE_API_URL,
+    RECENT_FEEDS_TIMEOUT,
+    get_recent_feed,
+    get_recent_feeds,
+)
+
+
+def response(status_code, feed=None):
+    return MagicMock(status_code=status_code, json=MagicMock(return_value=feed))
+
+
+def test_get_recent_feed():
+    session = MagicMock()
+    session.get.return_value = response(200, {"created_at": "2023-01-01T00:00:00Z"})
+
+    assert get_recent_feed(session, 123) == {"created_at": "2023-01-01T00:00:00Z"}
+    session.get.assert_called_once_with(
+        f"{BASE_API_URL}feeds/recent/123", timeout=RECENT_FEEDS_TIMEOUT
+    )
+
+
+def test_get_recent_feed_of_failed_requests():
+    session = MagicMock()
+
+    session.get.side_effect = requests.exceptions.Timeout()
+    assert get_recent_feed(session, 123) is None
+
+    session.get.side_effect = requests.exceptions.ConnectionError()
+    assert get_recent_feed(session, 123) is None
+
+    session.get.side_effect = None
+    session.get.return_value = response(404)
+    assert get_recent_feed(session, 123) is None
+
+
+def test_get_recent_feeds_keeps_the_order_of_the_channels():
+    def get(url, timeout):
+        channel_id = int(url.rsplit("/", 1)[-1])
+        # Earlier channels respond last
+        time.sleep((5 - channel_id) * 0.01)
+        if channel_id == 2:
+            raise requests.exceptions.Timeout()
+        if channel_id == 3:
+            return response(500)
+        return response(200, {"channel_id": channel_id})
+
+    with patch("jobs.check_device_status.requests.Session") as session_class:
+        session = session_class.return_value.__enter__.return_value
+        session.get.side_effect = get
+
+        feeds = get_recent_feeds([1, 2, 3, 4])
+
+    assert feeds == [{"channel_id": 1}, None, None, {"channel_id": 4}]
+    assert session.get.call_count == 4
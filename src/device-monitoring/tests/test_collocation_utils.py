@@ -5,12 +5,22 @@ import numpy as np
 import pandas as pd
 import pytest
 
-from helpers.collocation_utils import compute_data_completeness_using_hourly_records
+from helpers.collocation_utils import (
+    compute_data_completeness_using_hourly_records,
+    compute_differences,
+    compute_inter_sensor_correlation,
+    compute_intra_sensor_correlation,
+    compute_statistics,
+    compute_batch_results_from_state,
+    pairwise_pearson,
+    CollocationBatchState,
+)
 from models.collocation import (
     CollocationBatch,
     CollocationBatchStatus,
     CollocationBatchResult,
     DataCompletenessResult,
+    BaseResult,
 )
 
 
@@ -258,3 +268,176 @@ def test_differences_threshold(collocation_batch):
     collocation_batch.differences_threshold = 6
     valid = collocation_batch.validate(raise_exception=False)
     assert valid is False
+
+
+def test_pairwise_pearson_matches_dataframe_corr():
+    matrix = np.random.uniform(20, 100, (200, 6))
+    matrix[np.random.uniform(size=matrix.shape) < 0.2] = np.nan
+    matrix[:, 4] = 50
+    matrix[1:, 5] = np.nan
+
+    expected = pd.DataFrame(matrix).corr().to_numpy()
+    correlation = pairwise_pearson(matrix)
+
+    np.testing.assert_allclose(correlation, expected, atol=1e-9, equal_nan=True)
+
+
+def test_compute_inter_sensor_correlation():
+    timestamps = pd.date_range("2023-01-01", periods=48, freq=pd.Timedelta(hours=1))
+    values = np.random.uniform(20, 100, len(timestamps))
+    data = {
+        "x": pd.DataFrame({"timestamp": timestamps, "pm2_5": values, "pm10": values}),
+        # Reversed so that the timestamps have to be aligned
+        "y": pd.DataFrame(
+            {"timestamp": timestamps, "pm2_5": values * 2 + 1, "pm10": -values}
+        ).iloc[::-1],
+        "z": pd.DataFrame({"timestamp": timestamps, "pm2_5": -values, "pm10": values}),
+        "empty": pd.DataFrame(columns=["timestamp", "pm2_5", "pm10"]),
+    }
+
+    result = compute_inter_sensor_correlation(
+        devices=list(data.keys()),
+        data=data,
+        threshold=0.98,
+        r2_threshold=0.98,
+        parameter="pm2_5",
+        base_device="x",
+        other_parameters=["pm10"],
+    )
+
+    assert isinstance(result, BaseResult)
+    assert result.passed_devices == ["y"]
+    assert sorted(result.failed_devices) == ["empty", "z"]
+
+    results = {tuple(record["devices"]): record for record in result.results}
+    assert results[("x", "y")]["pm2_5_pearson"] == 1.0
+    assert results[("x", "y")]["pm2_5_r2_pearson"] == 1.0
+    assert results[("x", "y")]["pm10_pearson"] == -1.0
+    assert results[("x", "y")]["pm10_r2_pearson"] is None
+    assert results[("x", "z")]["pm2_5_pearson"] == -1.0
+    assert results[("x", "z")]["passed"] is False
+    assert results[("x", "empty")]["pm2_5_pearson"] is None
+    assert results[("x", "empty")]["passed"] is False
+
+
+def test_compute_differences():
+    statistics = [
+        {"device_name": "x", "pm2_5_mean": 30.0, "pm2_5_max": 60.0},
+        {"device_name": "y", "pm2_5_mean": 33.0, "pm2_5_max": None},
+        {"device_name": "z", "pm2_5_mean": 50.0, "pm2_5_max": 90.0},
+    ]
+
+    result = compute_differences(
+        statistics=statistics,
+        parameter="pm2_5",
+        threshold=5,
+        base_device="",
+        devices=["x", "y", "z"],
+    )
+
+    assert isinstance(result, BaseResult)
+    assert sorted(result.passed_devices) == ["x", "y"]
+    assert result.failed_devices == ["z"]
+    assert result.error_devices == []
+
+    results = {tuple(sorted(record["devices"])): record for record in result.results}
+    assert len(results) == 3
+    assert results[("x", "y")]["differences"] == {
+        "pm2_5_mean": 3.0,
+        "pm2_5_max": None,
+    }
+    assert results[("x", "y")]["passed"] is True
+    assert results[("x", "z")]["differences"] == {
+        "pm2_5_mean": 20.0,
+        "pm2_5_max": 30.0,
+    }
+    assert results[("x", "z")]["passed"] is False
+
+
+def generate_raw_data(start_time, hours: int) -> dict[str, pd.DataFrame]:
+    timestamps = pd.date_range(
+        start=start_time, periods=hours * 30, freq=pd.Timedelta(minutes=2)
+    )
+    signal = np.random.uniform(20, 100, len(timestamps))
+    data = {}
+    for device in ["x", "y", "z"]:
+        readings = {
+            sensor: signal + np.random.normal(0, 2, len(timestamps))
+            for sensor in ["s1_pm2_5", "s2_pm2_5", "s1_pm10", "s2_pm10"]
+        }
+        device_data = pd.DataFrame({"timestamp": timestamps, **readings})
+        device_data["pm2_5"] = device_data[["s1_pm2_5", "s2_pm2_5"]].mean(axis=1)
+        device_data["pm10"] = device_data[["s1_pm10", "s2_pm10"]].mean(axis=1)
+        device_data.loc[np.random.uniform(size=len(timestamps)) < 0.1, "pm10"] = np.nan
+        data[device] = device_data[np.random.uniform(size=len(timestamps)) > 0.3]
+    # No data for the last device
+    data["z"] = data["z"].iloc[0:0]
+    return data
+
+
+def test_collocation_batch_state_matches_full_computation(collocation_batch):
+    checkpoint = collocation_batch.start_date + timedelta(hours=20)
+    end = collocation_batch.start_date + timedelta(hours=48)
+    data = generate_raw_data(collocation_batch.start_date, hours=48)
+
+    state = CollocationBatchState.empty(collocation_batch)
+    for window_end in [checkpoint, end]:
+        window_data = {
+            device: device_data[
+                (device_data["timestamp"] >= state.checkpoint)
+                & (device_data["timestamp"] < window_end)
+            ]
+            for device, device_data in data.items()
+        }
+        state.update(
+            data=window_data,
+            checkpoint=window_end,
+            data_source="",
+            completeness_parameter=collocation_batch.data_completeness_parameter,
+        )
+        state = CollocationBatchState.from_dict(state.to_dict())
+
+    assert state.checkpoint == end
+    results = compute_batch_results_from_state(collocation_batch, state)
+
+    expected_completeness = compute_data_completeness_using_hourly_records(
+        data=data, collocation_batch=collocation_batch
+    )
+    assert results.data_completeness == expected_completeness
+
+    expected_intra_sensor_correlation = compute_intra_sensor_correlation(
+        devices=collocation_batch.devices,
+        data=data,
+        threshold=collocation_batch.intra_correlation_threshold,
+        parameter=collocation_batch.intra_correlation_parameter,
+        r2_threshold=collocation_batch.intra_correlation_r2_threshold,
+    )
+    assert results.intra_sensor_correlation == expected_intra_sensor_correlation
+
+    expected_inter_sensor_correlation = compute_inter_sensor_correlation(
+        devices=collocation_batch.devices,
+        data=data,
+        threshold=collocation_batch.inter_correlation_threshold,
+        r2_threshold=collocation_batch.inter_correlation_r2_threshold,
+        parameter=collocation_batch.inter_correlation_parameter,
+        base_device=collocation_batch.base_device,
+        other_parameters=collocation_batch.inter_correlation_additional_parameters,
+    )
+    assert sorted(results.inter_sensor_correlation.results, key=str) == sorted(
+        expected_inter_sensor_correlation.results, key=str
+    )
+    assert sorted(results.inter_sensor_correlation.failed_devices) == sorted(
+        expected_inter_sensor_correlation.failed_devices
+    )
+
+    expected_statistics = {
+        device_statistics["device_name"]: device_statistics
+        for device_statistics in compute_statistics(data)
+    }
+    for device_statistics in results.statistics:
+        expected = expected_statistics[device_statistics["device_name"]]
+        for key, value in device_statistics.items():
+            if key == "device_name" or key.endswith("percentile") or value is None:
+                assert value is None or value == expected[key]
+                continue
+            assert value == pytest.approx(expected[key])
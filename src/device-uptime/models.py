@@ -1,6 +1,3 @@
-from dataclasses import dataclass, asdict
-from datetime import datetime
-
 from config import connect_mongo
 
 
@@ -52,19 +49,3 @@ class NetworkUptime:
 
     def save_network_uptime(self, records):
         return self.db.network_uptime.insert_many(records)
-
-
-@dataclass
-class UptimeData:
-    device: str
-    site_id: str
-    timestamp: datetime
-    hourly_threshold: int
-    data_points: int
-    uptime: float
-    downtime: float
-    average_battery: float
-
-    def to_dict(self):
-        data = asdict(self)
-        return data
@@ -0,0 +1,59 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from uptime import UPTIME_SCHEMA, UptimeModel
+
+
+@pytest.fixture
+def uptime_model():
+    with patch("uptime.bigquery.Client"):
+        yield UptimeModel(date_time=datetime(2023, 1, 1), hourly_threshold=2)
+
+
+def test_compute_uptime(uptime_model):
+    raw_data = pd.DataFrame(
+        {
+            "timestamp": [
+                "2023-01-01T00:10:00Z",
+                "2023-01-01T00:10:00Z",
+                "2023-01-01T00:20:00Z",
+                "2023-01-01T00:30:00Z",
+                "2023-01-01T01:10:00Z",
+                "2023-01-01T00:10:00Z",
+            ],
+            "site_id": ["site_1"] * 5 + ["site_2"],
+            "device": ["device_1"] * 5 + ["device_2"],
+            "battery": ["3.5", "3.5", "3.7", "low", None, 4.0],
+        }
+    )
+
+    uptime = uptime_model.compute_uptime(raw_data)
+
+    assert list(uptime.columns) == [field.name for field in UPTIME_SCHEMA]
+    uptime = uptime.set_index(["device", "timestamp"])
+    hour = pd.Timestamp("2023-01-01T00:00:00Z")
+    # The duplicated reading is counted once, and three readings in the hour are clipped to 100
+    assert uptime.loc[("device_1", hour), "data_points"] == 3
+    assert uptime.loc[("device_1", hour), "uptime"] == 100
+    assert uptime.loc[("device_1", hour), "downtime"] == 0
+    # Non-numeric battery values are left out of the average
+    assert uptime.loc[("device_1", hour), "average_battery"] == pytest.approx(3.6)
+    assert uptime.loc[("device_1", hour + pd.Timedelta(hours=1)), "uptime"] == 50
+    assert pd.isna(
+        uptime.loc[("device_1", hour + pd.Timedelta(hours=1)), "average_battery"]
+    )
+    assert uptime.loc[("device_2", hour), "site_id"] == "site_2"
+    assert uptime.loc[("device_2", hour), "downtime"] == 50
+    assert (uptime["hourly_threshold"] == 2).all()
+
+
+def test_compute_uptime_of_empty_data(uptime_model):
+    uptime = uptime_model.compute_uptime(
+        pd.DataFrame(columns=["timestamp", "site_id", "device", "battery"])
+    )
+
+    assert uptime.empty
+    assert list(uptime.columns) == [field.name for field in UPTIME_SCHEMA]
@@ -1,10 +1,21 @@
 from datetime import datetime, timedelta
 
+import numpy as np
 import pandas as pd
 from google.cloud import bigquery
 
 from config import Config
-from models import UptimeData
+
+UPTIME_SCHEMA = [
+    bigquery.SchemaField("device", "STRING"),
+    bigquery.SchemaField("site_id", "STRING"),
+    bigquery.SchemaField("timestamp", "TIMESTAMP"),
+    bigquery.SchemaField("hourly_threshold", "INTEGER"),
+    bigquery.SchemaField("data_points", "INTEGER"),
+    bigquery.SchemaField("uptime", "FLOAT"),
+    bigquery.SchemaField("downtime", "FLOAT"),
+    bigquery.SchemaField("average_battery", "FLOAT"),
+]
 
 def date_to_str(date, str_format="%Y-%m-%dT%H:%M:%S.%fZ"):
     return datetime.strftime(date, str_format)
@@ -21,71 +32,41 @@ class UptimeModel:
         self.__hourly_threshold = int(hourly_threshold)
         self.__date_time = date_time
 
-    def compute_uptime(self, data: pd.DataFrame) -> list[UptimeData]:
-        devices_uptime: list[UptimeData] = []
-        data["timestamp"] = pd.to_datetime(data["timestamp"])
-        data.drop_duplicates(subset=["device", "timestamp"], inplace=True)
-        data.index = data["timestamp"]
-
-        for _, by_site in data.groupby("site_id"):
-            site_id = by_site.iloc[0]["site_id"]
-
-            for _, by_device in by_site.groupby("device"):
-                device = by_device.iloc[0]["device"]
-
-                for _, by_timestamp in by_device.groupby(
-                    pd.Grouper(key="timestamp", freq="H")
-                ):
-                    device_data = pd.DataFrame(by_timestamp)
-
-                    if len(device_data) == 0:
-                        continue
-
-                    device_data["timestamp"] = pd.to_datetime(
-                        device_data["timestamp"].dt.strftime("%Y-%m-%dT%H:00:00Z")
-                    )
-
-                    data_points = int(len(device_data.index))
-                    uptime = (data_points / self.__hourly_threshold) * 100
-                    uptime = uptime if uptime <= 100 else 100
-                    timestamp = device_data.iloc[0]["timestamp"]
-
-                    device_data["battery"] = pd.to_numeric(
-                        device_data["battery"], errors="coerce"
-                    )
-                    average_battery = device_data["battery"].mean()
-
-                    device_uptime = UptimeData(
-                        site_id=site_id,
-                        device=device,
-                        data_points=data_points,
-                        uptime=uptime,
-                        downtime=100 - uptime,
-                        average_battery=average_battery,
-                        timestamp=timestamp,
-                        hourly_threshold=self.__hourly_threshold,
-                    )
-                    devices_uptime.append(device_uptime)
-
-        return devices_uptime
-
-    def save_uptime(self, data: list[UptimeData]):
-        schema = [
-            bigquery.SchemaField("device", "STRING"),
-            bigquery.SchemaField("site_id", "STRING"),
-            bigquery.SchemaField("timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("hourly_threshold", "INTEGER"),
-            bigquery.SchemaField("data_points", "INTEGER"),
-            bigquery.SchemaField("uptime", "FLOAT"),
-            bigquery.SchemaField("downtime", "FLOAT"),
-            bigquery.SchemaField("average_battery", "FLOAT"),
-        ]
-        data = [row.to_dict() for row in data]
-        dataframe = pd.DataFrame(data)
-
-        job_config = bigquery.LoadJobConfig(schema=schema)
+    def compute_uptime(self, data: pd.DataFrame) -> pd.DataFrame:
+        columns = [field.name for field in UPTIME_SCHEMA]
+        if data.empty:
+            return pd.DataFrame(columns=columns)
+
+        data = data.assign(timestamp=pd.to_datetime(data["timestamp"]))
+        data = data.drop_duplicates(subset=["device", "timestamp"])
+
+        devices_uptime = (
+            data.assign(
+                timestamp=data["timestamp"].dt.floor(pd.Timedelta(hours=1)),
+                battery=pd.to_numeric(data["battery"], errors="coerce"),
+            )
+            .groupby(["site_id", "device", "timestamp"])
+            .agg(data_points=("battery", "size"), average_battery=("battery", "mean"))
+            .reset_index()
+        )
+
+        uptime = np.minimum(
+            devices_uptime["data_points"] / self.__hourly_threshold * 100, 100
+        )
+        devices_uptime["uptime"] = uptime
+        devices_uptime["downtime"] = 100 - uptime
+        devices_uptime["hourly_threshold"] = self.__hourly_threshold
+
+        return devices_uptime[columns]
+
+    def save_uptime(self, data: pd.DataFrame):
+        if data.empty:
+            print("No uptime data to save")
+            return
+
+        job_config = bigquery.LoadJobConfig(schema=UPTIME_SCHEMA)
         job = bigquery.Client().load_table_from_dataframe(
-            dataframe=dataframe,
+            dataframe=data,
             destination=self.__uptime_data_table,
             job_config=job_config,
         )
@@ -108,7 +89,7 @@ class UptimeModel:
                 .to_dataframe()
             )
 
-            dataframe["timestamp"] = dataframe["timestamp"].apply(pd.to_datetime)
+            dataframe["timestamp"] = pd.to_datetime(dataframe["timestamp"])
 
             return dataframe
         except Exception as e:
@@ -1,5 +1,7 @@
 import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timezone
+from typing import Any, Dict, Generator, List
 
 import numpy as np
 import pandas as pd
@@ -75,22 +77,61 @@ class AirQoDataUtils:
         duplicated_data = data.loc[data["duplicated"]]
         not_duplicated_data = data.loc[~data["duplicated"]]
 
-        for _, by_device_number in duplicated_data.groupby(by="device_number"):
-            for _, by_timestamp in by_device_number.groupby(by="timestamp"):
-                by_timestamp = by_timestamp.copy()
-                by_timestamp.fillna(inplace=True, method="ffill")
-                by_timestamp.fillna(inplace=True, method="bfill")
-                by_timestamp.drop_duplicates(
-                    subset=["device_number", "timestamp"], inplace=True, keep="first"
-                )
-                not_duplicated_data = pd.concat(
-                    [not_duplicated_data, by_timestamp], ignore_index=True
+        # Coalesces each duplicated (device_number, timestamp) group into one row holding the first non null
+        # value of every column.
+        merged_duplicates = duplicated_data.groupby(
+            by=["device_number", "timestamp"], as_index=False, sort=True
+        ).first()
+
+        return pd.concat(
+            [not_duplicated_data, merged_duplicates[list(data.columns)]],
+            ignore_index=True,
+        )
+
+    @staticmethod
+    def compute_hourly_averages(
+        data: pd.DataFrame, group_by: list, workers: int = 1
+    ) -> pd.DataFrame:
+        """
+        Averages the numeric columns of `data` per `group_by` columns and hour in a single grouped aggregation.
+
+        Args:
+            data(pd.DataFrame): Measurements with a datetime `timestamp` column. Rows with missing values in the
+            `group_by` columns are kept as their own groups.
+            group_by(list): Columns identifying a group, the first column is used to split the data into chunks.
+            workers(int): When greater than 1, the data is split into chunks of whole groups that are averaged in a
+            process pool. Only worth it for very large backfills.
+
+        Returns:
+            pd.DataFrame: One row per group and hour, sorted by `group_by` and timestamp, with the `group_by`
+            columns, `timestamp` and the averaged numeric columns.
+        """
+        if workers > 1 and not data.empty:
+            chunk_keys = np.array_split(np.sort(data[group_by[0]].unique()), workers)
+            chunks = [data[data[group_by[0]].isin(keys)] for keys in chunk_keys]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                averages = executor.map(
+                    AirQoDataUtils.compute_hourly_averages,
+                    chunks,
+                    [group_by] * len(chunks),
                 )
+                return pd.concat(list(averages), ignore_index=True)
+
+        numeric_columns = [
+            col
+            for col in data.select_dtypes(include="number").columns
+            if col not in group_by
+        ]
+        keys = [data[col] for col in group_by]
+        keys.append(data["timestamp"].dt.floor("H"))
 
-        return not_duplicated_data
+        averages = data[numeric_columns].groupby(keys, sort=True, dropna=False).mean()
+        return averages.reset_index()
 
     @staticmethod
-    def extract_aggregated_raw_data(start_date_time, end_date_time) -> pd.DataFrame:
+    def extract_aggregated_raw_data(
+        start_date_time, end_date_time, workers: int = 1
+    ) -> pd.DataFrame:
         bigquery_api = BigQueryApi()
         measurements = bigquery_api.query_data(
             start_date_time=start_date_time,
@@ -102,22 +143,17 @@ class AirQoDataUtils:
         if measurements.empty:
             return pd.DataFrame([])
 
-        measurements = measurements.dropna(subset=["timestamp"])
+        measurements = measurements.dropna(
+            subset=["timestamp", "device_number", "site_id"]
+        )
         measurements["timestamp"] = pd.to_datetime(measurements["timestamp"])
-        averaged_measurements_list = []
-
-        for (device_number, site_id), device_site in measurements.groupby(["device_number", "site_id"]):
-            data = device_site.sort_index(axis=0)
-            numeric_columns = data.select_dtypes(include='number').columns
-            averages = data.resample("1H", on="timestamp")[numeric_columns].mean()
-            averages["timestamp"] = averages.index
-            averages["device_number"] = device_number
-            averages["site_id"] = site_id
-            averaged_measurements_list.append(averages)
+        numeric_columns = measurements.select_dtypes(include="number").columns
 
-        averaged_measurements = pd.concat(averaged_measurements_list, ignore_index=True)
+        averaged_measurements = AirQoDataUtils.compute_hourly_averages(
+            data=measurements, group_by=["device_number", "site_id"], workers=workers
+        )
 
-        return averaged_measurements
+        return averaged_measurements[[*numeric_columns, "timestamp", "site_id"]]
 
     @staticmethod
     def flatten_field_8(device_category: DeviceCategory, field_8: str = None):
@@ -138,6 +174,41 @@ class AirQoDataUtils:
 
         return series
 
+    @staticmethod
+    def flatten_field_8_column(
+        field_8: pd.Series, device_category: DeviceCategory
+    ) -> pd.DataFrame:
+        """
+        Splits a whole column of comma separated field8 values into typed columns in a single pass.
+
+        This is the columnar equivalent of applying `flatten_field_8` to every row. Positions missing in a
+        value are set to NaN, and every column except the BAM timestamp is converted to float.
+
+        Args:
+            field_8(pd.Series): Raw field8 values as returned by Thingspeak.
+            device_category(DeviceCategory): Determines the position to column mapping used.
+
+        Returns:
+            pd.DataFrame: A dataframe with one column per mapped field8 position, indexed like `field_8`.
+        """
+        mappings = (
+            configuration.AIRQO_BAM_CONFIG
+            if device_category == DeviceCategory.BAM
+            else configuration.AIRQO_LOW_COST_CONFIG
+        )
+
+        values = field_8.fillna("").astype(str).str.split(",", expand=True)
+        values = values.reindex(columns=list(mappings.keys()))
+        values.columns = list(mappings.values())
+        values = values.replace("", np.nan)
+
+        numeric_cols = [col for col in values.columns if col != "timestamp"]
+        values[numeric_cols] = values[numeric_cols].apply(
+            pd.to_numeric, errors="coerce"
+        )
+
+        return values
+
     @staticmethod
     def flatten_meta_data(meta_data: list) -> list:
         data = []
@@ -330,13 +401,14 @@ class AirQoDataUtils:
 
         read_keys = airqo_api.get_thingspeak_read_keys(devices=devices)
 
-        devices_data = pd.DataFrame()
         dates = Utils.query_dates_array(
             start_date_time=start_date_time,
             end_date_time=end_date_time,
             data_source=DataSource.THINGSPEAK,
         )
 
+        queried_devices = []
+        queries = []
         for device in devices:
             device_number = device.get("device_number", None)
             read_key = read_keys.get(device_number, None)
@@ -346,55 +418,57 @@ class AirQoDataUtils:
                 continue
 
             for start, end in dates:
-                data = thingspeak_api.query_data(
-                    device_number=device_number,
-                    start_date_time=start,
-                    end_date_time=end,
-                    read_key=read_key,
+                queried_devices.append(device)
+                queries.append((device_number, start, end, read_key))
+
+        devices_data = []
+        for device, query, data in zip(
+            queried_devices, queries, thingspeak_api.query_data_concurrently(queries)
+        ):
+            if data.empty:
+                print(f"Device does not have data between {query[1]} and {query[2]}")
+                continue
+
+            if "field8" not in data.columns.to_list():
+                data = DataValidationUtils.fill_missing_columns(
+                    data=data, cols=data_columns
+                )
+            else:
+                data[field_8_cols] = AirQoDataUtils.flatten_field_8_column(
+                    field_8=data["field8"], device_category=device_category
                 )
 
-                if data.empty:
-                    print(f"Device does not have data between {start} and {end}")
-                    continue
-
-                if "field8" not in data.columns.to_list():
-                    data = DataValidationUtils.fill_missing_columns(
-                        data=data, cols=data_columns
-                    )
-                else:
-                    data[field_8_cols] = data["field8"].apply(
-                        lambda x: AirQoDataUtils.flatten_field_8(
-                            device_category=device_category, field_8=x
-                        )
-                    )
-
-                meta_data = data.attrs.pop("meta_data", {})
-
-                data["device_number"] = device.get("device_number", None)
-                data["device_id"] = device.get("device_id", None)
-                data["site_id"] = device.get("site_id", None)
-
-                if device_category == DeviceCategory.LOW_COST:
-                    data["latitude"] = device.get("latitude", None)
-                    data["longitude"] = device.get("longitude", None)
-                    data.rename(
-                        columns={
-                            "field1": "s1_pm2_5",
-                            "field2": "s1_pm10",
-                            "field3": "s2_pm2_5",
-                            "field4": "s2_pm10",
-                            "field7": "battery",
-                            "created_at": "timestamp",
-                        },
-                        inplace=True,
-                    )
-                else:
-                    data["latitude"] = meta_data.get("latitude", None)
-                    data["longitude"] = meta_data.get("longitude", None)
-
-                devices_data = pd.concat(
-                    [devices_data, data[data_columns]], ignore_index=True
+            meta_data = data.attrs.pop("meta_data", {})
+
+            data["device_number"] = device.get("device_number", None)
+            data["device_id"] = device.get("device_id", None)
+            data["site_id"] = device.get("site_id", None)
+
+            if device_category == DeviceCategory.LOW_COST:
+                data["latitude"] = device.get("latitude", None)
+                data["longitude"] = device.get("longitude", None)
+                data.rename(
+                    columns={
+                        "field1": "s1_pm2_5",
+                        "field2": "s1_pm10",
+                        "field3": "s2_pm2_5",
+                        "field4": "s2_pm10",
+                        "field7": "battery",
+                        "created_at": "timestamp",
+                    },
+                    inplace=True,
                 )
+            else:
+                data["latitude"] = meta_data.get("latitude", None)
+                data["longitude"] = meta_data.get("longitude", None)
+
+            devices_data.append(data[data_columns])
+
+        devices_data = (
+            pd.concat(devices_data, ignore_index=True)
+            if devices_data
+            else pd.DataFrame()
+        )
 
         if remove_outliers:
             if "vapor_pressure" in devices_data.columns.to_list():
@@ -406,28 +480,25 @@ class AirQoDataUtils:
         return devices_data
 
     @staticmethod
-    def aggregate_low_cost_sensors_data(data: pd.DataFrame) -> pd.DataFrame:
-        aggregated_data = pd.DataFrame()
+    def aggregate_low_cost_sensors_data(
+        data: pd.DataFrame, workers: int = 1
+    ) -> pd.DataFrame:
+        data = data.dropna(subset=["device_number"])
         data["timestamp"] = pd.to_datetime(data["timestamp"])
+        group_by = ["device_number", "device_id", "site_id"]
 
-        for _, device_group in data.groupby("device_number"):
-            site_id = device_group.iloc[0]["site_id"]
-            device_id = device_group.iloc[0]["device_id"]
-            device_number = device_group.iloc[0]["device_number"]
-
-            del device_group["site_id"]
-            del device_group["device_id"]
-            del device_group["device_number"]
-
-            averages = device_group.resample("1H", on="timestamp").mean()
-            averages["timestamp"] = averages.index
-            averages["device_id"] = device_id
-            averages["site_id"] = site_id
-            averages["device_number"] = device_number
-
-            aggregated_data = pd.concat([aggregated_data, averages], ignore_index=True)
+        aggregated_data = AirQoDataUtils.compute_hourly_averages(
+            data=data, group_by=group_by, workers=workers
+        )
+        averaged_columns = [
+            col
+            for col in aggregated_data.columns
+            if col not in group_by and col != "timestamp"
+        ]
 
-        return aggregated_data
+        return aggregated_data[
+            [*averaged_columns, "timestamp", "device_id", "site_id", "device_number"]
+        ]
 
     @staticmethod
     def clean_bam_data(data: pd.DataFrame) -> pd.DataFrame:
@@ -556,75 +627,142 @@ class AirQoDataUtils:
         :param frequency: frequency of the measurements.
         :return: a list of measurements
         """
+        return [
+            event
+            for events in AirQoDataUtils.generate_api_events(
+                data=data, frequency=frequency, batch_size=len(data.index) or 1
+            )
+            for event in events
+        ]
 
-        restructured_data = []
+    @staticmethod
+    def generate_api_events(
+        data: pd.DataFrame, frequency: Frequency, batch_size: int = None
+    ) -> Generator[List[Dict[str, Any]], None, None]:
+        """
+        Formats device measurements into the events endpoint format and yields them in fixed size batches.
 
-        data["timestamp"] = data["timestamp"].apply(pd.to_datetime)
-        data["timestamp"] = data["timestamp"].apply(date_to_str)
-        airqo_api = AirQoApi()
-        devices = airqo_api.get_devices(tenant=Tenant.AIRQO)
+        Device details are looked up once, indexed by device number and joined to the measurements as columns.
+        The nested events are then built from the column arrays. Measurements of devices that are not returned
+        by the AirQo API are skipped.
 
-        for _, row in data.iterrows():
-            try:
-                device_number = row["device_number"]
-                device_details = list(
-                    filter(
-                        lambda device: (device["device_number"] == device_number),
-                        devices,
-                    )
-                )[0]
-                row_data = {
-                    "device": device_details["name"],
-                    "device_id": device_details["_id"],
-                    "site_id": row["site_id"],
-                    "device_number": device_number,
-                    "tenant": str(Tenant.AIRQO),
-                    "tenant": str(Tenant.AIRQO),
+        Args:
+            data(pd.DataFrame): Device measurements.
+            frequency(Frequency): Frequency of the measurements.
+            batch_size(int): Number of events per yielded batch. Defaults to POST_EVENTS_BODY_SIZE so that each
+            batch can be passed to `AirQoApi.save_events` as is.
+
+        Yields:
+            List[Dict[str, Any]]: A batch of events.
+        """
+        batch_size = int(
+            configuration.POST_EVENTS_BODY_SIZE if batch_size is None else batch_size
+        )
+
+        devices = pd.DataFrame(
+            AirQoApi().get_devices(tenant=Tenant.AIRQO),
+            columns=["device_number", "name", "_id"],
+        )
+        devices = (
+            devices.dropna(subset=["device_number"])
+            .drop_duplicates(subset=["device_number"], keep="first")
+            .set_index("device_number")
+        )
+
+        value_columns = [
+            "site_id",
+            "latitude",
+            "longitude",
+            "pm2_5",
+            "pm2_5_calibrated_value",
+            "pm10",
+            "pm10_calibrated_value",
+            "s1_pm2_5",
+            "s1_pm10",
+            "s2_pm2_5",
+            "s2_pm10",
+            "battery",
+            "altitude",
+            "wind_speed",
+            "satellites",
+            "hdop",
+            "temperature",
+            "humidity",
+        ]
+        data = DataValidationUtils.fill_missing_columns(
+            data=data.loc[
+                data["device_number"].isin(devices.index),
+                [
+                    "device_number",
+                    "timestamp",
+                    *[col for col in value_columns if col in data.columns],
+                ],
+            ].copy(),
+            cols=value_columns,
+        )
+        data["timestamp"] = pd.to_datetime(data["timestamp"]).dt.strftime(
+            "%Y-%m-%dT%H:%M:%SZ"
+        )
+        data["device_details_name"] = data["device_number"].map(devices["name"])
+        data["device_details_id"] = data["device_number"].map(devices["_id"])
+        data["site_id"] = (
+            data["site_id"].astype(object).where(data["site_id"].notna(), None)
+        )
+
+        columns = {col: data[col].tolist() for col in data.columns}
+        tenant = str(Tenant.AIRQO)
+        frequency = str(frequency)
+
+        for start in range(0, len(data.index), batch_size):
+            events = []
+            for i in range(start, min(start + batch_size, len(data.index))):
+                event = {
+                    "device": columns["device_details_name"][i],
+                    "device_id": columns["device_details_id"][i],
+                    "site_id": columns["site_id"][i],
+                    "device_number": columns["device_number"][i],
+                    "tenant": tenant,
                     "location": {
-                        "latitude": {"value": row["latitude"]},
-                        "longitude": {"value": row["longitude"]},
+                        "latitude": {"value": columns["latitude"][i]},
+                        "longitude": {"value": columns["longitude"][i]},
                     },
-                    "frequency": str(frequency),
-                    "time": row["timestamp"],
+                    "frequency": frequency,
+                    "time": columns["timestamp"][i],
                     "average_pm2_5": {
-                        "value": row["pm2_5"],
-                        "calibratedValue": row["pm2_5_calibrated_value"],
+                        "value": columns["pm2_5"][i],
+                        "calibratedValue": columns["pm2_5_calibrated_value"][i],
                     },
                     "average_pm10": {
-                        "value": row["pm10"],
-                        "calibratedValue": row["pm10_calibrated_value"],
+                        "value": columns["pm10"][i],
+                        "calibratedValue": columns["pm10_calibrated_value"][i],
                     },
                     "pm2_5": {
-                        "value": row["pm2_5"],
-                        "calibratedValue": row["pm2_5_calibrated_value"],
+                        "value": columns["pm2_5"][i],
+                        "calibratedValue": columns["pm2_5_calibrated_value"][i],
                     },
                     "pm10": {
-                        "value": row["pm10"],
-                        "calibratedValue": row["pm10_calibrated_value"],
+                        "value": columns["pm10"][i],
+                        "calibratedValue": columns["pm10_calibrated_value"][i],
                     },
-                    "s1_pm2_5": {"value": row["s1_pm2_5"]},
-                    "s1_pm10": {"value": row["s1_pm10"]},
-                    "s2_pm2_5": {"value": row["s2_pm2_5"]},
-                    "s2_pm10": {"value": row["s2_pm10"]},
-                    "battery": {"value": row["battery"]},
-                    "altitude": {"value": row["altitude"]},
-                    "speed": {"value": row["wind_speed"]},
-                    "satellites": {"value": row["satellites"]},
-                    "hdop": {"value": row["hdop"]},
-                    "externalTemperature": {"value": row["temperature"]},
-                    "externalHumidity": {"value": row["humidity"]},
+                    "s1_pm2_5": {"value": columns["s1_pm2_5"][i]},
+                    "s1_pm10": {"value": columns["s1_pm10"][i]},
+                    "s2_pm2_5": {"value": columns["s2_pm2_5"][i]},
+                    "s2_pm10": {"value": columns["s2_pm10"][i]},
+                    "battery": {"value": columns["battery"][i]},
+                    "altitude": {"value": columns["altitude"][i]},
+                    "speed": {"value": columns["wind_speed"][i]},
+                    "satellites": {"value": columns["satellites"][i]},
+                    "hdop": {"value": columns["hdop"][i]},
+                    "externalTemperature": {"value": columns["temperature"][i]},
+                    "externalHumidity": {"value": columns["humidity"][i]},
                 }
 
-                if row_data["site_id"] is None or row_data["site_id"] is np.nan:
-                    row_data.pop("site_id")
-
-                restructured_data.append(row_data)
+                if event["site_id"] is None:
+                    event.pop("site_id")
 
-            except Exception as ex:
-                traceback.print_exc()
-                print(ex)
+                events.append(event)
 
-        return restructured_data
+            yield events
 
     @staticmethod
     def process_data_for_message_broker(
@@ -713,8 +851,8 @@ class AirQoDataUtils:
     def extract_devices_deployment_logs() -> pd.DataFrame:
         airqo_api = AirQoApi()
         devices = airqo_api.get_devices(tenant=Tenant.AIRQO)
-        devices_history = pd.DataFrame()
-        for device in devices:
+
+        def device_deployment_logs(device: dict):
             try:
                 maintenance_logs = airqo_api.get_maintenance_logs(
                     tenant="airqo",
@@ -723,7 +861,7 @@ class AirQoDataUtils:
                 )
 
                 if not maintenance_logs or len(maintenance_logs) <= 1:
-                    continue
+                    return None
 
                 log_df = pd.DataFrame(maintenance_logs)
                 log_df = log_df.dropna(subset=["date"])
@@ -748,73 +886,89 @@ class AirQoDataUtils:
                 )
 
                 if len(set(log_df["site_id"].tolist())) == 1:
-                    continue
+                    return None
 
                 log_df["device_number"] = device.get("device_number", None)
 
-                devices_history = devices_history.append(
-                    log_df[
-                        [
-                            "start_date_time",
-                            "end_date_time",
-                            "site_id",
-                            "device_number",
-                        ]
-                    ],
-                    ignore_index=True,
-                )
+                return log_df[
+                    [
+                        "start_date_time",
+                        "end_date_time",
+                        "site_id",
+                        "device_number",
+                    ]
+                ]
 
             except Exception as ex:
                 print(ex)
                 traceback.print_exc()
+                return None
+
+        with ThreadPoolExecutor() as executor:
+            devices_logs = [
+                log_df
+                for log_df in executor.map(device_deployment_logs, devices)
+                if log_df is not None
+            ]
+
+        if not devices_logs:
+            return pd.DataFrame()
 
-        return devices_history.dropna()
+        return pd.concat(devices_logs, ignore_index=True).dropna()
 
     @staticmethod
     def map_site_ids_to_historical_data(
         data: pd.DataFrame, deployment_logs: pd.DataFrame
     ) -> pd.DataFrame:
+        """
+        Assigns each measurement the site the device was deployed at when the measurement was taken.
+
+        The deployment logs are joined to the data with a sorted interval join: `merge_asof` matches every
+        measurement to the device's latest deployment starting at or before the measurement, and measurements
+        after that deployment's end are left unchanged.
+
+        Args:
+            data(pd.DataFrame): Measurements with `device_number`, `timestamp` and `site_id` columns.
+            deployment_logs(pd.DataFrame): Deployments with `device_number`, `site_id`, `start_date_time` and
+            `end_date_time` columns, as returned by `extract_devices_deployment_logs`.
+
+        Returns:
+            pd.DataFrame: A copy of `data` with updated site ids and parsed timestamps.
+        """
         if deployment_logs.empty or data.empty:
             return data
 
         data = data.copy()
-        data["timestamp"] = data["timestamp"].apply(pd.to_datetime)
-        deployment_logs["start_date_time"] = deployment_logs["start_date_time"].apply(
-            pd.to_datetime
-        )
-        deployment_logs["end_date_time"] = deployment_logs["end_date_time"].apply(
-            pd.to_datetime
-        )
+        data["timestamp"] = pd.to_datetime(data["timestamp"])
 
-        for _, device_log in deployment_logs.iterrows():
-            device_data = data.loc[
-                (data["timestamp"] >= device_log["start_date_time"])
-                & (data["timestamp"] <= device_log["end_date_time"])
-                & (data["device_number"] == device_log["device_number"])
-            ]
-            if device_data.empty:
-                continue
+        logs = deployment_logs[
+            ["device_number", "site_id", "start_date_time", "end_date_time"]
+        ].dropna()
+        logs = logs.astype({"device_number": data["device_number"].dtype})
+        logs["start_date_time"] = pd.to_datetime(logs["start_date_time"])
+        logs["end_date_time"] = pd.to_datetime(logs["end_date_time"])
+        logs = logs.sort_values(by="start_date_time", kind="stable")
 
-            temp_device_data = device_data.copy()
-            for col in list(temp_device_data.columns):
-                temp_device_data.rename(columns={col: f"{col}_temp"}, inplace=True)
-
-            non_device_data = pd.merge(
-                left=data,
-                right=temp_device_data,
-                left_on=["device_number", "timestamp"],
-                right_on=["device_number_temp", "timestamp_temp"],
-                how="outer",
-                indicator=True,
-            )
-            non_device_data = non_device_data.loc[
-                non_device_data["_merge"] == "left_only"
-            ].drop("_merge", axis=1)
+        measurements = data[["device_number", "timestamp"]].copy()
+        measurements["position"] = np.arange(len(measurements.index))
+        measurements = measurements.dropna(subset=["device_number", "timestamp"])
+        measurements = measurements.sort_values(by="timestamp", kind="stable")
 
-            non_device_data = non_device_data[list(device_data.columns)]
+        deployments = pd.merge_asof(
+            measurements,
+            logs,
+            left_on="timestamp",
+            right_on="start_date_time",
+            by="device_number",
+            direction="backward",
+        )
+        deployments = deployments.loc[
+            deployments["timestamp"] <= deployments["end_date_time"]
+        ]
 
-            device_data["site_id"] = device_log["site_id"]
-            data = non_device_data.append(device_data, ignore_index=True)
+        data.iloc[
+            deployments["position"].to_numpy(), data.columns.get_loc("site_id")
+        ] = deployments["site_id"].to_numpy()
 
         return data
 
@@ -869,37 +1023,31 @@ class AirQoDataUtils:
 
         grouped_df = data.groupby("city", dropna=False)
 
-        rf_model = GCSUtils.get_trained_model_from_gcs(
-            project_name=project_id,
-            bucket_name=bucket,
-            source_blob_name=Utils.get_calibration_model_path(
-                CityModel.DEFAULT, "pm2_5"
-            ),
-        )
-        lasso_model = GCSUtils.get_trained_model_from_gcs(
-            project_name=project_id,
-            bucket_name=bucket,
-            source_blob_name=Utils.get_calibration_model_path(
-                CityModel.DEFAULT, "pm10"
-            ),
-        )
+        def get_city_models(city: CityModel):
+            return (
+                GCSUtils.get_trained_model_from_gcs(
+                    project_name=project_id,
+                    bucket_name=bucket,
+                    source_blob_name=Utils.get_calibration_model_path(city, "pm2_5"),
+                ),
+                GCSUtils.get_trained_model_from_gcs(
+                    project_name=project_id,
+                    bucket_name=bucket,
+                    source_blob_name=Utils.get_calibration_model_path(city, "pm10"),
+                ),
+            )
+
+        default_models = get_city_models(CityModel.DEFAULT)
+        city_models = {city.value.lower(): city for city in CityModel}
+
         for city, group in grouped_df:
-            if str(city).lower() in [c.value.lower() for c in CityModel]:
+            rf_model, lasso_model = default_models
+            city_model = city_models.get(str(city).lower(), None)
+            if city_model is not None and city_model != CityModel.DEFAULT:
                 try:
-                    rf_model = GCSUtils.get_trained_model_from_gcs(
-                        project_name=project_id,
-                        bucket_name=bucket,
-                        source_blob_name=Utils.get_calibration_model_path(
-                            city, "pm2_5"
-                        ),
-                    )
-                    lasso_model = GCSUtils.get_trained_model_from_gcs(
-                        project_name=project_id,
-                        bucket_name=bucket,
-                        source_blob_name=Utils.get_calibration_model_path(city, "pm10"),
-                    )
+                    rf_model, lasso_model = get_city_models(city_model)
                 except Exception as e:
-                    print(f"Error getting model: {e}")
+                    print(f"Error getting model for {city}, using default model: {e}")
             group["pm2_5_calibrated_value"] = rf_model.predict(group[input_variables])
             group["pm10_calibrated_value"] = lasso_model.predict(group[input_variables])
 
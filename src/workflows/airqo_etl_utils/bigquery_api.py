@@ -8,6 +8,7 @@ from google.oauth2 import service_account
 from .config import configuration
 from .constants import JobAction, ColumnDataType, Tenant, QueryType
 from .date import date_to_str
+from .schema_registry import schema_registry
 from .utils import Utils
 
 
@@ -209,41 +210,31 @@ class BigQueryApi:
             raise Exception("Invalid table")
 
         if schema_file:
-            schema = Utils.load_schema(file_name=schema_file)
+            schema_files = (schema_file,)
         else:
-            schema = []
-            for file in [
-                "measurements",
-                "raw_measurements",
-                "weather_data",
-                "latest_measurements",
-                "data_warehouse",
-                "sites",
-                "sensor_positions",
-                "devices",
-                "mobile_measurements",
-                "airqo_mobile_measurements",
-                "bam_measurements",
-                "bam_raw_measurements",
-            ]:
-                file_schema = Utils.load_schema(file_name=f"{file}.json")
-                schema.extend(file_schema)
-
-            # with os.scandir(os.path.join("path", "schema")) as iterator:
-            #     for entry in iterator:
-            #         if entry.name.endswith(".json") and entry.is_file():
-            #
-            #             file_schema = Utils.load_schema(file_path=entry.path)
-            #             schema.extend(file_schema)
-
-        columns = []
-        if column_type != ColumnDataType.NONE:
-            for column in schema:
-                if column["type"] == str(column_type):
-                    columns.append(column["name"])
-        else:
-            columns = [column["name"] for column in schema]
-        return list(set(columns))
+            schema_files = tuple(
+                f"{file}.json"
+                for file in [
+                    "measurements",
+                    "raw_measurements",
+                    "weather_data",
+                    "latest_measurements",
+                    "data_warehouse",
+                    "sites",
+                    "sensor_positions",
+                    "devices",
+                    "mobile_measurements",
+                    "airqo_mobile_measurements",
+                    "bam_measurements",
+                    "bam_raw_measurements",
+                ]
+            )
+
+        return list(
+            schema_registry.get_columns(
+                file_names=schema_files, column_type=column_type
+            )
+        )
 
     def load_data(
         self,
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 import pymongo as pm
@@ -21,6 +22,8 @@ class Config:
     # Thingspeak
     THINGSPEAK_API_KEY = os.getenv("THINGSPEAK_API_KEY")
     THINGSPEAK_CHANNEL_URL = os.getenv("THINGSPEAK_CHANNEL_URL")
+    THINGSPEAK_MAX_WORKERS = os.getenv("THINGSPEAK_MAX_WORKERS", 10)
+    THINGSPEAK_REQUESTS_PER_SECOND = os.getenv("THINGSPEAK_REQUESTS_PER_SECOND", 20)
 
     # Aggregated data
     BIGQUERY_HOURLY_EVENTS_TABLE = os.getenv("BIGQUERY_HOURLY_EVENTS_TABLE")
@@ -194,6 +197,11 @@ class Config:
     DAILY_FORECAST_HORIZON = os.getenv("DAILY_FORECAST_HORIZON")
     MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI")
     FORECAST_MODELS_BUCKET = os.getenv("FORECAST_MODELS_BUCKET")
+    MODEL_CACHE_DIR = os.getenv(
+        "MODEL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "airqo_models")
+    )
+    MODEL_CACHE_SIZE = os.getenv("MODEL_CACHE_SIZE", 16)
+    MODEL_CACHE_TTL = os.getenv("MODEL_CACHE_TTL", 3600)
     MONGO_URI = os.getenv("MONGO_URI")
     MONGO_DATABASE_NAME = os.getenv("MONGO_DATABASE_NAME", "airqo_db")
     ENVIRONMENT = os.getenv("ENVIRONMENT")
@@ -9,6 +9,41 @@ from airqo_etl_utils.date import date_to_str
 
 
 class DataValidationUtils:
+    # Valid value ranges keyed by column name, as (minimum, maximum, minimum_inclusive, maximum_inclusive).
+    VALID_VALUE_RANGES = {
+        "pm2_5": (1, 1000, True, True),
+        "pm10": (1, 1000, True, True),
+        "latitude": (-90, 90, True, True),
+        "longitude": (-180, 180, True, True),
+        "battery": (2.7, 5, True, True),
+        "no2": (0, 2049, True, True),
+        "altitude": (0, np.inf, False, True),
+        "hdop": (0, np.inf, False, True),
+        "satellites": (0, 50, False, True),
+        "temperature": (0, 45, False, True),
+        "humidity": (0, 99, False, True),
+        "pressure": (30, 110, True, True),
+    }
+
+    VALID_VALUE_COLUMN_ALIASES = {
+        "s1_pm2_5": "pm2_5",
+        "s2_pm2_5": "pm2_5",
+        "pm2_5_pi": "pm2_5",
+        "pm2_5_raw_value": "pm2_5",
+        "pm2_5_calibrated_value": "pm2_5",
+        "s1_pm10": "pm10",
+        "s2_pm10": "pm10",
+        "pm10_pi": "pm10",
+        "pm10_raw_value": "pm10",
+        "pm10_calibrated_value": "pm10",
+        "device_humidity": "humidity",
+        "device_temperature": "temperature",
+        "no2_raw_value": "no2",
+        "no2_calibrated_value": "no2",
+        "pm1_raw_value": "pm1",
+        "pm1_pi": "pm1",
+    }
+
     @staticmethod
     def format_data_types(
         data: pd.DataFrame,
@@ -62,6 +97,31 @@ class DataValidationUtils:
 
         return value
 
+    @staticmethod
+    def get_valid_values(values: pd.Series, name: str) -> pd.Series:
+        """
+        Replaces values outside the valid range of `name` with NaN using a vectorised mask.
+
+        This is the columnar equivalent of applying `get_valid_value` to every value of a column.
+
+        Args:
+            values(pd.Series): The column to validate.
+            name(str): Name of the valid range to apply, see `VALID_VALUE_RANGES`.
+
+        Returns:
+            pd.Series: The column with invalid values replaced by NaN. Columns without a valid range or with a
+            non numeric type are returned unchanged.
+        """
+        valid_range = DataValidationUtils.VALID_VALUE_RANGES.get(name, None)
+        if valid_range is None or not pd.api.types.is_numeric_dtype(values):
+            return values
+
+        minimum, maximum, minimum_inclusive, maximum_inclusive = valid_range
+        below_minimum = values < minimum if minimum_inclusive else values <= minimum
+        above_maximum = values > maximum if maximum_inclusive else values >= maximum
+
+        return values.mask(below_minimum | above_maximum)
+
     @staticmethod
     def remove_outliers(data: pd.DataFrame) -> pd.DataFrame:
         big_query_api = BigQueryApi()
@@ -92,37 +152,8 @@ class DataValidationUtils:
         columns.extend(timestamp_columns)
 
         for col in columns:
-            name = col
-            if name in [
-                "pm2_5",
-                "s1_pm2_5",
-                "s2_pm2_5",
-                "pm2_5_pi",
-                "pm2_5_raw_value",
-                "pm2_5_calibrated_value",
-            ]:
-                name = "pm2_5"
-            elif name in [
-                "pm10",
-                "s1_pm10",
-                "s2_pm10",
-                "pm10_pi",
-                "pm10_raw_value",
-                "pm10_calibrated_value",
-            ]:
-                name = "pm10"
-            elif name in ["device_humidity", "humidity"]:
-                name = "humidity"
-            elif col in ["device_temperature", "temperature"]:
-                name = "temperature"
-            elif name in ["no2", "no2_raw_value", "no2_calibrated_value"]:
-                name = "no2"
-            elif name in ["pm1", "pm1_raw_value", "pm1_pi"]:
-                name = "pm1"
-
-            data.loc[:, col] = data[col].apply(
-                lambda x: DataValidationUtils.get_valid_value(x, name)
-            )
+            name = DataValidationUtils.VALID_VALUE_COLUMN_ALIASES.get(col, col)
+            data.loc[:, col] = DataValidationUtils.get_valid_values(data[col], name)
 
         return data
 
@@ -1,3 +1,9 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
 import gcsfs
@@ -16,24 +22,134 @@ project_id = configuration.GOOGLE_CLOUD_PROJECT_ID
 bucket = configuration.FORECAST_MODELS_BUCKET
 environment = configuration.ENVIRONMENT
 additional_columns = ["site_id"]
+lag_and_roll_features = {
+    "hourly": {
+        "unit": "hour",
+        "shifts": [1, 2, 6, 12],
+        "windows": [3, 6, 12, 24],
+        "functions": ["mean", "std", "median", "skew"],
+    },
+    "daily": {
+        "unit": "day",
+        "shifts": [1, 2, 3, 7],
+        "windows": [2, 3, 7],
+        "functions": ["mean", "std", "max", "min"],
+    },
+}
 
 pd.options.mode.chained_assignment = None
 
 ### This module contains utility functions for ML jobs.
 
 
+class ModelCache:
+    """
+    Two level cache for models stored in GCS.
+
+    Deserialized models are kept in an in-process LRU and the downloaded files are kept on local disk. Both are
+    keyed by the blob's generation (or etag), so a model uploaded to the same blob name is downloaded again.
+    In-process entries younger than `ttl` seconds are returned without contacting GCS at all.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int, ttl: float) -> None:
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.ttl = ttl
+        self.__models = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __local_path(self, bucket_name: str, source_blob_name: str, version: str):
+        return os.path.join(
+            self.cache_dir, bucket_name, source_blob_name, f"{version}.pkl"
+        )
+
+    def get(self, fs, bucket_name: str, source_blob_name: str):
+        key = (bucket_name, source_blob_name)
+        with self.__lock:
+            entry = self.__models.get(key, None)
+            if entry is not None and time.monotonic() - entry["checked_at"] < self.ttl:
+                self.__models.move_to_end(key)
+                return entry["model"]
+
+        blob_path = f"{bucket_name}/{source_blob_name}"
+        info = fs.info(blob_path)
+        version = str(info.get("generation", None) or info.get("etag", None))
+
+        if entry is not None and entry["version"] == version:
+            model = entry["model"]
+        else:
+            local_path = self.__local_path(bucket_name, source_blob_name, version)
+            if not os.path.exists(local_path):
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                download_path = f"{local_path}.{uuid.uuid4().hex}.tmp"
+                fs.get(blob_path, download_path)
+                os.replace(download_path, local_path)
+            model = joblib.load(local_path)
+
+        with self.__lock:
+            self.__models[key] = {
+                "version": version,
+                "model": model,
+                "checked_at": time.monotonic(),
+            }
+            self.__models.move_to_end(key)
+            while len(self.__models) > self.max_size:
+                self.__models.popitem(last=False)
+
+        return model
+
+    def invalidate(self, bucket_name: str = None, source_blob_name: str = None):
+        """
+        Removes cached models from memory and disk.
+
+        Args:
+            bucket_name: Only remove models from this bucket. Removes all models if not supplied.
+            source_blob_name: Only remove this model. Requires `bucket_name`.
+        """
+        with self.__lock:
+            for key in list(self.__models.keys()):
+                if bucket_name is not None and key[0] != bucket_name:
+                    continue
+                if source_blob_name is not None and key[1] != source_blob_name:
+                    continue
+                self.__models.pop(key)
+
+        path = self.cache_dir
+        if bucket_name is not None:
+            path = os.path.join(path, bucket_name)
+            if source_blob_name is not None:
+                path = os.path.join(path, source_blob_name)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+model_cache = ModelCache(
+    cache_dir=configuration.MODEL_CACHE_DIR,
+    max_size=int(configuration.MODEL_CACHE_SIZE),
+    ttl=float(configuration.MODEL_CACHE_TTL),
+)
+
+
 class GCSUtils:
     """Utility class for saving and retrieving models from GCS"""
 
     # TODO: In future, save and retrieve models from mlflow instead of GCS
     @staticmethod
-    def get_trained_model_from_gcs(project_name, bucket_name, source_blob_name):
+    def get_trained_model_from_gcs(
+        project_name, bucket_name, source_blob_name, use_cache=True
+    ):
         fs = gcsfs.GCSFileSystem(project=project_name)
+        if use_cache:
+            return model_cache.get(fs, bucket_name, source_blob_name)
+
         fs.ls(bucket_name)
         with fs.open(bucket_name + "/" + source_blob_name, "rb") as handle:
             job = joblib.load(handle)
         return job
 
+    @staticmethod
+    def invalidate_model_cache(bucket_name=None, source_blob_name=None):
+        model_cache.invalidate(bucket_name, source_blob_name)
+
     @staticmethod
     def upload_trained_model_to_gcs(
         trained_model, project_name, bucket_name, source_blob_name
@@ -51,6 +167,8 @@ class GCSUtils:
         with fs.open(bucket_name + "/" + source_blob_name, "wb") as handle:
             job = joblib.dump(trained_model, handle)
 
+        model_cache.invalidate(bucket_name, source_blob_name)
+
 
 class MlUtils:
     """Utility class for ML related tasks"""
@@ -108,41 +226,21 @@ class MlUtils:
 
         df["timestamp"] = pd.to_datetime(df["timestamp"])
 
-        df1 = df.copy()  # use copy to prevent terminal warning
-        if freq == "daily":
-            shifts = [1, 2, 3, 7]
-            for s in shifts:
-                df1[f"pm2_5_last_{s}_day"] = df1.groupby(["device_id"])[
-                    target_col
-                ].shift(s)
-            shifts = [2, 3, 7]
-            functions = ["mean", "std", "max", "min"]
-            for s in shifts:
-                for f in functions:
-                    df1[f"pm2_5_{f}_{s}_day"] = (
-                        df1.groupby(["device_id"])[target_col]
-                        .shift(1)
-                        .rolling(s)
-                        .agg(f)
-                    )
-        elif freq == "hourly":
-            shifts = [1, 2, 6, 12]
-            for s in shifts:
-                df1[f"pm2_5_last_{s}_hour"] = df1.groupby(["device_id"])[
-                    target_col
-                ].shift(s)
-            shifts = [3, 6, 12, 24]
-            functions = ["mean", "std", "median", "skew"]
-            for s in shifts:
-                for f in functions:
-                    df1[f"pm2_5_{f}_{s}_hour"] = (
-                        df1.groupby(["device_id"])[target_col]
-                        .shift(1)
-                        .rolling(s)
-                        .agg(f)
-                    )
-        else:
+        if freq not in lag_and_roll_features:
             raise ValueError("Invalid frequency")
+
+        df1 = df.copy()  # use copy to prevent terminal warning
+        features = lag_and_roll_features[freq]
+        unit = features["unit"]
+        for s in features["shifts"]:
+            df1[f"pm2_5_last_{s}_{unit}"] = df1.groupby(["device_id"])[
+                target_col
+            ].shift(s)
+        for s in features["windows"]:
+            for f in features["functions"]:
+                df1[f"pm2_5_{f}_{s}_{unit}"] = (
+                    df1.groupby(["device_id"])[target_col].shift(1).rolling(s).agg(f)
+                )
         return df1
 
     @staticmethod
@@ -420,110 +518,6 @@ class MlUtils:
         data.columns = data.columns.str.strip()
         # data["margin_of_error"] = data["adjusted_forecast"] = 0
 
-        def get_forecasts(
-            df_tmp,
-            forecast_model,
-            frequency,
-            horizon,
-        ):
-            """This method generates forecasts for a given device dataframe basing on horizon provided"""
-            for i in range(int(horizon)):
-                df_tmp = pd.concat([df_tmp, df_tmp.iloc[-1:]], ignore_index=True)
-                df_tmp_no_ts = df_tmp.drop(
-                    columns=["timestamp", "device_id", "site_id"], axis=1, inplace=False
-                )
-                # daily frequency
-                if frequency == "daily":
-                    df_tmp.tail(1)["timestamp"] += timedelta(days=1)
-                    shifts1 = [1, 2, 3, 7]
-                    for s in shifts1:
-                        df_tmp[f"pm2_5_last_{s}_day"] = df_tmp.shift(s, axis=0)["pm2_5"]
-                    # rolling features
-                    shifts2 = [2, 3, 7]
-                    functions = ["mean", "std", "max", "min"]
-                    for s in shifts2:
-                        for f in functions:
-                            df_tmp[f"pm2_5_{f}_{s}_day"] = (
-                                df_tmp_no_ts.shift(1, axis=0).rolling(s).agg(f)
-                            )["pm2_5"]
-
-                elif frequency == "hourly":
-                    df_tmp.iloc[-1, df_tmp.columns.get_loc("timestamp")] = df_tmp.iloc[
-                        -2, df_tmp.columns.get_loc("timestamp")
-                    ] + pd.Timedelta(hours=1)
-
-                    # lag features
-                    shifts1 = [1, 2, 6, 12]
-                    for s in shifts1:
-                        df_tmp[f"pm2_5_last_{s}_hour"] = df_tmp.shift(s, axis=0)[
-                            "pm2_5"
-                        ]
-
-                    # rolling features
-                    shifts2 = [3, 6, 12, 24]
-                    functions = ["mean", "std", "median", "skew"]
-                    for s in shifts2:
-                        for f in functions:
-                            df_tmp[f"pm2_5_{f}_{s}_hour"] = (
-                                df_tmp_no_ts.shift(1, axis=0).rolling(s).agg(f)
-                            )["pm2_5"]
-
-                attributes = ["year", "month", "day", "dayofweek"]
-                max_vals = [2023, 12, 30, 7]
-                if frequency == "hourly":
-                    attributes.append("hour")
-                    max_vals.append(23)
-                for a, m in zip(attributes, max_vals):
-                    df_tmp.tail(1)[f"{a}_sin"] = np.sin(
-                        2
-                        * np.pi
-                        * df_tmp.tail(1)["timestamp"].dt.__getattribute__(a)
-                        / m
-                    )
-                    df_tmp.tail(1)[f"{a}_cos"] = np.cos(
-                        2
-                        * np.pi
-                        * df_tmp.tail(1)["timestamp"].dt.__getattribute__(a)
-                        / m
-                    )
-                df_tmp.tail(1)["week_sin"] = np.sin(
-                    2 * np.pi * df_tmp.tail(1)["timestamp"].dt.isocalendar().week / 52
-                )
-                df_tmp.tail(1)["week_cos"] = np.cos(
-                    2 * np.pi * df_tmp.tail(1)["timestamp"].dt.isocalendar().week / 52
-                )
-
-                excluded_columns = [
-                    "device_id",
-                    "site_id",
-                    "pm2_5",
-                    "timestamp",
-                    "latitude",
-                    "longitude",
-                    # "margin_of_error",
-                    # "adjusted_forecast",
-                ]
-                # excluded_columns_2 = [
-                #     "timestamp",
-                #     "margin_of_error",
-                #     "adjusted_forecast",
-                # ]
-                df_tmp.loc[df_tmp.index[-1], "pm2_5"] = forecast_model.predict(
-                    df_tmp.drop(excluded_columns, axis=1).tail(1).values.reshape(1, -1)
-                )
-                # df_tmp.loc[df_tmp.index[-1], "margin_of_error"] = error_model.predict(
-                #     df_tmp.drop(excluded_columns_2, axis=1)
-                #     .tail(1)
-                #     .values.reshape(1, -1)
-                # )
-                # df_tmp.loc[df_tmp.index[-1], "adjusted_forecast"] = (
-                #     df_tmp.loc[df_tmp.index[-1], "pm2_5"]
-                #     + df_tmp.loc[df_tmp.index[-1], "margin_of_error"]
-                # )
-
-            return df_tmp.iloc[-int(horizon) :, :]
-
-        forecasts = pd.DataFrame()
         forecast_model = GCSUtils.get_trained_model_from_gcs(
             project_name, bucket_name, f"{frequency}_forecast_model.pkl"
         )
@@ -531,22 +525,14 @@ class MlUtils:
         #     project_name, bucket_name, f"{frequency}_error_model.pkl"
         # )
 
-        df_tmp = data.copy()
-        for device in df_tmp["device_id"].unique():
-            test_copy = df_tmp[df_tmp["device_id"] == device]
-            horizon = (
-                configuration.HOURLY_FORECAST_HORIZON
-                if frequency == "hourly"
-                else configuration.DAILY_FORECAST_HORIZON
-            )
-            device_forecasts = get_forecasts(
-                test_copy,
-                forecast_model,
-                frequency,
-                horizon,
-            )
-
-            forecasts = pd.concat([forecasts, device_forecasts], ignore_index=True)
+        horizon = (
+            configuration.HOURLY_FORECAST_HORIZON
+            if frequency == "hourly"
+            else configuration.DAILY_FORECAST_HORIZON
+        )
+        forecasts = MlUtils.forecast_devices(
+            data, forecast_model, frequency, int(horizon)
+        )
 
         forecasts["pm2_5"] = forecasts["pm2_5"].astype(float)
         # forecasts["margin_of_error"] = forecasts["margin_of_error"].astype(float)
@@ -562,6 +548,133 @@ class MlUtils:
             ]
         ]
 
+    @staticmethod
+    def __rolling_skew(values: np.ndarray) -> np.ndarray:
+        """Bias corrected sample skewness of each row, matching pandas' rolling skew."""
+        n = values.shape[1]
+        deviations = values - values.mean(axis=1, keepdims=True)
+        m2 = (deviations**2).mean(axis=1)
+        m3 = (deviations**3).mean(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            skew = np.sqrt(n * (n - 1)) / (n - 2) * m3 / m2**1.5
+        return np.where(m2 <= 1e-14, 0.0, skew)
+
+    @staticmethod
+    def forecast_devices(
+        data: pd.DataFrame, forecast_model, frequency: str, horizon: int
+    ) -> pd.DataFrame:
+        """
+        Recursively forecasts pm2_5 for all devices at once.
+
+        The most recent pm2_5 values of every device are kept in a ring buffer (one row per device). At each
+        horizon step the lag, rolling and cyclic features of all devices are computed from the buffer and the
+        step's timestamps, the model predicts once for the whole device matrix and the predictions are written
+        back into the buffer. Any other feature, such as the location features, is carried over from each
+        device's last row.
+
+        Args:
+            data: Feature engineered data with device_id, site_id, timestamp and pm2_5 columns.
+            forecast_model: Model whose `predict` takes the feature columns of `data`, in order.
+            frequency: Either "hourly" or "daily".
+            horizon: Number of steps to forecast.
+
+        Returns:
+            pd.DataFrame: `horizon` rows per device with device_id, site_id, timestamp and pm2_5 columns.
+        """
+        if frequency not in lag_and_roll_features:
+            raise ValueError("Invalid frequency")
+
+        features = lag_and_roll_features[frequency]
+        unit = features["unit"]
+        step = pd.Timedelta(hours=1) if frequency == "hourly" else pd.Timedelta(days=1)
+        excluded_columns = [
+            "device_id",
+            "site_id",
+            "pm2_5",
+            "timestamp",
+            "latitude",
+            "longitude",
+        ]
+        feature_columns = [c for c in data.columns if c not in excluded_columns]
+        feature_positions = {c: i for i, c in enumerate(feature_columns)}
+
+        devices = pd.Index(data["device_id"].unique())
+        last_rows = data.groupby("device_id", sort=False).tail(1)
+        last_rows = last_rows.set_index("device_id").loc[devices]
+        n_devices = len(devices)
+
+        buffer_size = max(features["shifts"] + features["windows"])
+        buffer = np.full((n_devices, buffer_size), np.nan)
+        position_from_end = data.groupby("device_id", sort=False).cumcount(
+            ascending=False
+        )
+        recent = (position_from_end < buffer_size).to_numpy()
+        buffer[
+            devices.get_indexer(data.loc[recent, "device_id"]),
+            buffer_size - 1 - position_from_end[recent].to_numpy(),
+        ] = data.loc[recent, "pm2_5"].to_numpy(dtype=float)
+        head = 0  # index of the oldest value, where the next prediction is written
+
+        # (horizon, n_devices) grid flattened step by step, kept as a DatetimeIndex
+        # so timezone aware timestamps keep their timezone
+        last_timestamps = pd.DatetimeIndex(pd.to_datetime(last_rows["timestamp"]))
+        timestamps = last_timestamps.take(
+            np.tile(np.arange(n_devices), horizon)
+        ) + pd.to_timedelta(np.arange(1, horizon + 1) * step).repeat(n_devices)
+        cyclic_features = MlUtils.get_time_and_cyclic_features(
+            pd.DataFrame({"timestamp": timestamps}), frequency
+        )
+        cyclic_columns = [
+            c
+            for c in cyclic_features.columns
+            if c != "timestamp" and c in feature_positions
+        ]
+        cyclic_values = (
+            cyclic_features[cyclic_columns]
+            .to_numpy(dtype=float)
+            .reshape(horizon, n_devices, -1)
+        )
+
+        rolling_functions = {
+            "mean": lambda values: values.mean(axis=1),
+            "std": lambda values: values.std(axis=1, ddof=1),
+            "median": lambda values: np.median(values, axis=1),
+            "max": lambda values: values.max(axis=1),
+            "min": lambda values: values.min(axis=1),
+            "skew": MlUtils.__rolling_skew,
+        }
+
+        matrix = last_rows[feature_columns].to_numpy(dtype=float)
+        predictions = np.empty((horizon, n_devices))
+        for i in range(horizon):
+            history = buffer[:, (head + np.arange(buffer_size)) % buffer_size]
+            for s in features["shifts"]:
+                column = feature_positions.get(f"pm2_5_last_{s}_{unit}")
+                if column is not None:
+                    matrix[:, column] = history[:, -s]
+            for s in features["windows"]:
+                for f in features["functions"]:
+                    column = feature_positions.get(f"pm2_5_{f}_{s}_{unit}")
+                    if column is not None:
+                        matrix[:, column] = rolling_functions[f](history[:, -s:])
+            for j, c in enumerate(cyclic_columns):
+                matrix[:, feature_positions[c]] = cyclic_values[i, :, j]
+
+            predictions[i] = forecast_model.predict(matrix)
+            buffer[:, head] = predictions[i]
+            head = (head + 1) % buffer_size
+
+        return pd.DataFrame(
+            {
+                "device_id": np.repeat(devices.to_numpy(), horizon),
+                "site_id": np.repeat(last_rows["site_id"].to_numpy(), horizon),
+                "timestamp": timestamps.take(
+                    np.arange(horizon * n_devices).reshape(horizon, -1).T.ravel()
+                ),
+                "pm2_5": predictions.T.ravel(),
+            }
+        )
+
     @staticmethod
     def save_forecasts_to_mongo(data, frequency):
         device_ids = data["device_id"].unique()
@@ -0,0 +1,82 @@
+import json
+import os
+import threading
+from typing import Dict, Tuple
+
+from .constants import ColumnDataType
+
+
+class SchemaRegistry:
+    """
+    Process wide cache of the BigQuery table schemas shipped in the `schema` directory.
+
+    Each schema file is read and parsed once and its columns are indexed by `ColumnDataType`. The file's
+    modification time is checked on every lookup so that edits to a schema file are picked up without a restart.
+    """
+
+    def __init__(self) -> None:
+        self.package_directory, _ = os.path.split(__file__)
+        self.__schemas: Dict[str, Tuple[float, Dict[str, Tuple[str, ...]]]] = {}
+        self.__lock = threading.Lock()
+
+    def schema_path(self, file_name: str) -> str:
+        path = os.path.join(self.package_directory, "schema", file_name)
+        if os.path.exists(path):
+            return path
+        return os.path.join(self.package_directory, file_name)
+
+    def __index_schema(self, path: str) -> Dict[str, Tuple[str, ...]]:
+        with open(path) as file_json:
+            schema = json.load(file_json)
+
+        columns = {str(ColumnDataType.NONE): []}
+        for column in schema:
+            columns[str(ColumnDataType.NONE)].append(column["name"])
+            columns.setdefault(column["type"], []).append(column["name"])
+
+        return {
+            column_type: tuple(dict.fromkeys(names))
+            for column_type, names in columns.items()
+        }
+
+    def __get_indexed_schema(self, file_name: str) -> Dict[str, Tuple[str, ...]]:
+        path = self.schema_path(file_name)
+        modified_time = os.path.getmtime(path)
+
+        with self.__lock:
+            cached = self.__schemas.get(file_name, None)
+            if cached is not None and cached[0] == modified_time:
+                return cached[1]
+
+            indexed_schema = self.__index_schema(path)
+            self.__schemas[file_name] = (modified_time, indexed_schema)
+            return indexed_schema
+
+    def get_columns(
+        self,
+        file_names: Tuple[str, ...],
+        column_type: ColumnDataType = ColumnDataType.NONE,
+    ) -> Tuple[str, ...]:
+        """
+        Returns the column names defined in one or more schema files.
+
+        Args:
+            file_names: Names of the schema files, e.g. ("measurements.json",).
+            column_type: Only return columns of this type. ColumnDataType.NONE returns all columns.
+
+        Returns:
+            Tuple[str, ...]: Unique column names, in the order they appear in the schema files.
+        """
+        columns = []
+        for file_name in file_names:
+            indexed_schema = self.__get_indexed_schema(file_name)
+            columns.extend(indexed_schema.get(str(column_type), ()))
+
+        return tuple(dict.fromkeys(columns))
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__schemas.clear()
+
+
+schema_registry = SchemaRegistry()
@@ -0,0 +1,58 @@
+"""
+Compares the row wise `flatten_field_8` path with the columnar `flatten_field_8_column` parser.
+
+Run from src/workflows with:
+    python -m airqo_etl_utils.tests.benchmarks.benchmark_field_8
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from airqo_etl_utils.airqo_utils import AirQoDataUtils
+from airqo_etl_utils.constants import DeviceCategory
+
+ROWS = 5_000
+
+
+def sample_field_8(rows: int) -> pd.Series:
+    rng = np.random.default_rng(0)
+    values = rng.uniform(0, 100, size=(rows, 11)).round(4).astype(str)
+    field_8 = pd.Series([",".join(row) for row in values])
+    field_8.iloc[::100] = None
+    field_8.iloc[1::100] = "0.1,32.5"
+    return field_8
+
+
+def row_wise(field_8: pd.Series) -> pd.DataFrame:
+    data = field_8.apply(
+        lambda x: AirQoDataUtils.flatten_field_8(
+            device_category=DeviceCategory.LOW_COST, field_8=x
+        )
+    )
+    return data.apply(pd.to_numeric, errors="coerce")
+
+
+def columnar(field_8: pd.Series) -> pd.DataFrame:
+    return AirQoDataUtils.flatten_field_8_column(
+        field_8=field_8, device_category=DeviceCategory.LOW_COST
+    )
+
+
+def timed(function, field_8: pd.Series):
+    start = time.perf_counter()
+    result = function(field_8)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    field_8 = sample_field_8(ROWS)
+    row_wise_data, row_wise_time = timed(row_wise, field_8)
+    columnar_data, columnar_time = timed(columnar, field_8)
+    pd.testing.assert_frame_equal(row_wise_data, columnar_data)
+
+    print(f"rows: {ROWS}")
+    print(f"flatten_field_8 apply: {row_wise_time:.3f}s")
+    print(f"flatten_field_8_column: {columnar_time:.3f}s")
+    print(f"speedup: {row_wise_time / columnar_time:.1f}x")
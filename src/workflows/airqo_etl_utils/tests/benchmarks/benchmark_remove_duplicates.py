@@ -0,0 +1,96 @@
+"""
+Compares the former per group `remove_duplicates` loop with the groupby based implementation on a frame with
+10% duplicated (device_number, timestamp) rows.
+
+The former implementation is quadratic in the number of duplicates, so it is timed on LEGACY_ROWS rows while the
+current implementation is timed on both LEGACY_ROWS and ROWS rows.
+
+Run from src/workflows with:
+    python -m airqo_etl_utils.tests.benchmarks.benchmark_remove_duplicates
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from airqo_etl_utils.airqo_utils import AirQoDataUtils
+
+ROWS = 1_000_000
+LEGACY_ROWS = 20_000
+DUPLICATES_FRACTION = 0.1
+
+
+def sample_data(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    unique_rows = int(rows * (1 - DUPLICATES_FRACTION))
+    data = pd.DataFrame(
+        {
+            "device_number": rng.integers(0, 500, size=unique_rows),
+            "timestamp": pd.Timestamp("2024-01-01", tz="UTC")
+            + pd.to_timedelta(np.arange(unique_rows), unit="min"),
+            "s1_pm2_5": rng.uniform(1, 100, size=unique_rows),
+            "s2_pm2_5": rng.uniform(1, 100, size=unique_rows),
+            "battery": rng.uniform(3, 4, size=unique_rows),
+        }
+    )
+    duplicates = data.sample(n=rows - unique_rows, random_state=0)
+    for col in ["s1_pm2_5", "s2_pm2_5", "battery"]:
+        duplicates.loc[duplicates.sample(frac=0.5, random_state=1).index, col] = None
+        data.loc[data.sample(frac=0.05, random_state=2).index, col] = None
+
+    return pd.concat([data, duplicates], ignore_index=True)
+
+
+def legacy_remove_duplicates(data: pd.DataFrame) -> pd.DataFrame:
+    cols = data.columns.to_list()
+    cols.remove("timestamp")
+    cols.remove("device_number")
+    data.dropna(subset=cols, how="all", inplace=True)
+    data["timestamp"] = pd.to_datetime(data["timestamp"])
+    data["duplicated"] = data.duplicated(
+        keep=False, subset=["device_number", "timestamp"]
+    )
+
+    if True not in data["duplicated"].values:
+        return data
+
+    duplicated_data = data.loc[data["duplicated"]]
+    not_duplicated_data = data.loc[~data["duplicated"]]
+
+    for _, by_device_number in duplicated_data.groupby(by="device_number"):
+        for _, by_timestamp in by_device_number.groupby(by="timestamp"):
+            by_timestamp = by_timestamp.copy()
+            by_timestamp.fillna(inplace=True, method="ffill")
+            by_timestamp.fillna(inplace=True, method="bfill")
+            by_timestamp.drop_duplicates(
+                subset=["device_number", "timestamp"], inplace=True, keep="first"
+            )
+            not_duplicated_data = pd.concat(
+                [not_duplicated_data, by_timestamp], ignore_index=True
+            )
+
+    return not_duplicated_data
+
+
+def timed(function, data: pd.DataFrame):
+    data = data.copy()
+    start = time.perf_counter()
+    result = function(data)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    data = sample_data(LEGACY_ROWS)
+    legacy_data, legacy_time = timed(legacy_remove_duplicates, data)
+    current_data, current_time = timed(AirQoDataUtils.remove_duplicates, data)
+    pd.testing.assert_frame_equal(legacy_data, current_data)
+
+    print(f"rows: {LEGACY_ROWS}")
+    print(f"per group loop: {legacy_time:.3f}s")
+    print(f"groupby first: {current_time:.3f}s")
+    print(f"speedup: {legacy_time / current_time:.1f}x")
+
+    _, current_time = timed(AirQoDataUtils.remove_duplicates, sample_data(ROWS))
+    print(f"rows: {ROWS}")
+    print(f"groupby first: {current_time:.3f}s")
@@ -0,0 +1,73 @@
+"""
+Compares applying `get_valid_value` to every cell with the vectorised `get_valid_values` masks used by
+`DataValidationUtils.remove_outliers`.
+
+Run from src/workflows with:
+    python -m airqo_etl_utils.tests.benchmarks.benchmark_remove_outliers
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from airqo_etl_utils.data_validator import DataValidationUtils
+
+ROWS = 1_000_000
+COLUMNS = [
+    "s1_pm2_5",
+    "s2_pm2_5",
+    "s1_pm10",
+    "s2_pm10",
+    "latitude",
+    "longitude",
+    "battery",
+    "altitude",
+    "satellites",
+    "hdop",
+    "device_temperature",
+    "device_humidity",
+]
+
+
+def sample_data(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        rng.uniform(-200, 1200, size=(rows, len(COLUMNS))), columns=COLUMNS
+    )
+
+
+def scalar(data: pd.DataFrame) -> pd.DataFrame:
+    data = data.copy()
+    for col in COLUMNS:
+        name = DataValidationUtils.VALID_VALUE_COLUMN_ALIASES.get(col, col)
+        data.loc[:, col] = data[col].apply(
+            lambda x: DataValidationUtils.get_valid_value(x, name)
+        )
+    return data
+
+
+def vectorised(data: pd.DataFrame) -> pd.DataFrame:
+    data = data.copy()
+    for col in COLUMNS:
+        name = DataValidationUtils.VALID_VALUE_COLUMN_ALIASES.get(col, col)
+        data.loc[:, col] = DataValidationUtils.get_valid_values(data[col], name)
+    return data
+
+
+def timed(function, data: pd.DataFrame):
+    start = time.perf_counter()
+    result = function(data)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    data = sample_data(ROWS)
+    scalar_data, scalar_time = timed(scalar, data)
+    vectorised_data, vectorised_time = timed(vectorised, data)
+    pd.testing.assert_frame_equal(scalar_data, vectorised_data)
+
+    print(f"rows: {ROWS}, columns: {len(COLUMNS)}")
+    print(f"get_valid_value apply: {scalar_time:.3f}s")
+    print(f"get_valid_values: {vectorised_time:.3f}s")
+    print(f"speedup: {scalar_time / vectorised_time:.1f}x")
@@ -10,6 +10,7 @@ import pytest
 import airqo_etl_utils.tests.conftest as ct
 from airqo_etl_utils.airqo_utils import AirQoDataUtils
 from airqo_etl_utils.config import configuration
+from airqo_etl_utils.constants import DeviceCategory, Frequency
 from airqo_etl_utils.date import date_to_str
 
 
@@ -56,6 +57,48 @@ class TestAirQoDataUtils(unittest.TestCase):
         self.assertEqual(data.iloc[0]["device_number"], 2)
         self.assertEqual(date_to_str(data.iloc[0]["timestamp"]), "2022-01-01T10:00:00Z")
 
+    def test_map_site_ids_to_historical_data_with_multiple_deployments(self):
+        logs = pd.DataFrame(
+            {
+                "site_id": ["02", "03", "04"],
+                "device_number": [1, 1, 2],
+                "start_date_time": [
+                    "2022-01-01T00:00:00Z",
+                    "2022-01-02T00:00:00Z",
+                    "2022-01-01T00:00:00Z",
+                ],
+                "end_date_time": [
+                    "2022-01-02T00:00:00Z",
+                    "2022-01-03T00:00:00Z",
+                    "2022-01-03T00:00:00Z",
+                ],
+            }
+        )
+        data = pd.DataFrame(
+            {
+                "site_id": ["01"] * 6,
+                "device_number": [1, 1, 2, 1, 1, 3],
+                "timestamp": [
+                    "2022-01-02T10:00:00Z",
+                    "2022-01-01T10:00:00Z",
+                    "2022-01-01T10:00:00Z",
+                    "2022-01-02T00:00:00Z",
+                    "2022-01-03T10:00:00Z",
+                    "2022-01-01T10:00:00Z",
+                ],
+            }
+        )
+
+        mapped_data = AirQoDataUtils.map_site_ids_to_historical_data(
+            data=data, deployment_logs=logs
+        )
+
+        self.assertEqual(
+            mapped_data["site_id"].tolist(), ["03", "02", "04", "03", "01", "01"]
+        )
+        self.assertEqual(mapped_data["device_number"].tolist(), [1, 1, 2, 1, 1, 3])
+        self.assertEqual(data["site_id"].tolist(), ["01"] * 6)
+
     @patch('airqo_etl_utils.airqo_utils.BigQueryApi')
     def test_extract_aggregated_raw_data(self, MockBigQueryApi):
 
@@ -226,6 +269,203 @@ class TestAirQoDataUtils(unittest.TestCase):
 
         pd.testing.assert_frame_equal(result, expected_dataframe)
 
+    def test_aggregate_low_cost_sensors_data(self):
+        data = pd.DataFrame(
+            {
+                "device_number": [1, 1, 1, 2, 2, 1],
+                "device_id": ["aq_1", "aq_1", "aq_1", "aq_2", "aq_2", "aq_1"],
+                "site_id": ["01", "01", "01", "02", "02", "01"],
+                "timestamp": [
+                    "2022-01-01T10:05:00Z",
+                    "2022-01-01T10:55:00Z",
+                    "2022-01-01T12:10:00Z",
+                    "2022-01-01T10:30:00Z",
+                    "2022-01-01T10:40:00Z",
+                    "2022-01-01T10:20:00Z",
+                ],
+                "s1_pm2_5": [10.0, 20.0, 30.0, 40.0, None, 30.0],
+                "battery": [3.9, 4.0, 3.8, 3.7, 3.9, 4.1],
+            }
+        )
+
+        aggregated_data = AirQoDataUtils.aggregate_low_cost_sensors_data(data.copy())
+
+        self.assertEqual(
+            list(aggregated_data.columns),
+            [
+                "s1_pm2_5",
+                "battery",
+                "timestamp",
+                "device_id",
+                "site_id",
+                "device_number",
+            ],
+        )
+        self.assertEqual(aggregated_data["device_number"].tolist(), [1, 1, 2])
+        self.assertEqual(
+            [date_to_str(x) for x in aggregated_data["timestamp"]],
+            ["2022-01-01T10:00:00Z", "2022-01-01T12:00:00Z", "2022-01-01T10:00:00Z"],
+        )
+        self.assertEqual(aggregated_data["s1_pm2_5"].tolist(), [20.0, 30.0, 40.0])
+        self.assertAlmostEqual(aggregated_data.iloc[0]["battery"], 4.0)
+        self.assertAlmostEqual(aggregated_data.iloc[2]["battery"], 3.8)
+
+        pd.testing.assert_frame_equal(
+            AirQoDataUtils.aggregate_low_cost_sensors_data(data.copy(), workers=2),
+            aggregated_data,
+        )
+
+    @patch("airqo_etl_utils.airqo_utils.AirQoApi")
+    def test_generate_api_events(self, MockAirQoApi):
+        MockAirQoApi.return_value.get_devices.return_value = [
+            {"device_number": 1, "name": "aq_1", "_id": "id_1"},
+            {"device_number": 2, "name": "aq_2", "_id": "id_2"},
+        ]
+        data = pd.DataFrame(
+            {
+                "device_number": [2, 3, 1, 2],
+                "site_id": ["02", "03", None, "02"],
+                "timestamp": [
+                    "2022-01-01T10:00:00Z",
+                    "2022-01-01T10:00:00Z",
+                    "2022-01-01T11:00:00Z",
+                    "2022-01-01T12:00:00Z",
+                ],
+                "pm2_5": [10.0, 20.0, np.nan, 30.0],
+                "pm2_5_calibrated_value": [11.0, 21.0, 15.0, 31.0],
+                "wind_speed": [0.5, 0.6, 0.7, 0.8],
+            }
+        )
+
+        batches = list(
+            AirQoDataUtils.generate_api_events(
+                data=data, frequency=Frequency.HOURLY, batch_size=2
+            )
+        )
+
+        self.assertEqual([len(events) for events in batches], [2, 1])
+        events = [event for events in batches for event in events]
+        self.assertEqual([event["device"] for event in events], ["aq_2", "aq_1", "aq_2"])
+        self.assertEqual(events[0]["device_id"], "id_2")
+        self.assertEqual(events[0]["site_id"], "02")
+        self.assertNotIn("site_id", events[1])
+        self.assertEqual(events[1]["time"], "2022-01-01T11:00:00Z")
+        self.assertEqual(events[1]["frequency"], "hourly")
+        self.assertTrue(np.isnan(events[1]["pm2_5"]["value"]))
+        self.assertEqual(events[1]["pm2_5"]["calibratedValue"], 15.0)
+        self.assertEqual(events[2]["speed"], {"value": 0.8})
+        self.assertIsNone(events[2]["battery"]["value"])
+
+        processed_events = AirQoDataUtils.process_data_for_api(
+            data=data, frequency=Frequency.HOURLY
+        )
+        self.assertEqual(
+            [(event["device"], event["time"]) for event in processed_events],
+            [(event["device"], event["time"]) for event in events],
+        )
+
+    def test_remove_duplicates(self):
+        data = pd.DataFrame(
+            {
+                "device_number": [2, 1, 1, 1, 1, 1],
+                "timestamp": [
+                    "2022-01-01T10:00:00Z",
+                    "2022-01-01T10:00:00Z",
+                    "2022-01-01T10:00:00Z",
+                    "2022-01-01T10:00:00Z",
+                    "2022-01-01T11:00:00Z",
+                    "2022-01-01T12:00:00Z",
+                ],
+                "s1_pm2_5": [1.0, None, 5.0, 6.0, None, 7.0],
+                "battery": [None, 3.9, 3.8, None, None, 4.0],
+            }
+        )
+
+        data = AirQoDataUtils.remove_duplicates(data)
+
+        self.assertEqual(len(data.index), 3)
+        self.assertEqual(data["device_number"].tolist(), [2, 1, 1])
+        self.assertEqual(data["duplicated"].tolist(), [False, False, True])
+        merged = data.iloc[2]
+        self.assertEqual(date_to_str(merged["timestamp"]), "2022-01-01T10:00:00Z")
+        self.assertEqual(merged["s1_pm2_5"], 5.0)
+        self.assertEqual(merged["battery"], 3.9)
+
+    def test_flatten_field_8_column(self):
+        field_8 = pd.Series(
+            ["0.1,32.5,1200,0,10,87,25,60,24,65,1", "0.2,32.6", None, "0.3,,abc"]
+        )
+        data = AirQoDataUtils.flatten_field_8_column(
+            field_8=field_8, device_category=DeviceCategory.LOW_COST
+        )
+
+        self.assertEqual(
+            list(data.columns), list(configuration.AIRQO_LOW_COST_CONFIG.values())
+        )
+        self.assertTrue(all(dtype == np.float64 for dtype in data.dtypes))
+        self.assertEqual(data.iloc[0]["vapor_pressure"], 1.0)
+        self.assertEqual(data.iloc[1]["longitude"], 32.6)
+        self.assertTrue(np.isnan(data.iloc[1]["altitude"]))
+        self.assertTrue(data.iloc[2].isna().all())
+        self.assertEqual(data.iloc[3]["latitude"], 0.3)
+        self.assertTrue(np.isnan(data.iloc[3]["longitude"]))
+        self.assertTrue(np.isnan(data.iloc[3]["altitude"]))
+
+        bam_data = AirQoDataUtils.flatten_field_8_column(
+            field_8=pd.Series(["2024-01-01 10:00:00,12.5,13.1"]),
+            device_category=DeviceCategory.BAM,
+        )
+        self.assertEqual(bam_data.iloc[0]["timestamp"], "2024-01-01 10:00:00")
+        self.assertEqual(bam_data.iloc[0]["hourly_conc"], 13.1)
+        self.assertTrue(np.isnan(bam_data.iloc[0]["status"]))
+
+    @patch("airqo_etl_utils.airqo_utils.ThingspeakApi.query_data")
+    @patch("airqo_etl_utils.airqo_utils.AirQoApi")
+    def test_extract_devices_data(self, MockAirQoApi, mock_query_data):
+        mock_airqo_api = MockAirQoApi.return_value
+        mock_airqo_api.get_devices.return_value = [
+            {"device_number": 1, "device_id": "aq_1", "site_id": "01"},
+            {"device_number": 2, "device_id": "aq_2", "site_id": "02"},
+            {"device_number": 3, "device_id": "aq_3", "site_id": "03"},
+        ]
+        mock_airqo_api.get_thingspeak_read_keys.return_value = {1: "key1", 2: "key2"}
+
+        def query_data(device_number, start_date_time, end_date_time, read_key):
+            if device_number == 2:
+                return pd.DataFrame([])
+            return pd.DataFrame(
+                [
+                    {
+                        "created_at": start_date_time,
+                        "field1": "10.0",
+                        "field2": "20.0",
+                        "field3": "12.0",
+                        "field4": "22.0",
+                        "field7": "3.9",
+                        "field8": "0.1,32.5,1200,0,10,87,25,60,24,65,1",
+                    }
+                ]
+            )
+
+        mock_query_data.side_effect = query_data
+
+        data = AirQoDataUtils.extract_devices_data(
+            start_date_time="2022-01-01T00:00:00Z",
+            end_date_time="2022-01-02T00:00:00Z",
+            device_category=DeviceCategory.LOW_COST,
+            remove_outliers=False,
+        )
+
+        self.assertEqual(mock_query_data.call_count, 4)
+        self.assertEqual(len(data.index), 2)
+        self.assertEqual(set(data["device_number"]), {1})
+        self.assertEqual(
+            sorted(data["timestamp"]),
+            ["2022-01-01T00:00:00Z", "2022-01-01T12:00:00Z"],
+        )
+        self.assertEqual(data.iloc[0]["s1_pm2_5"], "10.0")
+        self.assertEqual(data.iloc[0]["humidity"], 65.0)
+
 
 class TestFaultDetector(ct.FaultDetectionFixtures):
     def test_input_output_type(self, df_valid):
@@ -0,0 +1,59 @@
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from airqo_etl_utils.constants import ColumnDataType
+from airqo_etl_utils.data_validator import DataValidationUtils
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(0)
+    values = pd.Series(rng.uniform(-300, 3000, size=5000))
+    boundaries = [-180, -90, 0, 1, 2.7, 5, 30, 45, 50, 90, 99, 110, 180, 1000, 2049]
+    values.iloc[: len(boundaries)] = boundaries
+    values.iloc[len(boundaries)] = np.nan
+    return values
+
+
+@pytest.mark.parametrize(
+    "name",
+    [*DataValidationUtils.VALID_VALUE_RANGES.keys(), "pm1", "device_number"],
+)
+def test_get_valid_values_matches_scalar_rules(values, name):
+    expected = values.apply(lambda x: DataValidationUtils.get_valid_value(x, name))
+    result = DataValidationUtils.get_valid_values(values, name)
+
+    pd.testing.assert_series_equal(result, expected.astype(float))
+
+
+@patch("airqo_etl_utils.data_validator.BigQueryApi")
+def test_remove_outliers(MockBigQueryApi):
+    columns = {
+        ColumnDataType.FLOAT: ["s1_pm2_5", "pm10_raw_value", "device_temperature"],
+        ColumnDataType.INTEGER: ["device_number"],
+        ColumnDataType.TIMESTAMP: ["timestamp"],
+    }
+    MockBigQueryApi.return_value.get_columns.side_effect = (
+        lambda table, column_type: columns[column_type]
+    )
+
+    data = pd.DataFrame(
+        {
+            "s1_pm2_5": ["0.5", "10", "1001"],
+            "pm10_raw_value": [1, 1000, 2000],
+            "device_temperature": [0, 20, 45],
+            "device_number": [1, 2, 3],
+            "timestamp": ["2024-01-01T00:00:00Z"] * 3,
+        }
+    )
+
+    data = DataValidationUtils.remove_outliers(data)
+
+    assert data["s1_pm2_5"].isna().tolist() == [True, False, True]
+    assert data["pm10_raw_value"].isna().tolist() == [False, False, True]
+    assert data["device_temperature"].isna().tolist() == [True, False, False]
+    assert data["device_number"].tolist() == [1, 2, 3]
+    assert pd.api.types.is_datetime64_any_dtype(data["timestamp"])
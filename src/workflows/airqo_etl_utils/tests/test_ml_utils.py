@@ -1,7 +1,9 @@
+import joblib
+import numpy as np
 import pandas as pd
 import pytest
 
-from airqo_etl_utils.ml_utils import MlUtils as FUtils
+from airqo_etl_utils.ml_utils import MlUtils as FUtils, ModelCache
 from airqo_etl_utils.tests.conftest import ForecastFixtures
 
 
@@ -157,3 +159,217 @@ class TestsForecasts(ForecastFixtures):
             FUtils.save_forecasts_to_mongo(sample_dataframe_db, frequency)
             mock_collection = getattr(mock_db, collection_name)
             assert mock_collection.update_one.call_count == 0
+
+
+class RecordingModel:
+    """Predicts the previous value plus one and records the feature matrices it receives."""
+
+    def __init__(self, lag_column: int):
+        self.lag_column = lag_column
+        self.matrices = []
+
+    def predict(self, matrix):
+        self.matrices.append(matrix.copy())
+        return matrix[:, self.lag_column] + 1
+
+
+class TestForecastDevices:
+    @staticmethod
+    def engineer_features(data, frequency):
+        data = FUtils.get_lag_and_roll_features(data, "pm2_5", frequency)
+        data = FUtils.get_time_and_cyclic_features(data, frequency)
+        return FUtils.get_location_features(data)
+
+    @pytest.fixture
+    def raw_data(self):
+        rng = np.random.default_rng(0)
+        frames = []
+        for device, site, periods in [("dev1", "site1", 48), ("dev2", "site2", 30)]:
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "device_id": device,
+                        "site_id": site,
+                        "timestamp": pd.date_range(
+                            "2023-01-01", periods=periods, freq="H"
+                        ),
+                        "pm2_5": rng.uniform(5, 80, periods),
+                        "latitude": rng.uniform(0, 1),
+                        "longitude": rng.uniform(32, 33),
+                    }
+                )
+            )
+        return pd.concat(frames, ignore_index=True)
+
+    def test_forecasts_are_recursive(self, raw_data):
+        data = self.engineer_features(raw_data, "hourly")
+        features = [
+            c
+            for c in data.columns
+            if c
+            not in [
+                "device_id",
+                "site_id",
+                "pm2_5",
+                "timestamp",
+                "latitude",
+                "longitude",
+            ]
+        ]
+        model = RecordingModel(features.index("pm2_5_last_1_hour"))
+
+        forecasts = FUtils.forecast_devices(data, model, "hourly", 5)
+
+        assert len(model.matrices) == 5
+        assert all(matrix.shape == (2, len(features)) for matrix in model.matrices)
+        assert list(forecasts.columns) == ["device_id", "site_id", "timestamp", "pm2_5"]
+        for device, site in [("dev1", "site1"), ("dev2", "site2")]:
+            history = raw_data[raw_data["device_id"] == device]
+            device_forecasts = forecasts[forecasts["device_id"] == device]
+            assert (device_forecasts["site_id"] == site).all()
+            assert device_forecasts["timestamp"].tolist() == list(
+                pd.date_range(
+                    history["timestamp"].iloc[-1],
+                    periods=6,
+                    freq="H",
+                    inclusive="right",
+                )
+            )
+            np.testing.assert_allclose(
+                device_forecasts["pm2_5"], history["pm2_5"].iloc[-1] + np.arange(1, 6)
+            )
+
+    def test_timezone_aware_timestamps(self, raw_data):
+        raw_data["timestamp"] = raw_data["timestamp"].dt.tz_localize("UTC")
+        data = self.engineer_features(raw_data, "hourly")
+        features = [
+            c
+            for c in data.columns
+            if c
+            not in [
+                "device_id",
+                "site_id",
+                "pm2_5",
+                "timestamp",
+                "latitude",
+                "longitude",
+            ]
+        ]
+        model = RecordingModel(features.index("pm2_5_last_1_hour"))
+
+        forecasts = FUtils.forecast_devices(data, model, "hourly", 3)
+
+        assert str(forecasts["timestamp"].dt.tz) == "UTC"
+        for device in ["dev1", "dev2"]:
+            last_timestamp = raw_data[raw_data["device_id"] == device][
+                "timestamp"
+            ].iloc[-1]
+            assert forecasts[forecasts["device_id"] == device][
+                "timestamp"
+            ].tolist() == [last_timestamp + pd.Timedelta(hours=h) for h in (1, 2, 3)]
+
+    @pytest.mark.parametrize("frequency", ["hourly", "daily"])
+    def test_features_match_feature_engineering(self, raw_data, frequency):
+        if frequency == "daily":
+            raw_data["timestamp"] = pd.to_datetime("2023-01-01") + pd.to_timedelta(
+                raw_data.groupby("device_id").cumcount(), unit="D"
+            )
+        data = self.engineer_features(raw_data.copy(), frequency)
+        features = [
+            c
+            for c in data.columns
+            if c
+            not in [
+                "device_id",
+                "site_id",
+                "pm2_5",
+                "timestamp",
+                "latitude",
+                "longitude",
+            ]
+        ]
+        unit = "hour" if frequency == "hourly" else "day"
+        model = RecordingModel(features.index(f"pm2_5_last_1_{unit}"))
+
+        FUtils.forecast_devices(data, model, frequency, 1)
+
+        next_rows = raw_data.groupby("device_id").tail(1).copy()
+        next_rows["timestamp"] += pd.Timedelta(1, unit=unit[0])
+        extended = self.engineer_features(
+            pd.concat([raw_data, next_rows], ignore_index=True)
+            .sort_values(["device_id", "timestamp"])
+            .reset_index(drop=True),
+            frequency,
+        )
+        expected = extended.groupby("device_id").tail(1)[features].to_numpy(float)
+        np.testing.assert_allclose(model.matrices[0], expected, rtol=1e-7, atol=1e-9)
+
+    def test_invalid_frequency(self, raw_data):
+        with pytest.raises(ValueError):
+            FUtils.forecast_devices(raw_data, RecordingModel(0), "weekly", 1)
+
+
+class FakeGCSFileSystem:
+    def __init__(self, models: dict):
+        self.models = models
+        self.generations = {path: 1 for path in models}
+        self.info_calls = 0
+        self.get_calls = 0
+
+    def info(self, path):
+        self.info_calls += 1
+        return {"generation": self.generations[path]}
+
+    def get(self, path, local_path):
+        self.get_calls += 1
+        joblib.dump(self.models[path], local_path)
+
+
+class TestModelCache:
+    @pytest.fixture
+    def fs(self):
+        return FakeGCSFileSystem(
+            {"bucket/default_rf.pkl": {"model": "rf"}, "bucket/hourly.pkl": [1, 2]}
+        )
+
+    def test_models_are_downloaded_once(self, fs, tmp_path):
+        cache = ModelCache(cache_dir=str(tmp_path), max_size=4, ttl=3600)
+
+        for _ in range(3):
+            assert cache.get(fs, "bucket", "default_rf.pkl") == {"model": "rf"}
+
+        assert fs.info_calls == 1
+        assert fs.get_calls == 1
+
+    def test_new_generations_are_downloaded(self, fs, tmp_path):
+        cache = ModelCache(cache_dir=str(tmp_path), max_size=4, ttl=0)
+        cache.get(fs, "bucket", "default_rf.pkl")
+        cache.get(fs, "bucket", "default_rf.pkl")
+        assert fs.get_calls == 1
+
+        fs.models["bucket/default_rf.pkl"] = {"model": "rf2"}
+        fs.generations["bucket/default_rf.pkl"] = 2
+
+        assert cache.get(fs, "bucket", "default_rf.pkl") == {"model": "rf2"}
+        assert fs.get_calls == 2
+
+    def test_disk_cache_is_shared_between_processes(self, fs, tmp_path):
+        ModelCache(cache_dir=str(tmp_path), max_size=4, ttl=3600).get(
+            fs, "bucket", "hourly.pkl"
+        )
+        cache = ModelCache(cache_dir=str(tmp_path), max_size=4, ttl=3600)
+
+        assert cache.get(fs, "bucket", "hourly.pkl") == [1, 2]
+        assert fs.get_calls == 1
+
+    def test_invalidate(self, fs, tmp_path):
+        cache = ModelCache(cache_dir=str(tmp_path), max_size=1, ttl=3600)
+        cache.get(fs, "bucket", "default_rf.pkl")
+        cache.get(fs, "bucket", "hourly.pkl")
+        cache.get(fs, "bucket", "default_rf.pkl")
+        assert fs.get_calls == 2
+
+        cache.invalidate("bucket", "default_rf.pkl")
+        cache.get(fs, "bucket", "default_rf.pkl")
+
+        assert fs.get_calls == 3
@@ -0,0 +1,71 @@
+import json
+import os
+from unittest import mock
+
+import pytest
+
+from airqo_etl_utils.constants import ColumnDataType
+from airqo_etl_utils.schema_registry import SchemaRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    schema_directory = tmp_path / "schema"
+    schema_directory.mkdir()
+    (schema_directory / "first.json").write_text(
+        json.dumps(
+            [
+                {"name": "timestamp", "type": "TIMESTAMP"},
+                {"name": "pm2_5", "type": "FLOAT"},
+                {"name": "device_number", "type": "INTEGER"},
+            ]
+        )
+    )
+    (schema_directory / "second.json").write_text(
+        json.dumps(
+            [
+                {"name": "pm2_5", "type": "FLOAT"},
+                {"name": "humidity", "type": "FLOAT"},
+            ]
+        )
+    )
+    registry = SchemaRegistry()
+    registry.package_directory = str(tmp_path)
+    return registry
+
+
+def test_get_columns(registry):
+    assert registry.get_columns(("first.json",)) == (
+        "timestamp",
+        "pm2_5",
+        "device_number",
+    )
+    assert registry.get_columns(
+        ("first.json", "second.json"), column_type=ColumnDataType.FLOAT
+    ) == ("pm2_5", "humidity")
+    assert (
+        registry.get_columns(("second.json",), column_type=ColumnDataType.TIMESTAMP)
+        == ()
+    )
+
+
+def test_schema_files_are_parsed_once(registry):
+    with mock.patch(
+        "airqo_etl_utils.schema_registry.json.load", wraps=json.load
+    ) as json_load:
+        for _ in range(5):
+            registry.get_columns(("first.json", "second.json"))
+            registry.get_columns(("first.json",), column_type=ColumnDataType.FLOAT)
+
+    assert json_load.call_count == 2
+
+
+def test_modified_schema_files_are_reloaded(registry, tmp_path):
+    assert registry.get_columns(("second.json",)) == ("pm2_5", "humidity")
+
+    schema_file = tmp_path / "schema" / "second.json"
+    schema_file.write_text(json.dumps([{"name": "no2", "type": "FLOAT"}]))
+    modified_time = os.path.getmtime(schema_file) + 10
+    os.utime(schema_file, (modified_time, modified_time))
+
+    assert registry.get_columns(("second.json",)) == ("no2",)
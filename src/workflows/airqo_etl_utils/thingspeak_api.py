@@ -1,8 +1,13 @@
-import json
+import concurrent.futures
+import threading
+import time
 import traceback
+from typing import List, Tuple
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .config import configuration
 
@@ -10,6 +15,47 @@ from .config import configuration
 class ThingspeakApi:
     def __init__(self):
         self.THINGSPEAK_CHANNEL_URL = configuration.THINGSPEAK_CHANNEL_URL
+        self.max_workers = int(configuration.THINGSPEAK_MAX_WORKERS)
+        self.min_request_interval = 1.0 / float(
+            configuration.THINGSPEAK_REQUESTS_PER_SECOND
+        )
+        self.__last_request_time = 0.0
+        self.__rate_limit_lock = threading.Lock()
+        self.session = self.__create_session()
+
+    def __create_session(self) -> requests.Session:
+        """
+        Creates a session whose connection pool is shared by all the requests sent to Thingspeak.
+
+        Returns:
+            requests.Session: A session that retries failed requests with exponential backoff.
+        """
+        retry_strategy = Retry(
+            total=5,
+            backoff_factor=1,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+        )
+        adapter = HTTPAdapter(
+            max_retries=retry_strategy,
+            pool_connections=self.max_workers,
+            pool_maxsize=self.max_workers,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def __wait_for_rate_limit(self) -> None:
+        """
+        Spaces out requests so that the Thingspeak host receives at most THINGSPEAK_REQUESTS_PER_SECOND requests.
+        """
+        with self.__rate_limit_lock:
+            wait_time = self.__last_request_time + self.min_request_interval
+            wait_time -= time.monotonic()
+            if wait_time > 0:
+                time.sleep(wait_time)
+            self.__last_request_time = time.monotonic()
 
     def query_data(
         self,
@@ -21,12 +67,16 @@ class ThingspeakApi:
         data = pd.DataFrame([])
 
         try:
-            url = f"{self.THINGSPEAK_CHANNEL_URL}{device_number}/feeds.json?start={start_date_time}&end={end_date_time}&api_key={read_key}"
-            print(f"{url}")
+            url = f"{self.THINGSPEAK_CHANNEL_URL}{device_number}/feeds.json"
+            params = {
+                "start": start_date_time,
+                "end": end_date_time,
+                "api_key": read_key,
+            }
+            print(f"{url}?start={start_date_time}&end={end_date_time}")
 
-            response = json.loads(
-                requests.get(url, timeout=100.0).content.decode("utf-8")
-            )
+            self.__wait_for_rate_limit()
+            response = self.session.get(url, params=params, timeout=100.0).json()
 
             if (response != -1) and ("feeds" in response):
                 data = pd.DataFrame(response["feeds"])
@@ -37,3 +87,23 @@ class ThingspeakApi:
             traceback.print_exc()
 
         return data
+
+    def query_data_concurrently(
+        self, queries: List[Tuple[int, str, str, str]]
+    ) -> List[pd.DataFrame]:
+        """
+        Queries Thingspeak for several device/date window pairs in parallel.
+
+        Args:
+            queries: A list of (device_number, start_date_time, end_date_time, read_key) tuples.
+
+        Returns:
+            List[pd.DataFrame]: The data returned for each query, in the same order as the queries.
+        """
+        if not queries:
+            return []
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers
+        ) as executor:
+            return list(executor.map(lambda query: self.query_data(*query), queries))
@@ -81,12 +81,11 @@ def airqo_historical_hourly_measurements():
             from airqo_etl_utils.airqo_api import AirQoApi
             from airqo_etl_utils.airqo_utils import AirQoDataUtils
 
-            data = AirQoDataUtils.process_data_for_api(
-                airqo_data, frequency=Frequency.HOURLY
-            )
-
             airqo_api = AirQoApi()
-            airqo_api.save_events(measurements=data)
+            for events in AirQoDataUtils.generate_api_events(
+                airqo_data, frequency=Frequency.HOURLY
+            ):
+                airqo_api.save_events(measurements=events)
         else:
             print("The send to API parameter has been set to false")
 
@@ -339,12 +338,11 @@ def airqo_realtime_measurements():
         from airqo_etl_utils.airqo_api import AirQoApi
         from airqo_etl_utils.airqo_utils import AirQoDataUtils
 
-        data = AirQoDataUtils.process_data_for_api(
-            airqo_data, frequency=Frequency.HOURLY
-        )
-
         airqo_api = AirQoApi()
-        airqo_api.save_events(measurements=data)
+        for events in AirQoDataUtils.generate_api_events(
+            airqo_data, frequency=Frequency.HOURLY
+        ):
+            airqo_api.save_events(measurements=events)
 
     @task()
     def send_hourly_measurements_to_message_broker(data: pd.DataFrame):